@@ -0,0 +1,443 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+
+import atexit
+import logging
+import os
+import time
+import weakref
+from collections import deque
+from logging.handlers import WatchedFileHandler, BaseRotatingHandler
+
+from gevent import monkey
+from gevent import socket as gevent_socket
+
+# Native primitives (the writer runs in a real thread, even if monkey patched)
+_start_new_thread = monkey.get_original("_thread", "start_new_thread")
+_allocate_lock = monkey.get_original("_thread", "allocate_lock")
+_socket_class = monkey.get_original("socket", "socket")
+
+# Live handlers : one set of fork and exit hooks for all of them (hooks cannot be unregistered)
+_instances = weakref.WeakSet()
+
+
+def _at_fork_before_all():
+    """
+    Before fork, for all live handlers
+    """
+    for h in list(_instances):
+        h._at_fork_before()
+
+
+def _at_fork_child_all():
+    """
+    After fork, in child, for all live handlers
+    """
+    for h in list(_instances):
+        h._at_fork_child()
+
+
+def _at_exit_all():
+    """
+    At exit, close all live handlers
+    """
+    for h in list(_instances):
+        h.close()
+
+
+os.register_at_fork(before=_at_fork_before_all, after_in_child=_at_fork_child_all)
+atexit.register(_at_exit_all)
+
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Asynchronous logging handler.
+    Records go to a bounded in-memory queue, drained and written by batches by a native writer thread
+    toward the target handlers (file, syslog, console...), so that callers never block on their I/O.
+    Target handlers filters (context filter) are applied in the caller context.
+    Overflow policies (queue full) :
+    - "block" : caller waits for room, up to block_timeout_ms (then the record is dropped)
+    - "drop_oldest" : oldest queued record is dropped
+    - "drop" : new record is dropped
+    Dropped records are counted, and reported through a warning record.
+    Fork safe : queue is flushed before fork, and the writer thread restarted in the child.
+    Target sockets (syslog...) are swapped for native ones before the writer uses them : a gevent socket
+    belongs to the hub of the thread which created it. Target handlers locks are held while writing to them.
+    """
+
+    POLICIES = ("block", "drop_oldest", "drop")
+
+    def __init__(self, targets, max_size=10000, policy="drop", batch_size=256, flush_interval_ms=100, block_timeout_ms=1000):
+        """
+        Constructor
+        :param targets: Target handlers
+        :type targets: list
+        :param max_size: Max queued records
+        :type max_size: int
+        :param policy: Overflow policy ("block", "drop_oldest", "drop")
+        :type policy: str
+        :param batch_size: Max records written per batch
+        :type batch_size: int
+        :param flush_interval_ms: Writer wake up interval when idle, ms
+        :type flush_interval_ms: int
+        :param block_timeout_ms: "block" policy : max wait for room, ms (the caller may be the gevent loop)
+        :type block_timeout_ms: int
+        """
+
+        logging.Handler.__init__(self)
+        if policy not in AsyncLogHandler.POLICIES:
+            raise Exception("Invalid policy=%s, expecting one of %s" % (policy, AsyncLogHandler.POLICIES))
+
+        self._targets = list(targets)
+        self._max_size = max_size
+        self._policy = policy
+        self._batch_size = batch_size
+        self._flush_interval_sec = flush_interval_ms / 1000.0
+        self._block_timeout_sec = block_timeout_ms / 1000.0
+
+        self.dropped_count = 0
+        self.written_count = 0
+        self._dropped_reported = 0
+
+        self._closed = False
+        self._start()
+        _instances.add(self)
+
+    def _start(self):
+        """
+        Init queue and start the writer thread
+        """
+
+        if self._policy == "drop_oldest":
+            self._queue = deque(maxlen=self._max_size)
+        else:
+            self._queue = deque()
+        self._queue_lock = _allocate_lock()
+        self._wakeup = _allocate_lock()
+        self._wakeup.acquire()
+        # Released by the writer once it took records out (room for "block" callers), once the queue is empty
+        # (flush) and once it exited (join)
+        self._room = _allocate_lock()
+        self._room.acquire()
+        self._drained = _allocate_lock()
+        self._drained.acquire()
+        self._stopped = _allocate_lock()
+        self._stopped.acquire()
+        self._writing = False
+        self._running = True
+        _start_new_thread(self._run, ())
+
+    @property
+    def targets(self):
+        """
+        Target handlers
+        :return list
+        :rtype list
+        """
+        return list(self._targets)
+
+    @property
+    def queued_count(self):
+        """
+        Queued records
+        :return int
+        :rtype int
+        """
+        return len(self._queue)
+
+    def get_stats(self):
+        """
+        Get stats
+        :return dict
+        :rtype dict
+        """
+        return {
+            "policy": self._policy,
+            "queued": len(self._queue),
+            "max_size": self._max_size,
+            "written": self.written_count,
+            "dropped": self.dropped_count,
+        }
+
+    # ===============================
+    # CALLER SIDE
+    # ===============================
+
+    def emit(self, record):
+        """
+        Enqueue a record
+        :param record: logging.LogRecord
+        :type record: logging.LogRecord
+        """
+
+        # Target filters, in caller context
+        targets = [h for h in self._targets if record.levelno >= h.level and h.filter(record)]
+        if not targets:
+            return
+
+        try:
+            self._prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        if not self._running:
+            self._write([(record, targets)])
+            return
+
+        # Enqueue
+        deadline = None
+        while True:
+            with self._queue_lock:
+                if self._policy == "drop_oldest":
+                    if len(self._queue) == self._max_size:
+                        self.dropped_count += 1
+                    self._queue.append((record, targets))
+                    break
+                elif len(self._queue) < self._max_size:
+                    self._queue.append((record, targets))
+                    break
+                elif self._policy == "drop":
+                    self.dropped_count += 1
+                    return
+            # Block : wait for room (woken by the writer), bounded
+            if deadline is None:
+                deadline = time.monotonic() + self._block_timeout_sec
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._running:
+                with self._queue_lock:
+                    self.dropped_count += 1
+                return
+            self._notify()
+            self._room.acquire(True, remaining)
+
+        self._notify()
+
+    @classmethod
+    def _prepare(cls, record):
+        """
+        Prepare a record for deferred formatting (merge args, render exception)
+        :param record: logging.LogRecord
+        :type record: logging.LogRecord
+        """
+
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+    def _notify(self):
+        """
+        Wake up the writer
+        """
+        self._release(self._wakeup)
+
+    @classmethod
+    def _release(cls, lock):
+        """
+        Release a native lock used as an event, if not already released
+        :param lock: Lock
+        :type lock: _thread.lock
+        """
+        if lock.locked():
+            try:
+                lock.release()
+            except RuntimeError:
+                pass
+
+    def flush(self, timeout_ms=5000):
+        """
+        Wait for queued records to be written
+        :param timeout_ms: Timeout, ms
+        :type timeout_ms: int
+        :return bool (True if flushed)
+        :rtype bool
+        """
+
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        while self._running and (len(self._queue) > 0 or self._writing):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._notify()
+            self._drained.acquire(True, remaining)
+        return True
+
+    def close(self, timeout_ms=5000):
+        """
+        Flush, stop the writer and wait for it, then close targets
+        :param timeout_ms: Flush and writer stop timeout, ms
+        :type timeout_ms: int
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+        _instances.discard(self)
+        self.flush(timeout_ms)
+        self._running = False
+        self._notify()
+        self._release(self._room)
+        if not self._stopped.acquire(True, timeout_ms / 1000.0):
+            # Writer stuck in a target : leave it, do not write concurrently with it
+            logging.Handler.close(self)
+            return
+
+        # Remaining (if flush timed out), in caller context, the writer being gone
+        self._drain()
+        for h in self._targets:
+            try:
+                h.close()
+            except Exception:
+                pass
+        logging.Handler.close(self)
+
+    # ===============================
+    # FORK
+    # ===============================
+
+    def _at_fork_before(self):
+        """
+        Before fork : flush, so that nothing is lost nor written twice
+        """
+        if not self._closed:
+            self.flush()
+
+    def _at_fork_child(self):
+        """
+        After fork, in child : writer thread is gone, restart it
+        """
+        if not self._closed:
+            self._start()
+
+    # ===============================
+    # WRITER SIDE
+    # ===============================
+
+    def _run(self):
+        """
+        Writer thread
+        """
+
+        try:
+            while self._running:
+                self._wakeup.acquire(True, self._flush_interval_sec)
+                self._drain(True)
+        finally:
+            self._release(self._stopped)
+
+    def _drain(self, writer=False):
+        """
+        Write all queued records, by batches
+        :param writer: Called by the writer (stops after the current batch once closing)
+        :type writer: bool
+        """
+
+        while True:
+            with self._queue_lock:
+                self._writing = True
+                batch = list()
+                while self._queue and len(batch) < self._batch_size:
+                    batch.append(self._queue.popleft())
+            if batch:
+                self._release(self._room)
+            try:
+                if batch:
+                    self._write(batch)
+                self._report_dropped()
+            finally:
+                self._writing = False
+            if not batch:
+                self._release(self._drained)
+                return
+            if writer and not self._running:
+                return
+
+    def _report_dropped(self):
+        """
+        Report dropped records (warning record toward targets)
+        """
+
+        dropped = self.dropped_count
+        if dropped == self._dropped_reported:
+            return
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "AsyncLogHandler dropped records, dropped=%s, total_dropped=%s, policy=%s" % (dropped - self._dropped_reported, dropped, self._policy),
+            None, None, "_report_dropped")
+        self._dropped_reported = dropped
+        self._write([(record, [h for h in self._targets if record.levelno >= h.level and h.filter(record)])])
+
+    @classmethod
+    def _native_socket(cls, h):
+        """
+        Swap a target handler gevent socket (created by another thread hub, or lazily by emit) for a native
+        blocking one on the same fd
+        :param h: Target handler
+        :type h: logging.Handler
+        """
+
+        s = getattr(h, "socket", None)
+        if not isinstance(s, gevent_socket.socket):
+            return
+        family, sock_type, proto = s.family, s.type, s.proto
+        ns = _socket_class(family, sock_type, proto, fileno=s.detach())
+        ns.setblocking(True)
+        h.socket = ns
+
+    def _write(self, batch):
+        """
+        Write a batch toward targets. Stream handlers (except rotating ones) are flushed once per batch.
+        :param batch: list of (record, targets)
+        :type batch: list
+        """
+
+        streams = set()
+        for record, targets in batch:
+            for h in targets:
+                h.acquire()
+                try:
+                    if isinstance(h, logging.StreamHandler) and not isinstance(h, BaseRotatingHandler):
+                        if isinstance(h, WatchedFileHandler):
+                            h.reopenIfNeeded()
+                        if h.stream is None:
+                            h.stream = h._open()
+                        h.stream.write(h.format(record) + h.terminator)
+                        streams.add(h)
+                    else:
+                        self._native_socket(h)
+                        h.emit(record)
+                except Exception:
+                    h.handleError(record)
+                finally:
+                    h.release()
+            self.written_count += 1
+
+        for h in streams:
+            try:
+                h.flush()
+            except Exception:
+                pass
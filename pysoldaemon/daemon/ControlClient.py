@@ -0,0 +1,89 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+
+import json
+import os
+import socket
+
+
+class ControlClient(object):
+    """
+    Unix domain control socket client (see ControlServer).
+    Standard library only, no gevent required.
+    """
+
+    @classmethod
+    def get_path(cls, pidfile):
+        """
+        Get the control socket path associated to a pid file
+        :param pidfile: Pid file
+        :type pidfile: str
+        :return str
+        :rtype str
+        """
+        return pidfile + ".sock"
+
+    @classmethod
+    def request(cls, path, cmd, args=None, timeout_ms=5000):
+        """
+        Send a command, and return the response.
+        Return None if the control socket is not available (not present, or nobody listening).
+        :param path: Socket path
+        :type path: str
+        :param cmd: Command
+        :type cmd: str
+        :param args: Command arguments
+        :type args: dict,None
+        :param timeout_ms: Timeout in ms
+        :type timeout_ms: int
+        :return dict ({"code": int, "result"|"error": object}), None
+        :rtype dict,None
+        """
+
+        if not os.path.exists(path):
+            return None
+
+        soc = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            soc.settimeout(timeout_ms / 1000.0)
+            try:
+                soc.connect(path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                return None
+
+            req = {"cmd": cmd}
+            if args:
+                req["args"] = args
+            soc.sendall(json.dumps(req).encode("utf-8") + b"\n")
+
+            # Read a line
+            buf = b""
+            while not buf.endswith(b"\n"):
+                chunk = soc.recv(65536)
+                if not chunk:
+                    break
+                buf += chunk
+            return json.loads(buf.decode("utf-8"))
+        finally:
+            soc.close()
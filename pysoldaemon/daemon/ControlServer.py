@@ -0,0 +1,187 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+
+import json
+import logging
+import os
+import socket
+import stat
+
+import gevent
+from pysolbase.SolBase import SolBase
+
+logger = logging.getLogger(__name__)
+
+
+class ControlServer(object):
+    """
+    Unix domain control socket server (gevent).
+    Protocol, one json per line :
+    - request : {"cmd": str, "args": dict}
+    - response : {"code": int, "result": object} or {"code": int, "error": str}
+    """
+
+    CODE_OK = 0
+    CODE_UNKNOWN_COMMAND = 1
+    CODE_FAILED = 2
+    CODE_BAD_REQUEST = 3
+
+    MAX_REQUEST_SIZE = 65536
+
+    def __init__(self, path, commands):
+        """
+        Constructor
+        :param path: Socket path
+        :type path: str
+        :param commands: dict command name => callable(args dict) returning a json serializable result
+        :type commands: dict
+        """
+
+        self._path = path
+        self._commands = commands
+        self._soc = None
+        self._inode = None
+        self._accept_greenlet = None
+        self.request_count = 0
+        self.error_count = 0
+
+    @property
+    def path(self):
+        """
+        Socket path
+        :return str
+        :rtype str
+        """
+        return self._path
+
+    def start(self):
+        """
+        Bind and serve
+        """
+
+        # Replace any previous one (stale, or previous generation on graceful restart)
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+        self._soc = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._soc.bind(self._path)
+        os.chmod(self._path, stat.S_IRUSR | stat.S_IWUSR)
+        self._soc.listen(128)
+        self._inode = os.stat(self._path).st_ino
+
+        self._accept_greenlet = gevent.spawn(self._accept_loop)
+        logger.debug("Control socket started, path=%s", self._path)
+
+    def stop(self, unlink=True):
+        """
+        Stop serving
+        :param unlink: If True, remove the socket file (only if still ours)
+        :type unlink: bool
+        """
+
+        if self._accept_greenlet:
+            self._accept_greenlet.kill(block=False)
+            self._accept_greenlet = None
+
+        if self._soc:
+            # Close only (no shutdown) : after fork, a shutdown would stop the listening socket of the parent as well
+            try:
+                self._soc.close()
+            except Exception as ex:
+                logger.debug("Socket close ex=%s", SolBase.extostr(ex))
+            self._soc = None
+
+        if unlink:
+            try:
+                if os.stat(self._path).st_ino == self._inode:
+                    os.remove(self._path)
+            except OSError:
+                pass
+        logger.debug("Control socket stopped, path=%s, unlink=%s", self._path, unlink)
+
+    def _accept_loop(self):
+        """
+        Accept loop
+        """
+
+        while self._soc:
+            try:
+                conn, _ = self._soc.accept()
+            except Exception as ex:
+                if self._soc:
+                    logger.warning("accept failed, ex=%s", SolBase.extostr(ex))
+                    SolBase.sleep(100)
+                continue
+            gevent.spawn(self._handle, conn)
+
+    def _handle(self, conn):
+        """
+        Handle a connection (one request per line, until closed)
+        :param conn: socket.socket
+        :type conn: socket.socket
+        """
+
+        f = conn.makefile("rwb")
+        try:
+            while True:
+                buf = f.readline(ControlServer.MAX_REQUEST_SIZE)
+                if not buf:
+                    return
+                d = self.process(buf)
+                f.write(json.dumps(d, default=str).encode("utf-8") + b"\n")
+                f.flush()
+        except Exception as ex:
+            logger.debug("connection failed, ex=%s", SolBase.extostr(ex))
+        finally:
+            f.close()
+            conn.close()
+
+    def process(self, buf):
+        """
+        Process a request
+        :param buf: Request, json encoded
+        :type buf: bytes
+        :return dict (response)
+        :rtype dict
+        """
+
+        self.request_count += 1
+        try:
+            req = json.loads(buf.decode("utf-8"))
+            cmd = req["cmd"]
+            args = req.get("args") or dict()
+        except Exception as ex:
+            self.error_count += 1
+            return {"code": ControlServer.CODE_BAD_REQUEST, "error": str(ex)}
+
+        if cmd not in self._commands:
+            self.error_count += 1
+            return {"code": ControlServer.CODE_UNKNOWN_COMMAND, "error": "unknown command %s" % cmd}
+
+        try:
+            return {"code": ControlServer.CODE_OK, "result": self._commands[cmd](args)}
+        except Exception as ex:
+            self.error_count += 1
+            logger.warning("command failed, cmd=%s, ex=%s", cmd, SolBase.extostr(ex))
+            return {"code": ControlServer.CODE_FAILED, "error": str(ex)}
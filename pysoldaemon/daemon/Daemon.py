@@ -24,16 +24,41 @@
 
 import argparse
 import atexit
+import faulthandler
+import fcntl
+import gc
 import logging
-from signal import SIGUSR1, SIGUSR2, SIGTERM
+import socket
+import subprocess
+from contextlib import contextmanager
+from signal import SIGUSR1, SIGUSR2, SIGTERM, SIGKILL, SIGHUP, SIGPROF, SIGWINCH, SIGQUIT, SIG_IGN
 
 import sys
-from logging.handlers import SysLogHandler
+from logging.handlers import SysLogHandler, WatchedFileHandler
 
+from gevent.event import Event
 # noinspection PyProtectedMember
 from gevent.signal import signal
+from gevent.os import make_nonblocking, nb_read
+from gevent.queue import Queue
 from pysolbase.SolBase import SolBase
 
+from pysoldaemon.daemon.AsyncLogHandler import AsyncLogHandler
+from pysoldaemon.daemon.ControlClient import ControlClient
+from pysoldaemon.daemon.ControlServer import ControlServer
+from pysoldaemon.daemon.DaemonCtl import DaemonCtl
+from pysoldaemon.daemon.ExitWaiter import ExitWaiter
+from pysoldaemon.daemon.FdCensus import FdCensus
+from pysoldaemon.daemon.FdRotator import FdRotator
+from pysoldaemon.daemon.LoopWatchdog import LoopWatchdog
+from pysoldaemon.daemon.MemoryWatchdog import MemoryWatchdog
+from pysoldaemon.daemon.MetricsCollector import MetricsCollector
+from pysoldaemon.daemon.ProcessPriority import ProcessPriority
+from pysoldaemon.daemon.ResourceLimits import ResourceLimits
+from pysoldaemon.daemon.RestartBackoff import RestartBackoff
+from pysoldaemon.daemon.StackProfiler import StackProfiler
+from pysoldaemon.daemon.SystemdNotify import SystemdNotify
+
 try:
     import resource
 except Exception as e:
@@ -59,11 +84,42 @@ class Daemon(object):
     Daemon helper.
     """
 
+    # Graceful restart : environment used to pass listening sockets ("name=fd,...") and previous generation pid
+    ENV_LISTEN_SOCKETS = "PYSOLDAEMON_LISTEN_SOCKETS"
+
+    # Socket activation (systemd protocol) : fds from 3, names from LISTEN_FDNAMES (FileDescriptorName=)
+    ENV_LISTEN_FDS = "LISTEN_FDS"
+    ENV_LISTEN_PID = "LISTEN_PID"
+    ENV_LISTEN_FDNAMES = "LISTEN_FDNAMES"
+    LISTEN_FDS_START = 3
+    ENV_UPGRADE_FROM = "PYSOLDAEMON_UPGRADE_FROM"
+
+    # If True, the daemon is flagged ready as soon as _on_start yields to the hub for the first time.
+    # If False, _on_start must call _notify_ready itself.
+    # If None, True except in systemd notify mode (READY=1 must mean serving, not the first yield of _on_start setup).
+    AUTO_READY = None
+
+    # Worker exit code asking its master for a fresh worker (memory hard limit recycle). A worker exiting 0 (_on_start
+    # returned, or stopped) has ended normally : it is not respawned.
+    WORKER_EXIT_RECYCLE = 75
+
+    # Reopen std redirect targets and log file (logrotate postrotate)
+    REOPEN_SIGNAL = SIGWINCH
+
+    # If True, stop/status/reload/reopen on the daemon command line skip argparse and _internal_init (see control_helper).
+    # Opt-in : subclass options, _internal_init state and _daemon_* overrides relying on them are not available there.
+    CONTROL_LIGHT_PATH = False
+
+    # Resource limits profile, applied before the forks (see ResourceLimits), ie {"nproc": 65535, "core": "unlimited"}.
+    # The -rlimits command line profile overrides it. nofile defaults to -maxopenfiles.
+    RLIMITS = None
+
     def __init__(self):
         """
         Constructor
         """
         self.vars = None
+        self.argv = None
 
     def _internal_init(self,
                        pidfile,
@@ -160,6 +216,12 @@ class Daemon(object):
                     self.v_app_name,
                     self.v_log_to_file, self.v_log_to_syslog, self.v_log_to_syslog_facility, self.v_log_to_console)
 
+        # Init : async logging
+        self._log_async = self._get_var("logasync", False)
+        self._log_async_size = self._get_var("logasyncsize", 10000)
+        self._log_async_policy = self._get_var("logasyncpolicy", "drop")
+        self._log_async_handler = None
+
         self._logging_reset()
 
         # Go
@@ -183,8 +245,150 @@ class Daemon(object):
 
         # Internal
         self._pidFileHandle = None
+        self._pidFileOwner = None
         self._softLimit = None
         self._hardLimit = None
+        self._rlimits = None
+
+        # Workers (pre-fork mode, 0 : disabled). Supervisor mode is a master with a single worker.
+        self._workers = self._get_var("workers", 0)
+        self._supervise = self._get_var("supervise", False)
+        if self._supervise and not self._workers:
+            self._workers = 1
+        self._worker_index = None
+        self._worker_pids = dict()
+        self._worker_greenlets = dict()
+        self._worker_respawns = dict()
+        self._worker_backoffs = dict()
+        self._worker_queue = None
+        self._master_stopping = False
+        self._master_gave_up = False
+        self._restart_base_ms = self._get_var("restartbasems", 100)
+        self._restart_max_ms = self._get_var("restartmaxms", 30000)
+        self._restart_budget = self._get_var("restartbudget", 10)
+        self._restart_window_ms = self._get_var("restartwindowms", 60000)
+        logger.debug("_workers=%s, _supervise=%s, _restart_base_ms=%s, _restart_max_ms=%s, _restart_budget=%s, _restart_window_ms=%s",
+                     self._workers, self._supervise, self._restart_base_ms, self._restart_max_ms, self._restart_budget, self._restart_window_ms)
+
+        # Readiness and graceful restart
+        self._is_ready = False
+        self._worker_ready_fd = None
+        self._worker_ready_pids = dict()
+        self._worker_ready_greenlets = dict()
+        self._startup_ms = {"fork": None, "pidfile": None, "ready": None}
+        self._upgrade_from_pid = SolBase.to_int(os.environ.pop(Daemon.ENV_UPGRADE_FROM, 0))
+        self._listen_sockets = self._listen_sockets_inherit()
+        # Re-exec path, resolved now (relative to the launch directory, which -changedir leaves)
+        argv0 = (self.argv if self.argv else sys.argv)[0]
+        self._exec_path = os.path.abspath(argv0) if os.path.isfile(argv0) else argv0
+        logger.debug("_upgrade_from_pid=%s, _listen_sockets=%s", self._upgrade_from_pid, list(self._listen_sockets.keys()))
+
+        # Control socket (next to the pid file)
+        self._start_ms = SolBase.mscurrent()
+        self._control_enabled = self._get_var("controlsocket", True)
+        self._control_path = ControlClient.get_path(self._pidfile)
+        self._ctl = DaemonCtl(self._pidfile, self._timeout_ms, self._control_enabled, reopen_signal=self.REOPEN_SIGNAL,
+                              stop_quit_ms=self._get_var("stopquitms", 0), stop_kill=self._get_var("stopkill", True), stop_kill_ms=self._get_var("stopkillms", 5000))
+        self._control_server = None
+        self._control_commands = {
+            "ping": self._control_ping,
+            "status": self._control_status,
+            "reload": self._control_reload,
+            "stop": self._control_stop,
+            "stats": self._control_stats,
+            "reopen": self._control_reopen,
+        }
+        logger.debug("_control_enabled=%s, _control_path=%s", self._control_enabled, self._control_path)
+
+        # Metrics (0 : disabled)
+        self._metrics_ms = self._get_var("metricsms", 0)
+        self._metrics_log_ms = self._get_var("metricslogms", 60000)
+        self._metrics = None
+
+        # Preload (parent, before forks)
+        self._preload_enabled = self._get_var("preload", True)
+        self._gc_freeze = self._get_var("gcfreeze", False)
+        logger.debug("_preload_enabled=%s, _gc_freeze=%s", self._preload_enabled, self._gc_freeze)
+
+        # Std / log file reopen and size rotation
+        self._rotate_mb = self._get_var("rotatemb", 0)
+        self._rotate_backups = self._get_var("rotatebackups", 5)
+        self._rotate_check_ms = self._get_var("rotatecheckms", 5000)
+        self._rotators = list()
+        self._rotate_greenlet = None
+        logger.debug("_rotate_mb=%s, _rotate_backups=%s, _rotate_check_ms=%s", self._rotate_mb, self._rotate_backups, self._rotate_check_ms)
+
+        # Memory watchdog
+        self._rss_soft_mb = self._get_var("rsssoftmb", 0)
+        self._rss_hard_mb = self._get_var("rsshardmb", 0)
+        self._rss_check_ms = self._get_var("rsscheckms", 5000)
+        self._memory_watchdog = None
+        self._recycling = False
+        logger.debug("_rss_soft_mb=%s, _rss_hard_mb=%s, _rss_check_ms=%s", self._rss_soft_mb, self._rss_hard_mb, self._rss_check_ms)
+        logger.debug("_metrics_ms=%s, _metrics_log_ms=%s", self._metrics_ms, self._metrics_log_ms)
+
+        # systemd notify mode (Type=notify : no forks, readiness / watchdog / status through NOTIFY_SOCKET)
+        self._systemd = self._get_var("systemd", False)
+        self._systemd_status_ms = self._get_var("systemdstatusms", 10000)
+        self._sd = None
+        self._sd_greenlet = None
+        logger.debug("_systemd=%s, _systemd_status_ms=%s", self._systemd, self._systemd_status_ms)
+
+        # Event loop stall watchdog (0 : disabled)
+        self._stall_ms = self._get_var("stallms", 0)
+        self._stall_kill_ms = self._get_var("stallkillms", 0)
+        self._loop_watchdog = None
+        logger.debug("_stall_ms=%s, _stall_kill_ms=%s", self._stall_ms, self._stall_kill_ms)
+
+        # Fd census (0 : disabled)
+        self._fd_check_ms = self._get_var("fdcheckms", 0)
+        self._fd_warn_pcts = [int(v) for v in str(self._get_var("fdwarnpcts", "50,80,95")).split(",") if v.strip()]
+        self._fd_growth_per_min = self._get_var("fdgrowthpermin", 0)
+        self._fd_census = None
+        logger.debug("_fd_check_ms=%s, _fd_warn_pcts=%s, _fd_growth_per_min=%s", self._fd_check_ms, self._fd_warn_pcts, self._fd_growth_per_min)
+
+        # Placement and priority (applied after the forks, None : left alone)
+        self._priority = {
+            "cpus": self._get_var("cpus", None),
+            "policy": self._get_var("sched", None),
+            "nice": self._get_var("nice", None),
+            "ionice": self._get_var("ionice", None),
+            "oom_score_adj": self._get_var("oomscoreadj", None),
+        }
+        self._priority_errors = dict()
+        logger.debug("_priority=%s", self._priority)
+
+        # Stop / drain (in flight work tracking)
+        self._drain_ms = self._get_var("drainms", 10000)
+        self._stop_event = Event()
+        self._stop_ms = None
+        self._drain_greenlet = None
+        self._drain_result = None
+        self._exit_code = 0
+        self._inflight_count = 0
+        self._inflight_idle = Event()
+        self._inflight_idle.set()
+        logger.debug("_drain_ms=%s", self._drain_ms)
+
+        # Profiler (on demand)
+        self._profiler = None
+        self._control_commands["profiler_start"] = self._control_profiler_start
+        self._control_commands["profiler_stop"] = self._control_profiler_stop
+
+    def _get_var(self, key, default=None):
+        """
+        Get a command line var, or default if not set (or if vars are not available)
+        :param key: str
+        :type key: str
+        :param default: object
+        :type default: object
+        :return object
+        :rtype object
+        """
+
+        if self.vars and self.vars.get(key) is not None:
+            return self.vars[key]
+        return default
 
     def _logging_reset(self):
         """
@@ -193,8 +397,10 @@ class Daemon(object):
 
         # Go
         # Ouch, this hack disable console logs (zzzz), status invocation now flush nothing...
-        if self.vars and "action" in self.vars and self.vars["action"] in ["status", "reload", "stop"]:
-            logger.debug("Bypassing switch to logfile due to 'status|reload|stop' action")
+        if self.vars and "action" in self.vars and self.vars["action"] in ["status", "reload", "reopen", "stop"]:
+            logger.debug("Bypassing switch to logfile due to 'status|reload|reopen|stop' action")
+        elif self.vars and self.vars.get("action") == "restart" and self.vars.get("graceful"):
+            logger.debug("Bypassing switch to logfile due to 'restart -graceful' action")
         else:
             logger.debug("Switching to logfile, you will lost console logs now")
 
@@ -210,6 +416,20 @@ class Daemon(object):
                 log_to_console=self.v_log_to_console,
             )
 
+            # Async : root handlers are moved behind the async handler
+            if self._log_async:
+                root = logging.getLogger()
+                self._log_async_handler = AsyncLogHandler(root.handlers, max_size=self._log_async_size, policy=self._log_async_policy)
+                root.handlers = [self._log_async_handler]
+                logger.debug("Async logging engaged, size=%s, policy=%s", self._log_async_size, self._log_async_policy)
+
+    def _logging_flush(self):
+        """
+        Flush async logging (if enabled)
+        """
+        if self._log_async_handler:
+            self._log_async_handler.flush(timeout_ms=self._timeout_ms)
+
     # ===============================================
     # UTILITIES
     # ===============================================
@@ -268,35 +488,57 @@ class Daemon(object):
             self._close_files()
             raise
 
+    def _get_rlimits_profile(self):
+        """
+        Get the resource limits profile : nofile from -maxopenfiles, then RLIMITS, then -rlimits (last wins)
+        :return dict {name: (soft, hard)}
+        :rtype dict
+        """
+
+        profile = dict()
+        if self._maxOpenFiles:
+            profile["nofile"] = (self._maxOpenFiles, self._maxOpenFiles)
+        profile.update(ResourceLimits.parse(self.RLIMITS))
+        profile.update(ResourceLimits.parse(self._get_var("rlimits", None)))
+        return profile
+
     def _set_limits(self):
         """
-        Set limits
+        Set limits (resource limits profile). A limit above what we can get is degraded to the hard limit (no exit).
         """
 
-        logger.debug("Setting max open file=%s", self._maxOpenFiles)
         try:
-            # Get
-            self._softLimit, self._hardLimit = resource.getrlimit(resource.RLIMIT_NOFILE)
-            logger.info("rlimit before : soft=%s, hard=%s", self._softLimit, self._hardLimit)
-
-            # Update
-            resource.setrlimit(resource.RLIMIT_NOFILE, (self._maxOpenFiles, self._maxOpenFiles))
+            profile = self._get_rlimits_profile()
+        except ValueError as ex:
+            logger.error("invalid rlimits profile, exit(-3) now, ex=%s", SolBase.extostr(ex))
+            sys.exit(-3)
+        logger.debug("Setting limits, profile=%s", profile)
+        self._softLimit, self._hardLimit = resource.getrlimit(resource.RLIMIT_NOFILE)
+        logger.info("rlimit before : soft=%s, hard=%s", self._softLimit, self._hardLimit)
 
-            # Get
-            self._softLimit, self._hardLimit = resource.getrlimit(resource.RLIMIT_NOFILE)
-            logger.info("rlimit after, soft=%s, hard=%s", self._softLimit, self._hardLimit)
+        # Apply
+        self._rlimits = ResourceLimits.apply(profile)
 
-        except Exception as ex:
-            # Get
-            self._softLimit, self._hardLimit = resource.getrlimit(resource.RLIMIT_NOFILE)
+        # Get
+        self._softLimit, self._hardLimit = resource.getrlimit(resource.RLIMIT_NOFILE)
+        logger.info("rlimit after, soft=%s, hard=%s", self._softLimit, self._hardLimit)
+        for name, d in self._rlimits.items():
+            if d["degraded"]:
+                logger.warning("rlimit degraded, limit=%s, requested=%s, soft=%s, hard=%s, error=%s", name, d["requested"], d["soft"], d["hard"], d["error"])
+            else:
+                logger.info("rlimit set, limit=%s, soft=%s, hard=%s", name, d["soft"], d["hard"])
 
-            # Log it
-            logger.error("setrlimit failed, soft=%s, hard=%s, required=%s, ex=%s", self._softLimit, self._hardLimit,
-                         self._maxOpenFiles, SolBase.extostr(ex))
+    def _set_priority(self):
+        """
+        Apply placement and priority controls (cpu affinity, scheduling policy, nice, ionice, oom_score_adj).
+        Called after the forks, before dropping privileges (some controls need them), inherited by workers.
+        A failed control is logged and reported in status, it is not fatal.
+        """
 
-            # This is fatal
-            logger.error("failed to apply _maxOpenFiles, exit(-3) now")
-            sys.exit(-3)
+        if all(v is None for v in self._priority.values()):
+            return
+        self._priority_errors = ProcessPriority.apply(**self._priority)
+        logger.info("Priority applied, requested=%s, errors=%s, current=%s", self._priority, self._priority_errors, ProcessPriority.get())
 
     def _godaemon(self):
         """
@@ -308,8 +550,78 @@ class Daemon(object):
         # Limit
         self._set_limits()
 
+        # Forks (none in systemd notify mode : systemd supervises us directly, std goes to the journal)
+        if self._systemd:
+            self._startup_ms["fork"] = SolBase.mscurrent()
+            self._sd = SystemdNotify()
+            if self._changeDir:
+                os.chdir("/")
+            logger.info("systemd notify mode, no forks, pid=%s, notify_socket=%s, watchdog_usec=%s", os.getpid(), self._sd.path, self._sd.watchdog_usec)
+            if not self._sd.enabled:
+                logger.warning("systemd notify mode, but NOTIFY_SOCKET is not set, notifications disabled")
+        else:
+            self._double_fork()
+
+            # Redirect std
+            self._redirect_all_std()
+        self._rotators_init()
+
+        # Go
+        logger.debug("initializing _pidfile=%s", self._pidfile)
+
+        # Register the method called at exit
+        atexit.register(self._remove_pid_file_at_exit)
+
+        # Write pidfile
+        self._pidFileOwner = os.getpid()
+        try:
+            self._write_pid_file()
+        except (IOError, OSError) as ex:
+            logger.error("pid file initialization failed, going exit(3), ex=%s", SolBase.extostr(ex))
+            sys.exit(3)
+
+            # Ok
+        self._startup_ms["pidfile"] = SolBase.mscurrent()
+        logger.debug("pid file set")
+
+        # Finish
+        logger.debug("registering gevent signal handler : SIGUSR1")
+        signal(SIGUSR1, self._on_reload)
+        logger.debug("registering gevent signal handler : SIGUSR2")
+        signal(SIGUSR2, self._on_status)
+        logger.debug("registering gevent signal handler : SIGTERM")
+        signal(SIGTERM, self._exit_handler)
+        logger.debug("registering gevent signal handler : SIGHUP")
+        signal(SIGHUP, self._graceful_restart_handler)
+        logger.debug("registering gevent signal handler : SIGPROF")
+        signal(SIGPROF, self._profiler_toggle_handler)
+        logger.debug("registering gevent signal handler : %s (reopen)", self.REOPEN_SIGNAL)
+        signal(self.REOPEN_SIGNAL, self._reopen_handler)
+        logger.debug("registering stack dump handler : SIGQUIT")
+        self._stack_dump_register()
+
+        logger.debug("registering gevent signal handler : done")
+
+        # Control socket
+        if self._control_enabled:
+            logger.debug("starting control socket, path=%s", self._control_path)
+            self._control_server = ControlServer(self._control_path, self._control_commands)
+            self._control_server.start()
+            atexit.register(self._control_server_stop_at_exit)
+        self._start_ms = SolBase.mscurrent()
+
+        # Fatality
+        SolBase.voodoo_init()
+        logger.debug("process started, pid=%s, pidfile=%s", os.getpid(), self._pidfile)
+
+    def _double_fork(self):
+        """
+        Double fork (detach from the terminal and session)
+        """
+
         # Fork1
         logger.debug("fork1, %s", SolBase.get_current_pid_as_string())
+        self._startup_ms["fork"] = SolBase.mscurrent()
         try:
             pid = gevent.fork()
             if pid > 0:
@@ -347,49 +659,124 @@ class Daemon(object):
             sys.exit(2)
         logger.debug("fork2 done, %s", SolBase.get_current_pid_as_string())
 
-        # Redirect std
-        self._redirect_all_std()
+        # Own process group (fork1 child, the session leader, is gone) : stop escalation kills the whole group, workers included
+        os.setpgid(0, 0)
 
-        # Go
-        logger.debug("initializing _pidfile=%s", self._pidfile)
-
-        # Register the method called at exit
-        atexit.register(self._remove_pid_file)
+    def _remove_pid_file(self):
+        """
+        Remove the pid file (and our fingerprint)
+        """
+        if os.path.exists(self._pidfile):
+            os.remove(self._pidfile)
+        self._ctl.remove_fingerprint(os.getpid())
 
-        # Write pidfile
-        pid = str(os.getpid())
+    def _remove_pid_file_at_exit(self):
+        """
+        Remove the pid file at exit, only if we are the process which wrote it (workers must not remove it)
+        and if it has not been taken over by a new generation (graceful restart)
+        """
+        if self._pidFileOwner != os.getpid():
+            return
         try:
-            f = open(self._pidfile, "w")
-            f.write("%s" % pid)
-            f.close()
+            if self._get_running_pid() != os.getpid():
+                logger.debug("pid file not owned anymore, not removing it, pidfile=%s", self._pidfile)
+                return
+        except ValueError:
+            return
+        self._remove_pid_file()
 
-        except IOError as ex:
-            logger.error("pid file initialization failed, going exit(3), ex=%s", SolBase.extostr(ex))
-            sys.exit(3)
+    def _control_server_stop_at_exit(self):
+        """
+        Stop the control socket at exit (only the process which started it removes the socket file)
+        """
+        if self._control_server:
+            self._control_server.stop(unlink=self._pidFileOwner == os.getpid())
+            self._control_server = None
 
-            # Ok
-        logger.debug("pid file set")
+    def _write_pid_file(self):
+        """
+        Write our pid to the pid file, atomically, and lock it (flock) for our whole lifetime : "is it running" is then
+        a non blocking lock probe (DaemonCtl.is_locked), with no side effect on us.
+        The file is written and locked under a tmp name, then published with link (create only) or, over a stale file,
+        with rename once the stale file lock is taken (so that two concurrent starts cannot both win).
+        On graceful restart, the new generation takes the file over (the previous one still holds the old inode lock).
+        The lock is shared with workers (forked), it is released once all of us are gone.
+        """
 
-        # Finish
-        logger.debug("registering gevent signal handler : SIGUSR1")
-        signal(SIGUSR1, self._on_reload)
-        logger.debug("registering gevent signal handler : SIGUSR2")
-        signal(SIGUSR2, self._on_status)
-        logger.debug("registering gevent signal handler : SIGTERM")
-        signal(SIGTERM, self._exit_handler)
+        tmp_file = "%s.%s.tmp" % (self._pidfile, os.getpid())
+        fd = os.open(tmp_file, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.write(fd, ("%s" % os.getpid()).encode("ascii"))
+            os.fsync(fd)
+            self._pid_file_publish(tmp_file)
+        except Exception:
+            os.close(fd)
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        self._pidFileHandle = fd
 
-        logger.debug("registering gevent signal handler : done")
+        # Our fingerprint (start time, executable), checked by status against pid reuse. Written once published only :
+        # a start losing the race must not overwrite the running daemon one.
+        try:
+            self._ctl.write_fingerprint(os.getpid())
+        except Exception as ex:
+            logger.warning("Fingerprint write failed, status will trust the pid, ex=%s", SolBase.extostr(ex))
 
-        # Fatality
-        SolBase.voodoo_init()
-        logger.debug("process started, pid=%s, pidfile=%s", os.getpid(), self._pidfile)
+    def _pid_file_publish(self, tmp_file):
+        """
+        Publish our (locked) tmp pid file as the pid file
+        :param tmp_file: Tmp pid file
+        :type tmp_file: str
+        """
 
-    def _remove_pid_file(self):
+        for _ in range(0, 10):
+            # No pid file : create only
+            try:
+                os.link(tmp_file, self._pidfile)
+                os.remove(tmp_file)
+                return
+            except FileExistsError:
+                pass
+
+            # Existing : take its lock (stale file), or take it over (graceful restart)
+            try:
+                old_fd = os.open(self._pidfile, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                if not self._upgrade_from_pid:
+                    if not self._pid_file_lock_old(old_fd):
+                        raise IOError("pid file locked, already running, pidfile=%s" % self._pidfile)
+                    if os.fstat(old_fd).st_ino != os.stat(self._pidfile).st_ino:
+                        # Replaced meanwhile
+                        continue
+                os.rename(tmp_file, self._pidfile)
+                return
+            except FileNotFoundError:
+                continue
+            finally:
+                os.close(old_fd)
+        raise IOError("pid file publish failed (contention), pidfile=%s" % self._pidfile)
+
+    # noinspection PyMethodMayBeStatic
+    def _pid_file_lock_old(self, fd):
         """
-        Remove the pid file
+        Try to lock an existing pid file (a few tries : lock probes hold it shortly)
+        :param fd: File descriptor
+        :type fd: int
+        :return bool (False : held by a running daemon)
+        :rtype bool
         """
-        if os.path.exists(self._pidfile):
-            os.remove(self._pidfile)
+
+        for _ in range(0, 5):
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                SolBase.sleep(10)
+        return False
 
     # noinspection PyMethodMayBeStatic
     def _set_user_and_group(self, user, group):
@@ -433,6 +820,24 @@ class Daemon(object):
         """
         logger.info("Base implementation (pass)")
 
+    def _on_preload(self):
+        """
+        Called in the parent, before the forks (and before workers are forked from it).
+        Load here large read-only datasets, so that they are shared (copy on write) with the forked processes.
+        No gevent loop activity must be pending here (greenlets, sockets) : the process forks right after.
+        Listening sockets are bound in _on_listen.
+        """
+        pass
+
+    def _on_listen(self):
+        """
+        Called in the daemon (the master in pre-fork mode), once daemonized, before dropping privileges and before
+        workers are forked. Bind listening sockets here with _get_listen_socket(name, address) : workers inherit them
+        (one shared accept queue, a fixed port works with N workers) and they are handed over on graceful restart.
+        _on_start then gets them with _get_listen_socket(name).
+        """
+        pass
+
     def _on_stop(self):
         """
         On stop
@@ -453,201 +858,1375 @@ class Daemon(object):
         """
         logger.info("Base implementation (pass)")
 
+    def _on_drain(self, deadline_ms):
+        """
+        On drain : called in a greenlet after _on_stop, wait here for in flight work to complete (it can wait and switch).
+        Base implementation waits for the in flight counter (see _inflight) to reach zero.
+        :param deadline_ms: Deadline (SolBase.mscurrent() based), the process exits at this point anyway
+        :type deadline_ms: float
+        :return bool (True : drained)
+        :rtype bool
+        """
+        return self._inflight_idle.wait(max(0.0, deadline_ms - SolBase.mscurrent()) / 1000.0)
+
     # noinspection PyUnusedLocal
     def _exit_handler(self, *argv, **kwargs):
         """
-        Exit handler
+        Exit handler (SIGTERM) : set the stop event only, the drain runs in a greenlet (nothing here must wait)
         """
 
-        try:
-            # Call
-            self._on_stop()
-        finally:
-            pass
-
-        logger.debug("exiting Daemon with exit(0)")
-        self._close_files()
-        sys.exit(0)
+        if self._stop_event.is_set():
+            logger.debug("already stopping, ignoring")
+            return
+        self._stop_ms = SolBase.mscurrent()
+        self._stop_event.set()
+        self._drain_greenlet = gevent.spawn(self._drain_run)
 
     # ===============================================
-    # DAEMON METHODS
+    # STOP / DRAIN
     # ===============================================
 
-    def _daemon_start(self, user, group):
-        """
-        Start the Daemon
-        :param user: User
-        :type user: str
-        :param group: Group
-        :type group: str
-
-        """
+    def _drain_run(self):
         """
-        # Status : OK, implemented
-        # - Running : exit 0 => OK
-        # - Not running and pid file exist : exit 1 => OK
-        # - Not running : exit 3 => OK
-        # - Other : 4 => NOT TESTED
+        Drain (greenlet) : _on_stop, then _on_drain up to the drain deadline.
+        A worker exits right here (os._exit, nothing unwinds through the master state copied at fork). Otherwise, the
+        main greenlet exits once _on_start returned (see _drain_join) : nothing is raised from this greenlet.
         """
-        # Check for a pidfile to see if the Daemon already runs
-        logger.debug("entering")
-        pid = self._get_running_pid()
 
-        # Pid ?
-        if pid:
-            # Check with SIGUSR2
-            try:
-                os.kill(pid, SIGUSR2)
-
-                # Check success, asked to start, but already running
-                logger.info("Already running, exit(1) now, pid=%s", pid)
-                sys.exit(1)
-            except OSError as err:
-                if err.errno == errno.ESRCH:
-                    logger.info("Found pidfile but SIGUSR2 failed, rm on file, pid=%s, pidfile=%s", pid, self._pidfile)
-                    if os.path.exists(self._pidfile):
-                        logger.debug("Removing pidfile")
-                        self._remove_pid_file()
+        deadline_ms = self._stop_ms + self._drain_ms
+        if self._sd:
+            self._sd.stopping()
+        try:
+            self._on_stop()
+            self._drain_result = self._on_drain(deadline_ms)
+        except Exception as ex:
+            logger.warning("Drain failed, ex=%s", SolBase.extostr(ex))
+            self._drain_result = False
+        if self._drain_result:
+            logger.info("Drained, ms=%s", SolBase.msdiff(self._stop_ms))
+        else:
+            logger.warning("Drain deadline reached, exiting anyway, drain_ms=%s, inflight=%s", self._drain_ms, self._inflight_count)
 
-        # Ok start now
-        self._godaemon()
-        self._set_user_and_group(user, group)
-        self._on_start()
+        if self._worker_index is not None:
+            self._worker_exit(self._exit_code)
 
-        # =====================
-        # CAUTION : With same Daemon, this should not happen (custom start will exit the main
-        # due to unlock by customStop)
-        # So, the exit(0) is USELESS and may be DISABLED
-        # =====================
+    def _drain_join(self):
+        """
+        Once _on_start is over (main greenlet) : if stopping, let the drain complete, then exit
+        """
 
-        # Exit
-        if self._onStartExitZero:
-            logger.debug("exiting WITH exit(0) due to _onStartExitZero==True")
-            sys.exit(0)
-        else:
-            logger.debug("exiting WITHOUT exit(0)")
+        if not self._drain_greenlet:
+            return
+        self._drain_greenlet.join()
+        logger.debug("exiting Daemon with exit(%s)", self._exit_code)
+        self._logging_flush()
+        self._close_files()
+        sys.exit(self._exit_code)
 
-    def _daemon_stop(self):
+    def _worker_exit(self, code):
         """
-        Stop the Daemon
-        # Status : OK, implemented
-        # - Running : exit 0 => OK
-        # - Not running and pid file exist : exit 1 => OK
-        # - Not running : exit 3 => OK
-        # - Other : 4 => NOT TESTED
+        Exit a worker now (os._exit) : we may run in any greenlet, including the one which forked us in the master.
+        Logging and std are flushed first, atexit handlers do not run (the master owns the pid file and control socket).
+        :param code: Exit code
+        :type code: int
         """
 
-        logger.debug("entering")
+        logger.debug("worker exiting with os._exit(%s), idx=%s", code, self._worker_index)
+        self._logging_flush()
+        for h in logging.getLogger().handlers:
+            h.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self._close_files()
+        os._exit(code)
 
-        # Get the pid from the pidfile
-        pid = self._get_running_pid()
-        if not pid:
-            logger.info("Daemon is not running, pidFile=%s", self._pidfile)
-            return
+    def _is_stopping(self):
+        """
+        Are we stopping (stop event set) ? New work should be refused.
+        :return bool
+        :rtype bool
+        """
+        return self._stop_event.is_set()
 
-        # Stop it
-        logger.debug("sending SIGTERM, pid=%s, pidFile=%s", pid, self._pidfile)
-        try:
-            os.kill(pid, SIGTERM)
-        except OSError as ex:
-            if ex.errno == errno.ESRCH:
-                logger.info("SIGTERM failed, ESRCH, ex=%s", SolBase.extostr(ex))
-            else:
-                logger.info("SIGTERM failed, not an ESRCH, ex=%s", SolBase.extostr(ex))
-        except Exception as ex:
-            logger.info("SIGTERM failed, not an OSError, going exit(1), ex=%s", SolBase.extostr(ex))
-            sys.exit(1)
-        finally:
-            if os.path.exists(self._pidfile):
-                logger.debug("Removing pidFile=%s", self._pidfile)
-                self._remove_pid_file()
+    def _wait_stop(self, timeout_ms=None):
+        """
+        Wait for the stop event (to be used by _on_start loops, instead of polling)
+        :param timeout_ms: Timeout in ms, None : forever
+        :type timeout_ms: int,None
+        :return bool (True : stopping)
+        :rtype bool
+        """
 
-        # Ok
-        logger.debug("SIGTERM sent")
-        ms_start = SolBase.mscurrent()
+        if timeout_ms is not None:
+            return self._stop_event.wait(timeout_ms / 1000.0)
 
-        # Validate
-        proc_target = "/proc/%d" % pid
-        while SolBase.msdiff(ms_start) < self._timeout_ms:
-            if os.path.exists(proc_target):
-                SolBase.sleep(10)
-                continue
+        # Forever : by slices, a pending timer keeps the loop alive (signal watchers do not reference it,
+        # a loop with nothing else to wait for would raise LoopExit)
+        while not self._stop_event.wait(1.0):
+            pass
+        return True
 
-            # Over
-            logger.info("SIGTERM success, pid=%s", pid)
-            self._remove_pid_file()
-            return
+    def _inflight_enter(self):
+        """
+        Track a unit of in flight work (drained before exit). Must be paired with _inflight_exit.
+        """
 
-        # Not cool
-        logger.warning("SIGTERM timeout=%s ms, pid=%s", self._timeout_ms, pid)
+        self._inflight_count += 1
+        self._inflight_idle.clear()
 
-    def _daemon_status(self):
+    def _inflight_exit(self):
         """
-        Check status.
-        May send a SIGUSR2 to process.
-        
-        # Status : 
-        # - Running : exit 0 
-        # - Not running and pid file exist : exit 1 
-        # - Not running : exit 3 
-        # - Other : 4 => NOT TESTED
-
+        Release a unit of in flight work
         """
-        # Get the pid from the pidfile
-        pid = self._get_running_pid()
-        if not pid:
-            logger.info("Daemon is not running (no pidfile), pidfile=%s", self._pidfile)
-            sys.exit(3)
 
-        # Validate
-        try:
-            os.kill(pid, SIGUSR2)
-        except OSError as err:
-            if err.errno == errno.ESRCH:
-                # Process not found
-                logger.info("Daemon is not running (SIGUSR2 failed), pid=%s, pidfile=%s", pid, self._pidfile)
-                sys.exit(1)
+        self._inflight_count = max(0, self._inflight_count - 1)
+        if self._inflight_count == 0:
+            self._inflight_idle.set()
 
-        # Ok
-        logger.info("Daemon is running, pid=%s, pidfile=%s", pid, self._pidfile)
-        sys.exit(0)
-
-    def _daemon_reload(self):
+    @contextmanager
+    def _inflight(self):
         """
-        Reload.
-        May send a SIGUSR1 to process.
+        In flight work context manager (with self._inflight(): ...)
         """
 
-        # Get
-        pid = self._get_running_pid()
-        if not pid:
-            logger.warning("Daemon not running, (no pidfile), pidfile=%s", self._pidfile)
-            return
-
-        # Signal it
+        self._inflight_enter()
         try:
-            os.kill(pid, SIGUSR1)
-        except OSError as err:
-            if err.errno == errno.ESRCH:
-                # Process not found
-                logger.info("Daemon is not running (SIGUSR1 failed), pid=%s, pidfile=%s", pid, self._pidfile)
-                sys.exit(2)
+            yield
+        finally:
+            self._inflight_exit()
+
+    def _get_drain(self):
+        """
+        Get stop / drain status
+        :return dict
+        :rtype dict
+        """
 
-        logger.info("Reload requested through SIGUSR1, pid=%s, pidfile=%s", pid, self._pidfile)
+        return {
+            "stopping": self._stop_event.is_set(),
+            "stopping_ms": SolBase.msdiff(self._stop_ms) if self._stop_ms else None,
+            "drain_ms": self._drain_ms,
+            "inflight": self._inflight_count,
+        }
 
     # ===============================================
-    # COMMAND LINE PARSER
+    # READINESS / GRACEFUL RESTART
     # ===============================================
 
-    @classmethod
-    def initialize_arguments_parser(cls):
+    def _notify_ready(self):
         """
-        Initialize the parser
-        :param cls: class
-        :return ArgumentParser
-        :rtype ArgumentParser
+        Notify that we are ready (ie serving).
+        Called automatically if auto ready (see AUTO_READY), otherwise _on_start must call it.
+        In a worker, this tells the master, which is ready once all its workers are.
+        On graceful restart, this asks the previous generation to drain and exit.
         """
-        logger.debug("Entering")
+
+        if self._is_ready:
+            return
+        self._is_ready = True
+        self._startup_ms["ready"] = SolBase.mscurrent()
+        logger.info("Daemon ready, pid=%s", os.getpid())
+        if self._worker_ready_fd is not None:
+            try:
+                os.write(self._worker_ready_fd, b"1")
+            except OSError as ex:
+                logger.warning("Worker ready notification failed, ex=%s", SolBase.extostr(ex))
+            os.close(self._worker_ready_fd)
+            self._worker_ready_fd = None
+            return
+        if self._sd:
+            self._sd.ready(self._get_systemd_status())
+        if self._preload_enabled or self._gc_freeze:
+            pages = self._get_pages()
+            for k, d in list(pages["workers"].items()) + [("self", pages["self"])]:
+                if d:
+                    logger.info("Memory pages, process=%s, shared=%s, private=%s, pss=%s", k, d["shared"], d["private"], d["pss"])
+
+        # Graceful restart : previous generation can go now
+        if self._upgrade_from_pid and self._pidFileOwner == os.getpid():
+            logger.info("Graceful restart : sending SIGTERM to previous generation, pid=%s", self._upgrade_from_pid)
+            try:
+                os.kill(self._upgrade_from_pid, SIGTERM)
+            except OSError as ex:
+                logger.warning("Graceful restart : SIGTERM failed, pid=%s, ex=%s", self._upgrade_from_pid, SolBase.extostr(ex))
+            self._upgrade_from_pid = 0
+
+    def _is_auto_ready(self):
+        """
+        Is readiness notified automatically, on the first hub yield of _on_start (see AUTO_READY)
+        :return bool
+        :rtype bool
+        """
+
+        if self.AUTO_READY is None:
+            return not self._systemd
+        return self.AUTO_READY
+
+    def _listen_sockets_inherit(self):
+        """
+        Get listening sockets inherited from a previous generation (graceful restart), or from socket activation (LISTEN_FDS)
+        :return dict name => socket.socket
+        :rtype dict
+        """
+
+        d = self._listen_sockets_activated()
+        buf = os.environ.pop(Daemon.ENV_LISTEN_SOCKETS, None)
+        if not buf:
+            return d
+        for item in buf.split(","):
+            name, fd = item.rsplit("=", 1)
+            d[name] = socket.socket(fileno=int(fd))
+            logger.info("Inherited listening socket, name=%s, fd=%s, addr=%s", name, fd, d[name].getsockname())
+        return d
+
+    def _listen_sockets_activated(self):
+        """
+        Get pre-bound sockets passed by socket activation (systemd LISTEN_FDS / LISTEN_PID / LISTEN_FDNAMES protocol).
+        They are bound by the service manager (privileged ports included) and kept across our restarts :
+        connections are queued by the kernel meanwhile.
+        Sockets are named from LISTEN_FDNAMES, "listen<idx>" if unnamed. The variables are removed from our environment.
+        :return dict name => socket.socket
+        :rtype dict
+        """
+
+        d = dict()
+        count = os.environ.pop(Daemon.ENV_LISTEN_FDS, None)
+        pid = os.environ.pop(Daemon.ENV_LISTEN_PID, None)
+        names = os.environ.pop(Daemon.ENV_LISTEN_FDNAMES, None)
+        if not count:
+            return d
+        if pid and SolBase.to_int(pid) != os.getpid():
+            logger.warning("Socket activation : LISTEN_PID is not us, ignoring, listen_pid=%s, pid=%s", pid, os.getpid())
+            return d
+
+        names = names.split(":") if names else list()
+        for idx in range(0, SolBase.to_int(count)):
+            fd = Daemon.LISTEN_FDS_START + idx
+            name = names[idx] if idx < len(names) and names[idx] and names[idx] != "unknown" else "listen%s" % idx
+            if name in d:
+                name = "%s%s" % (name, idx)
+            try:
+                os.set_inheritable(fd, False)
+                d[name] = socket.socket(fileno=fd)
+            except OSError as ex:
+                logger.warning("Socket activation : invalid fd, name=%s, fd=%s, ex=%s", name, fd, SolBase.extostr(ex))
+                continue
+            logger.info("Activated listening socket, name=%s, fd=%s, addr=%s", name, fd, d[name].getsockname())
+        return d
+
+    def _get_listen_sockets(self):
+        """
+        Get all listening sockets (inherited, activated or bound)
+        :return dict name => socket.socket
+        :rtype dict
+        """
+        return dict(self._listen_sockets)
+
+    def _get_listen_socket(self, name, address=None, family=socket.AF_INET, backlog=1024):
+        """
+        Get a listening socket, registered for handover on graceful restart.
+        If inherited from a previous generation or from socket activation, it is returned as is, otherwise it is bound to address (if provided).
+        :param name: Socket name (must be stable across generations)
+        :type name: str
+        :param address: Address to bind to, if not inherited
+        :type address: tuple,str,None
+        :param family: Socket family (if not inherited)
+        :type family: int
+        :param backlog: Listen backlog (if not inherited)
+        :type backlog: int
+        :return socket.socket,None
+        :rtype socket.socket,None
+        """
+
+        if name in self._listen_sockets:
+            return self._listen_sockets[name]
+        if address is None:
+            return None
+        if self._worker_index is not None:
+            logger.warning("Listening socket bound in a worker (not shared nor handed over, bind it in _on_listen), name=%s, idx=%s", name, self._worker_index)
+
+        soc = socket.socket(family, socket.SOCK_STREAM)
+        if family != socket.AF_UNIX:
+            soc.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        soc.bind(address)
+        soc.listen(backlog)
+        self._listen_sockets[name] = soc
+        logger.info("Listening socket bound, name=%s, addr=%s", name, soc.getsockname())
+        return soc
+
+    # noinspection PyUnusedLocal
+    def _graceful_restart_handler(self, *argv, **kwargs):
+        """
+        SIGHUP handler : spawn a new generation (we are in signal context, cannot wait here)
+        """
+        gevent.spawn(self._graceful_restart_run)
+
+    def _graceful_restart_run(self):
+        """
+        Re-exec a new generation of us, handing over our listening sockets.
+        The new generation takes the pid file over, and sends us a SIGTERM once ready.
+        :return bool (True if the new generation is daemonized)
+        :rtype bool
+        """
+
+        # Args : same as us, with start action, from our absolute path (a launcher, ie a console script, is run as is)
+        ar = list(self.argv if self.argv else sys.argv)
+        action = self.vars.get("action") if self.vars else None
+        if action in ar[1:]:
+            ar[len(ar) - 1 - ar[::-1].index(action)] = "start"
+        ar[0] = self._exec_path
+        if ar[0].endswith(".py") or not os.access(ar[0], os.X_OK):
+            ar = [sys.executable] + ar
+
+        # Env : sockets and us
+        env = dict(os.environ)
+        env[Daemon.ENV_UPGRADE_FROM] = str(os.getpid())
+        fds = list()
+        items = list()
+        for name, soc in self._listen_sockets.items():
+            fds.append(soc.fileno())
+            items.append("%s=%s" % (name, soc.fileno()))
+        if items:
+            env[Daemon.ENV_LISTEN_SOCKETS] = ",".join(items)
+
+        # Go
+        logger.info("Graceful restart : spawning new generation, fds=%s, args=%s", items, ar)
+        try:
+            p = subprocess.Popen(args=ar, env=env, pass_fds=fds)
+            sc = p.wait()
+        except Exception as ex:
+            logger.error("Graceful restart : spawn failed, ex=%s", SolBase.extostr(ex))
+            return False
+        if sc != 0:
+            logger.error("Graceful restart : new generation failed, exit code=%s", sc)
+            return False
+        logger.info("Graceful restart : new generation daemonized, waiting for its readiness")
+        return True
+
+    # ===============================================
+    # METRICS
+    # ===============================================
+
+    def _metrics_start(self):
+        """
+        Start (or restart, after fork) the metrics collector, if enabled
+        """
+
+        if self._metrics:
+            self._metrics.stop()
+            self._metrics = None
+        if not self._metrics_ms:
+            return
+        self._metrics = MetricsCollector(interval_ms=self._metrics_ms, log_interval_ms=self._metrics_log_ms, fd_limit=self._softLimit)
+        self._metrics.start()
+
+    # ===============================================
+    # SYSTEMD NOTIFY
+    # ===============================================
+
+    def _systemd_start(self):
+        """
+        Start the systemd notify greenlet (WATCHDOG=1 at half the watchdog interval, and STATUS=), in systemd notify mode.
+        Being a greenlet, a blocked loop stops the pings : systemd kills and restarts us.
+        """
+
+        if not self._sd or not self._sd.enabled:
+            return
+        if self._sd.watchdog_usec:
+            interval_ms = min(self._sd.watchdog_usec / 2000.0, self._systemd_status_ms or self._sd.watchdog_usec / 2000.0)
+        else:
+            interval_ms = self._systemd_status_ms
+        if not interval_ms:
+            return
+        self._sd_greenlet = gevent.spawn(self._systemd_run, interval_ms)
+
+    def _systemd_run(self, interval_ms):
+        """
+        systemd notify loop (greenlet)
+        :param interval_ms: Interval, ms
+        :type interval_ms: float
+        """
+
+        logger.debug("systemd notify loop, interval_ms=%s, watchdog_usec=%s", interval_ms, self._sd.watchdog_usec)
+        while True:
+            try:
+                if self._sd.watchdog_usec:
+                    self._sd.watchdog(self._get_systemd_status())
+                else:
+                    self._sd.status(self._get_systemd_status())
+            except Exception as ex:
+                logger.warning("systemd notify failed, ex=%s", SolBase.extostr(ex))
+            gevent.sleep(interval_ms / 1000.0)
+
+    def _get_systemd_status(self):
+        """
+        Get the systemd STATUS= line (live metrics, shown by systemctl status). Subclasses may extend it.
+        :return str
+        :rtype str
+        """
+
+        d = {"stopping" if self._stop_event.is_set() else "ready" if self._is_ready else "starting": None}
+        m = self._metrics.get() if self._metrics else dict()
+        if "rss_bytes" in m:
+            d["rss_mb"] = int(m["rss_bytes"] / 1024 / 1024)
+        if "fds" in m:
+            d["fds"] = m["fds"]
+        if "loop_lag_max_ms" in m:
+            d["loop_lag_max_ms"] = m["loop_lag_max_ms"]
+        if self._workers:
+            d["workers"] = len(self._worker_pids)
+        d["inflight"] = self._inflight_count
+        return ", ".join(k if v is None else "%s=%s" % (k, v) for k, v in d.items())
+
+    # ===============================================
+    # PRELOAD
+    # ===============================================
+
+    def _preload(self):
+        """
+        Run _on_preload (if enabled), then freeze the gc heap (if enabled), so that forks keep it shared
+        """
+
+        if self._preload_enabled:
+            ms = SolBase.mscurrent()
+            self._on_preload()
+            logger.info("Preload done, ms=%s", SolBase.msdiff(ms))
+        self._gc_freeze_now()
+
+    def _gc_freeze_now(self):
+        """
+        Freeze the gc heap (if enabled) : tracked objects are moved to a permanent generation, never scanned again,
+        so that collections do not touch their headers (and do not copy their pages) after fork
+        """
+
+        if not self._gc_freeze or not hasattr(gc, "freeze"):
+            return
+        gc.collect()
+        gc.freeze()
+        logger.info("Gc heap frozen, frozen_count=%s", gc.get_freeze_count())
+
+    def _get_pages(self):
+        """
+        Get the shared / private page split, for us and our workers
+        :return dict
+        :rtype dict
+        """
+
+        return {
+            "self": MemoryWatchdog.get_page_split(),
+            "workers": dict((idx, MemoryWatchdog.get_page_split(pid)) for idx, pid in self._worker_pids.items()),
+        }
+
+    # ===============================================
+    # REOPEN / ROTATION (STD REDIRECT AND LOG FILE)
+    # ===============================================
+
+    @classmethod
+    def _get_file_handlers(cls):
+        """
+        Get logging file handlers (root handlers, and async logging targets)
+        :return list
+        :rtype list
+        """
+
+        ar = list()
+        for h in logging.getLogger().handlers:
+            for t in h.targets if isinstance(h, AsyncLogHandler) else [h]:
+                if isinstance(t, logging.FileHandler) and t.stream is not None:
+                    ar.append(t)
+        return ar
+
+    def _rotators_init(self):
+        """
+        Build rotators for std redirect targets and log file (once std are redirected).
+        Only fds really writing to their path are taken : in systemd notify mode, std are not redirected (journal stream).
+        """
+
+        paths = dict()
+        for path, fd in [(self._stdout, sys.stdout.fileno()), (self._stderr, sys.stderr.fileno())]:
+            paths.setdefault(os.path.abspath(path), list()).append(fd)
+        for h in self._get_file_handlers():
+            paths.setdefault(os.path.abspath(h.baseFilename), list()).append(h.stream.fileno())
+        paths = dict((path, [fd for fd in fds if FdRotator.is_writing_to(fd, path)]) for path, fds in paths.items())
+
+        self._rotators = list()
+        max_bytes = self._rotate_mb * 1024 * 1024
+        for path, fds in paths.items():
+            if fds and FdRotator.is_regular_file(path):
+                self._rotators.append(FdRotator(path, fds, max_bytes=max_bytes, backup_count=self._rotate_backups))
+        logger.debug("Rotators, paths=%s", [r.path for r in self._rotators])
+
+    def _rotate_start(self):
+        """
+        Start the size rotation check, if enabled
+        """
+
+        if self._rotate_greenlet:
+            self._rotate_greenlet.kill(block=False)
+            self._rotate_greenlet = None
+        if not self._rotate_mb or not self._rotators:
+            return
+        self._rotate_greenlet = gevent.spawn(self._rotate_run)
+
+    def _rotate_run(self):
+        """
+        Size rotation check loop
+        """
+
+        while True:
+            gevent.sleep(self._rotate_check_ms / 1000.0)
+            rotated = False
+            for r in self._rotators:
+                try:
+                    rotated = r.check() or rotated
+                except Exception as ex:
+                    logger.warning("Rotation failed, path=%s, ex=%s", r.path, SolBase.extostr(ex))
+            if rotated:
+                self._file_handlers_refresh()
+                if self._worker_queue is not None:
+                    self._master_signal_workers(self.REOPEN_SIGNAL)
+
+    def _file_handlers_refresh(self):
+        """
+        Refresh WatchedFileHandler file identity after a swap (otherwise, they reopen the file by themselves)
+        """
+        for h in self._get_file_handlers():
+            if isinstance(h, WatchedFileHandler):
+                h._statstream()
+
+    def _reopen_files(self):
+        """
+        Reopen std redirect targets and log file (fds are swapped, nothing is lost), and forward to workers
+        :return list (reopened paths)
+        :rtype list
+        """
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for h in self._get_file_handlers():
+            h.flush()
+
+        paths = list()
+        for r in self._rotators:
+            try:
+                r.reopen()
+                paths.append(r.path)
+            except Exception as ex:
+                logger.warning("Reopen failed, path=%s, ex=%s", r.path, SolBase.extostr(ex))
+        self._file_handlers_refresh()
+
+        if self._worker_queue is not None:
+            self._master_signal_workers(self.REOPEN_SIGNAL)
+        logger.info("Files reopened, paths=%s", paths)
+        return paths
+
+    # noinspection PyUnusedLocal
+    def _reopen_handler(self, *argv, **kwargs):
+        """
+        REOPEN_SIGNAL handler (we are in signal context, cannot flush here)
+        """
+        gevent.spawn(self._reopen_files)
+
+    # ===============================================
+    # MEMORY WATCHDOG
+    # ===============================================
+
+    def _memory_watchdog_start(self):
+        """
+        Start (or restart, after fork) the memory watchdog, if a limit is set
+        """
+
+        if self._memory_watchdog:
+            self._memory_watchdog.stop()
+            self._memory_watchdog = None
+        if not self._rss_soft_mb and not self._rss_hard_mb:
+            return
+        self._memory_watchdog = MemoryWatchdog(
+            soft_bytes=self._rss_soft_mb * 1024 * 1024,
+            hard_bytes=self._rss_hard_mb * 1024 * 1024,
+            interval_ms=self._rss_check_ms,
+            on_soft=self._on_memory_soft,
+            on_hard=self._on_memory_hard,
+        )
+        self._memory_watchdog.start()
+
+    def _loop_watchdog_start(self):
+        """
+        Start (or restart, after fork : threads are not inherited) the event loop stall watchdog, if enabled
+        """
+
+        if self._loop_watchdog:
+            self._loop_watchdog.stop()
+            self._loop_watchdog = None
+        if not self._stall_ms:
+            return
+        self._loop_watchdog = LoopWatchdog(stall_ms=self._stall_ms, kill_ms=self._stall_kill_ms)
+        self._loop_watchdog.start()
+
+    def _fd_census_start(self):
+        """
+        Start (or restart, after fork) the fd census, if enabled. Thresholds are relative to _softLimit.
+        """
+
+        if self._fd_census:
+            self._fd_census.stop()
+            self._fd_census = None
+        if not self._fd_check_ms:
+            return
+        self._fd_census = FdCensus(
+            limit=self._softLimit,
+            warn_pcts=self._fd_warn_pcts,
+            growth_per_min=self._fd_growth_per_min,
+            interval_ms=self._fd_check_ms,
+        )
+        self._fd_census.start()
+
+    def _on_memory_soft(self, rss_bytes):
+        """
+        Soft rss limit crossed (greenlet context). Override to flush caches and so on.
+        Base implementation runs a full gc collection.
+        :param rss_bytes: Current rss, bytes
+        :type rss_bytes: int
+        """
+        logger.info("Memory soft limit : gc collect, rss_bytes=%s, collected=%s", rss_bytes, gc.collect())
+
+    def _on_memory_hard(self, rss_bytes):
+        """
+        Hard rss limit crossed (greenlet context) : recycle us.
+        - worker : exit through the stop path (SIGTERM), the master forks a fresh one
+        - master or single process : graceful restart (re-exec with the same pid file, we are stopped once it is ready)
+        :param rss_bytes: Current rss, bytes
+        :type rss_bytes: int
+        """
+
+        if self._worker_index is not None:
+            logger.warning("Memory hard limit : stopping worker, idx=%s, rss_bytes=%s", self._worker_index, rss_bytes)
+            self._exit_code = Daemon.WORKER_EXIT_RECYCLE
+            os.kill(os.getpid(), SIGTERM)
+            return
+
+        if self._recycling:
+            return
+        self._recycling = True
+        logger.warning("Memory hard limit : recycling through graceful restart, rss_bytes=%s", rss_bytes)
+        if not self._graceful_restart_run():
+            # Retry on next check
+            self._recycling = False
+            self._memory_watchdog.rearm_hard()
+
+    # ===============================================
+    # PROFILER
+    # ===============================================
+
+    def _profiler_start(self, interval_ms=10, mode="wall", max_duration_ms=600000):
+        """
+        Start the sampling profiler. Output goes to <pidfile>.<pid>.collapsed
+        :param interval_ms: Sampling interval, ms
+        :type interval_ms: int
+        :param mode: "wall" or "cpu"
+        :type mode: str
+        :param max_duration_ms: Auto stop after, ms
+        :type max_duration_ms: int
+        :return str (output file)
+        :rtype str
+        """
+
+        if self._profiler and self._profiler.is_running:
+            raise Exception("Profiler already running, path=%s" % self._profiler.path)
+        path = "%s.%s.collapsed" % (self._pidfile, os.getpid())
+        self._profiler = StackProfiler(path, interval_ms=interval_ms, mode=mode, max_duration_ms=max_duration_ms)
+        self._profiler.start()
+        return path
+
+    def _profiler_stop(self):
+        """
+        Stop the sampling profiler and write its output
+        :return dict,None
+        :rtype dict,None
+        """
+
+        if not self._profiler:
+            return None
+        return self._profiler.stop()
+
+    # noinspection PyUnusedLocal
+    def _profiler_toggle_handler(self, *argv, **kwargs):
+        """
+        SIGPROF handler : start or stop the profiler (defaults)
+        """
+
+        try:
+            if self._profiler and self._profiler.is_running:
+                self._profiler_stop()
+            else:
+                self._profiler_start()
+        except Exception as ex:
+            logger.warning("Profiler toggle failed, ex=%s", SolBase.extostr(ex))
+
+    def _control_profiler_start(self, args):
+        """
+        Control : profiler_start (args : interval_ms, mode, max_duration_ms)
+        """
+        return self._profiler_start(
+            interval_ms=int(args.get("interval_ms", 10)),
+            mode=args.get("mode", "wall"),
+            max_duration_ms=int(args.get("max_duration_ms", 600000)),
+        )
+
+    # noinspection PyUnusedLocal
+    def _control_profiler_stop(self, args):
+        """
+        Control : profiler_stop
+        """
+        return self._profiler_stop()
+
+    # ===============================================
+    # CONTROL SOCKET
+    # ===============================================
+
+    def _control_register(self, cmd, callback):
+        """
+        Register (or override) a control socket command
+        :param cmd: Command name
+        :type cmd: str
+        :param callback: callable(args dict), returning a json serializable result
+        :type callback: callable
+        """
+        self._control_commands[cmd] = callback
+
+    def _get_status(self):
+        """
+        Get our status (control socket status command). Subclasses may extend it.
+        Kept cheap (health checks) : pages (smaps walk) are only set on detailed status and in stats.
+        :return dict
+        :rtype dict
+        """
+
+        return {
+            "pid": os.getpid(),
+            "pidfile": self._pidfile,
+            "app_name": self.v_app_name,
+            "ready": self._is_ready,
+            "uptime_ms": SolBase.msdiff(self._start_ms),
+            "workers": dict(self._worker_pids),
+            "restarts": self._get_restarts(),
+            "metrics": self._metrics.get() if self._metrics else None,
+            "startup": self._get_startup(),
+            "memory": self._memory_watchdog.get() if self._memory_watchdog else None,
+            "pages": None,
+            "files": [r.get() for r in self._rotators],
+            "drain": self._get_drain(),
+            "rlimits": self._rlimits,
+            "priority": dict(ProcessPriority.get(), errors=self._priority_errors),
+            "fds": self._fd_census.get() if self._fd_census else None,
+            "stall": self._loop_watchdog.get() if self._loop_watchdog else None,
+            "listen": dict((name, str(soc.getsockname())) for name, soc in self._listen_sockets.items()),
+        }
+
+    def _get_startup(self):
+        """
+        Get startup timings (ms, from the first fork)
+        :return dict
+        :rtype dict
+        """
+
+        fork_ms = self._startup_ms["fork"]
+        return {
+            "fork_to_pidfile_ms": self._startup_ms["pidfile"] - fork_ms if fork_ms and self._startup_ms["pidfile"] else None,
+            "fork_to_ready_ms": self._startup_ms["ready"] - fork_ms if fork_ms and self._startup_ms["ready"] else None,
+        }
+
+    def _get_stats(self):
+        """
+        Get our stats (control socket stats command). Subclasses may extend it.
+        :return dict
+        :rtype dict
+        """
+
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        return {
+            "pid": os.getpid(),
+            "uptime_ms": SolBase.msdiff(self._start_ms),
+            "cpu_user_sec": ru.ru_utime,
+            "cpu_system_sec": ru.ru_stime,
+            "max_rss_kb": ru.ru_maxrss,
+            "control_requests": self._control_server.request_count if self._control_server else 0,
+            "control_errors": self._control_server.error_count if self._control_server else 0,
+            "metrics": self._metrics.get() if self._metrics else None,
+            "logging": self._log_async_handler.get_stats() if self._log_async_handler else None,
+            "pages": self._get_pages(),
+        }
+
+    # noinspection PyUnusedLocal
+    def _control_ping(self, args):
+        """
+        Control : ping
+        """
+        return "pong"
+
+    def _control_status(self, args):
+        """
+        Control : status. Detailed ({"detailed": true}) fires _on_status, or forwards it to workers.
+        """
+        if not args.get("detailed"):
+            return self._get_status()
+        if self._worker_queue is not None:
+            self._master_signal_workers(SIGUSR2)
+        else:
+            self._on_status()
+        d = self._get_status()
+        d["pages"] = self._get_pages()
+        return d
+
+    # noinspection PyUnusedLocal
+    def _control_reload(self, args):
+        """
+        Control : reload (fires _on_reload, or forwards it to workers)
+        """
+        if self._worker_queue is not None:
+            self._master_signal_workers(SIGUSR1)
+        else:
+            self._on_reload()
+        return True
+
+    # noinspection PyUnusedLocal
+    def _control_reopen(self, args):
+        """
+        Control : reopen std redirect targets and log file (and forwards it to workers)
+        """
+        return self._reopen_files()
+
+    # noinspection PyUnusedLocal
+    def _control_stop(self, args):
+        """
+        Control : stop (acknowledged, then SIGTERM to us, to go through the usual stop path)
+        """
+        gevent.spawn_later(0, os.kill, os.getpid(), SIGTERM)
+        return True
+
+    # noinspection PyUnusedLocal
+    def _control_stats(self, args):
+        """
+        Control : stats
+        """
+        return self._get_stats()
+
+    def _control_request(self, cmd, args=None):
+        """
+        Send a command to the running daemon through its control socket
+        :param cmd: Command
+        :type cmd: str
+        :param args: Command arguments
+        :type args: dict,None
+        :return dict,None (None if control socket unavailable)
+        :rtype dict,None
+        """
+
+        return self._ctl.request(cmd, args)
+
+    # ===============================================
+    # WORKERS (PRE-FORK MODE)
+    # ===============================================
+
+    def _master_run(self):
+        """
+        Master loop (pre-fork mode) : fork workers, respawn dead ones (not those ending normally), forward signals to them.
+        The master is ready once all its workers are (see _worker_ready_watch).
+        Return once stopped, or once all workers ended, all workers being exited.
+        """
+
+        logger.info("Master engaging, workers=%s, pid=%s", self._workers, os.getpid())
+        self._worker_queue = Queue()
+
+        # Master signals
+        logger.debug("registering master signal handlers")
+        signal(SIGUSR1, self._master_forward_handler)
+        signal(SIGUSR2, self._master_forward_handler)
+        signal(SIGPROF, self._master_forward_handler)
+        signal(SIGTERM, self._master_exit_handler)
+
+        # Fork them all
+        self._gc_freeze_now()
+        for idx in range(0, self._workers):
+            self._worker_backoffs[idx] = RestartBackoff(
+                base_ms=self._restart_base_ms,
+                max_ms=self._restart_max_ms,
+                budget=self._restart_budget,
+                window_ms=self._restart_window_ms,
+            )
+            self._worker_spawn(idx)
+
+        # Wait for deaths (or stop)
+        while True:
+            item = self._worker_queue.get()
+            if item is None or self._master_stopping:
+                break
+
+            idx, pid, status, ms_alive = item
+
+            # Normal end (exit 0) : neither respawned nor charged to the restart budget
+            if status == 0:
+                logger.info("Worker ended, not respawned, idx=%s, pid=%s, alive_ms=%s", idx, pid, ms_alive)
+                if not self._worker_pids and not self._worker_respawns:
+                    logger.info("All workers ended, stopping")
+                    break
+                continue
+            logger.warning("Worker exited, idx=%s, pid=%s, status=%s, reason=%s, alive_ms=%s", idx, pid, status, RestartBackoff.get_reason(status), ms_alive)
+
+            # Respawn after a backoff delay (exponential, jitter), or give up on crash loop
+            delay_ms = self._worker_backoffs[idx].on_exit(status, ms_alive)
+            if delay_ms is None:
+                logger.error("Worker crash loop, giving up, stopping, idx=%s, restarts=%s", idx, self._worker_backoffs[idx].get())
+                self._master_gave_up = True
+                self._master_stopping = True
+                self._master_signal_workers(SIGTERM)
+                break
+            logger.info("Worker respawn scheduled, idx=%s, delay_ms=%.1f", idx, delay_ms)
+            self._worker_respawns[idx] = gevent.spawn_later(delay_ms / 1000.0, self._worker_respawn, idx)
+
+        # Over
+        gevent.killall(list(self._worker_respawns.values()), block=False)
+        self._master_stop_workers()
+        logger.info("Master exiting, pid=%s, gave_up=%s", os.getpid(), self._master_gave_up)
+
+    def _worker_respawn(self, idx):
+        """
+        Respawn a worker (backoff delay elapsed)
+        :param idx: Worker index
+        :type idx: int
+        """
+
+        self._worker_respawns.pop(idx, None)
+        if not self._master_stopping:
+            self._worker_spawn(idx)
+
+    def _get_restarts(self):
+        """
+        Get restart counts and last exit reasons, per worker
+        :return dict idx => dict
+        :rtype dict
+        """
+        return dict((idx, b.get()) for idx, b in self._worker_backoffs.items())
+
+    def _worker_spawn(self, idx):
+        """
+        Fork a worker. In the worker, this never returns.
+        :param idx: Worker index
+        :type idx: int
+        """
+
+        ms_start = SolBase.mscurrent()
+        ready_r, ready_w = os.pipe()
+        try:
+            pid = gevent.fork()
+        except OSError as ex:
+            logger.error("worker fork failed, idx=%s, ex=%s", idx, SolBase.extostr(ex))
+            os.close(ready_r)
+            os.close(ready_w)
+            self._worker_queue.put((idx, None, None, SolBase.msdiff(ms_start)))
+            return
+
+        if pid == 0:
+            os.close(ready_r)
+            self._worker_ready_fd = ready_w
+            try:
+                self._worker_run(idx)
+            except SystemExit as ex:
+                # sys.exit from worker code : never unwind into the master code either
+                self._worker_exit(ex.code if isinstance(ex.code, int) else int(ex.code is not None))
+            except Exception as ex:
+                # Never get back into the master code
+                logger.error("Worker failed, exit(1) now, idx=%s, ex=%s", idx, SolBase.extostr(ex))
+                self._logging_flush()
+                os._exit(1)
+
+        # Master
+        os.close(ready_w)
+        logger.info("Worker forked, idx=%s, pid=%s", idx, pid)
+        self._worker_pids[idx] = pid
+        self._worker_greenlets[idx] = gevent.spawn(self._worker_watch, idx, pid, ms_start)
+        self._worker_ready_greenlets[idx] = gevent.spawn(self._worker_ready_watch, idx, pid, ready_r)
+
+    def _worker_run(self, idx):
+        """
+        Worker entry point, after fork. Run _on_start, then exit.
+        :param idx: Worker index
+        :type idx: int
+        """
+
+        SolBase.set_master_process(False)
+        self._worker_index = idx
+
+        # Forget master stuff (we got copies of the watching greenlets)
+        gevent.killall(list(self._worker_greenlets.values()) + list(self._worker_respawns.values()) + list(self._worker_ready_greenlets.values()), block=False)
+        self._worker_greenlets = dict()
+        self._worker_respawns = dict()
+        self._worker_ready_greenlets = dict()
+        self._worker_ready_pids = dict()
+        self._is_ready = False
+        self._startup_ms["ready"] = None
+        self._worker_backoffs = dict()
+        self._worker_pids = dict()
+        self._worker_queue = None
+        if self._control_server:
+            self._control_server.stop(unlink=False)
+            self._control_server = None
+        self._metrics_start()
+        self._memory_watchdog_start()
+        self._fd_census_start()
+        self._loop_watchdog_start()
+        self._profiler = None
+        if self._sd_greenlet:
+            self._sd_greenlet.kill(block=False)
+            self._sd_greenlet = None
+        self._sd = None
+        if self._rotate_greenlet:
+            self._rotate_greenlet.kill(block=False)
+            self._rotate_greenlet = None
+
+        # Worker signals
+        signal(SIGUSR1, self._on_reload)
+        signal(SIGUSR2, self._on_status)
+        signal(SIGTERM, self._exit_handler)
+        signal(SIGHUP, SIG_IGN)
+        signal(SIGPROF, self._profiler_toggle_handler)
+        signal(self.REOPEN_SIGNAL, self._reopen_handler)
+        self._stack_dump_register()
+
+        # Go
+        logger.info("Worker started, idx=%s, %s", idx, SolBase.get_current_pid_as_string())
+        if self._is_auto_ready():
+            gevent.spawn(self._notify_ready)
+        self._on_start()
+        if self._drain_greenlet:
+            self._drain_greenlet.join()
+        self._worker_exit(self._exit_code)
+
+    def _worker_watch(self, idx, pid, ms_start):
+        """
+        Wait for a worker exit (greenlet), and notify the master loop.
+        :param idx: Worker index
+        :type idx: int
+        :param pid: Worker pid
+        :type pid: int
+        :param ms_start: Fork time, ms
+        :type ms_start: float
+        """
+
+        status = None
+        try:
+            _, status = os.waitpid(pid, 0)
+        except OSError as ex:
+            logger.debug("waitpid failed, idx=%s, pid=%s, ex=%s", idx, pid, SolBase.extostr(ex))
+
+        # Notify (if still the owner)
+        if self._worker_pids.get(idx) == pid:
+            del self._worker_pids[idx]
+            self._worker_queue.put((idx, pid, status, SolBase.msdiff(ms_start)))
+
+    def _worker_ready_watch(self, idx, pid, fd):
+        """
+        Wait for a worker readiness (greenlet) : the worker writes to its ready pipe from _notify_ready.
+        The master notifies its own readiness once all its workers are ready.
+        :param idx: Worker index
+        :type idx: int
+        :param pid: Worker pid
+        :type pid: int
+        :param fd: Ready pipe, read end (closed here)
+        :type fd: int
+        """
+
+        try:
+            make_nonblocking(fd)
+            buf = nb_read(fd, 1)
+        except OSError as ex:
+            logger.debug("Ready pipe read failed, idx=%s, pid=%s, ex=%s", idx, pid, SolBase.extostr(ex))
+            buf = b""
+        finally:
+            os.close(fd)
+        self._worker_ready_greenlets.pop(idx, None)
+        if not buf or self._worker_pids.get(idx) != pid:
+            return
+
+        self._worker_ready_pids[idx] = pid
+        logger.info("Worker ready, idx=%s, pid=%s", idx, pid)
+        if len(self._worker_pids) == self._workers and all(self._worker_ready_pids.get(i) == p for i, p in self._worker_pids.items()):
+            self._notify_ready()
+
+    def _master_signal_workers(self, sig):
+        """
+        Send a signal to all workers
+        :param sig: Signal
+        :type sig: int
+        """
+
+        for idx, pid in list(self._worker_pids.items()):
+            try:
+                os.kill(pid, sig)
+            except OSError as ex:
+                logger.debug("kill failed, sig=%s, idx=%s, pid=%s, ex=%s", sig, idx, pid, SolBase.extostr(ex))
+
+    # noinspection PyUnusedLocal
+    def _master_forward_handler(self, sig, *argv, **kwargs):
+        """
+        Master handler : forward signal to workers
+        :param sig: Signal
+        :type sig: int
+        """
+        self._master_signal_workers(sig)
+
+    # noinspection PyUnusedLocal
+    def _master_exit_handler(self, *argv, **kwargs):
+        """
+        Master exit handler : forward SIGTERM to workers, and unlock master loop
+        """
+
+        self._master_stopping = True
+        if self._sd:
+            gevent.spawn(self._sd.stopping)
+        self._master_signal_workers(SIGTERM)
+        self._worker_queue.put(None)
+
+    def _master_stop_workers(self):
+        """
+        Wait for workers exit, up to _timeout_ms, then SIGKILL remaining ones
+        """
+
+        ms_start = SolBase.mscurrent()
+        gevent.joinall(list(self._worker_greenlets.values()), timeout=self._timeout_ms / 1000.0)
+        for idx, pid in list(self._worker_pids.items()):
+            logger.warning("Worker SIGTERM timeout, SIGKILL now, idx=%s, pid=%s", idx, pid)
+            try:
+                os.kill(pid, SIGKILL)
+            except OSError as ex:
+                logger.debug("SIGKILL failed, idx=%s, pid=%s, ex=%s", idx, pid, SolBase.extostr(ex))
+        logger.info("Workers stopped, ms=%s", SolBase.msdiff(ms_start))
+
+    # ===============================================
+    # DAEMON METHODS
+    # ===============================================
+
+    def _daemon_start(self, user, group):
+        """
+        Start the Daemon
+        :param user: User
+        :type user: str
+        :param group: Group
+        :type group: str
+
+        """
+        """
+        # Status : OK, implemented
+        # - Running : exit 0 => OK
+        # - Not running and pid file exist : exit 1 => OK
+        # - Not running : exit 3 => OK
+        # - Other : 4 => NOT TESTED
+        """
+        # Check for a pidfile to see if the Daemon already runs
+        logger.debug("entering")
+        pid = self._get_running_pid()
+
+        # Graceful restart : taking over previous generation
+        if pid and self._upgrade_from_pid and pid == self._upgrade_from_pid:
+            logger.info("Graceful restart : taking over previous generation, pid=%s", pid)
+            pid = None
+
+        # Pid ? (lock probe, then signal 0 and fingerprint for a pid file predating locking : no side effect on a running daemon)
+        if pid:
+            if self._ctl.is_locked() or self._ctl.is_running(pid):
+                logger.info("Already running, exit(1) now, pid=%s", pid)
+                sys.exit(1)
+            else:
+                logger.info("Found pidfile but not locked nor running (stale), rm on file, pid=%s, pidfile=%s", pid, self._pidfile)
+                self._ctl.remove_pid_file(pid)
+
+        # Ok start now
+        self._preload()
+        self._godaemon()
+        self._set_priority()
+        self._on_listen()
+        self._set_user_and_group(user, group)
+        self._metrics_start()
+        self._systemd_start()
+        self._memory_watchdog_start()
+        self._fd_census_start()
+        self._loop_watchdog_start()
+        self._rotate_start()
+        if self._workers > 0:
+            self._master_run()
+            if self._master_gave_up:
+                logger.error("exiting with exit(1), worker crash loop")
+                sys.exit(1)
+        else:
+            if self._is_auto_ready():
+                gevent.spawn(self._notify_ready)
+            self._on_start()
+            self._drain_join()
+
+        # =====================
+        # CAUTION : With same Daemon, this should not happen (custom start will exit the main
+        # due to unlock by customStop)
+        # So, the exit(0) is USELESS and may be DISABLED
+        # =====================
+
+        # Exit
+        if self._onStartExitZero:
+            logger.debug("exiting WITH exit(0) due to _onStartExitZero==True")
+            sys.exit(0)
+        else:
+            logger.debug("exiting WITHOUT exit(0)")
+
+    # noinspection PyMethodMayBeStatic
+    def _stack_dump_register(self):
+        """
+        Register a SIGQUIT handler dumping all thread stacks to stderr (the redirected std err file).
+        This is the stop escalation step before SIGKILL : it is handled at C level, so it works even if the loop is blocked.
+        """
+
+        try:
+            faulthandler.register(SIGQUIT, file=sys.stderr, all_threads=True, chain=False)
+        except Exception as ex:
+            logger.warning("SIGQUIT stack dump registration failed, ex=%s", SolBase.extostr(ex))
+
+    def _daemon_stop(self):
+        """
+        Stop the Daemon
+        # Status : OK, implemented
+        # - Running : exit 0 => OK
+        # - Not running and pid file exist : exit 1 => OK
+        # - Not running : exit 3 => OK
+        # - Other : 4 => NOT TESTED
+        :return float,None : ms taken by the process to exit, None if not running or not exited
+        :rtype float,None
+        """
+
+        logger.debug("entering")
+
+        # Stop it (control socket, or SIGTERM), then wait
+        pid, ms = self._ctl.stop()
+        if not pid:
+            logger.info("Daemon is not running, pidFile=%s", self._pidfile)
+            return
+        elif ms is not None:
+            logger.info("Stop success, pid=%s, ms=%s, phases=%s", pid, ms, self._ctl.stop_phases)
+            return ms
+
+        # Not cool
+        logger.warning("Stop timeout=%s ms, pid=%s, phases=%s", self._timeout_ms, pid, self._ctl.stop_phases)
+        return None
+
+    def _daemon_status(self, detailed=False):
+        """
+        Check status, without side effect on the daemon (pid file lock, signal 0, fingerprint, control socket status).
+        If detailed, fires _on_status in the daemon (control socket, or SIGUSR2).
+        :param detailed: Detailed status
+        :type detailed: bool
+        
+        # Status : 
+        # - Running : exit 0 
+        # - Not running and pid file exist : exit 1 
+        # - Not running : exit 3 
+        # - Other : 4 => NOT TESTED
+
+        """
+        code, pid, result = self._ctl.status(detailed)
+        if code == DaemonCtl.EXIT_NOT_RUNNING:
+            logger.info("Daemon is not running (no pidfile), pidfile=%s", self._pidfile)
+        elif code == DaemonCtl.EXIT_DEAD_PIDFILE:
+            logger.info("Daemon is not running (stale pidfile), pid=%s, pidfile=%s", pid, self._pidfile)
+        elif code == DaemonCtl.EXIT_UNKNOWN:
+            logger.info("Daemon status failed, pid=%s, pidfile=%s, resp=%s", pid, self._pidfile, result)
+        else:
+            logger.info("Daemon is running, pid=%s, pidfile=%s, status=%s", pid, self._pidfile, result)
+        sys.exit(code)
+
+    def _daemon_restart(self, user, group, graceful):
+        """
+        Restart the Daemon.
+        If graceful, the running daemon re-execs a new generation (SIGHUP), handing over its listening sockets,
+        and exits once the new one is ready. Otherwise, stop then start.
+        :param user: User
+        :type user: str
+        :param group: Group
+        :type group: str
+        :param graceful: Graceful restart
+        :type graceful: bool
+        """
+
+        pid = self._get_running_pid()
+        if not graceful or not pid:
+            logger.info("Restart : stop then start, pid=%s, graceful=%s", pid, graceful)
+            self._daemon_stop()
+            self._daemon_start(user, group)
+            return
+
+        # Signal it
+        logger.info("Graceful restart : sending SIGHUP, pid=%s, pidfile=%s", pid, self._pidfile)
+        try:
+            os.kill(pid, SIGHUP)
+        except OSError as err:
+            if err.errno == errno.ESRCH:
+                logger.info("Daemon is not running (SIGHUP failed), pid=%s, pidfile=%s", pid, self._pidfile)
+                sys.exit(1)
+            raise
+
+        # Wait : previous generation gone, pidfile taken over by a new one
+        exited, ms = ExitWaiter.wait_exit(pid, self._timeout_ms)
+        try:
+            new_pid = self._get_running_pid()
+        except ValueError:
+            new_pid = None
+        if exited and new_pid and new_pid != pid:
+            logger.info("Graceful restart success, pid=%s, new_pid=%s, ms=%s", pid, new_pid, ms)
+            return
+
+        # Not cool
+        logger.warning("Graceful restart failed, exited=%s, new_pid=%s, ms=%s, timeout=%s ms, pid=%s", exited, new_pid, ms, self._timeout_ms, pid)
+        sys.exit(1)
+
+    def _daemon_reload(self):
+        """
+        Reload.
+        May send a SIGUSR1 to process.
+        """
+
+        code, pid, resp = self._ctl.reload()
+        if code == DaemonCtl.EXIT_NOT_RUNNING:
+            logger.warning("Daemon not running, (no pidfile), pidfile=%s", self._pidfile)
+        elif code == DaemonCtl.EXIT_OK:
+            logger.info("Reload requested, pid=%s, pidfile=%s, resp=%s", pid, self._pidfile, resp)
+        else:
+            logger.warning("Reload failed, pid=%s, pidfile=%s, resp=%s", pid, self._pidfile, resp)
+            sys.exit(code)
+
+    def _daemon_reopen(self):
+        """
+        Reopen std redirect targets and log file (logrotate postrotate).
+        May send a REOPEN_SIGNAL to process.
+        """
+
+        code, pid, resp = self._ctl.reopen()
+        if code == DaemonCtl.EXIT_NOT_RUNNING:
+            logger.warning("Daemon not running, (no pidfile), pidfile=%s", self._pidfile)
+        elif code == DaemonCtl.EXIT_OK:
+            logger.info("Reopen requested, pid=%s, pidfile=%s, resp=%s", pid, self._pidfile, resp)
+        else:
+            logger.warning("Reopen failed, pid=%s, pidfile=%s, resp=%s", pid, self._pidfile, resp)
+            sys.exit(code)
+
+    # ===============================================
+    # COMMAND LINE PARSER
+    # ===============================================
+
+    @classmethod
+    def initialize_arguments_parser(cls):
+        """
+        Initialize the parser
+        :param cls: class
+        :return ArgumentParser
+        :rtype ArgumentParser
+        """
+        logger.debug("Entering")
 
         # Create an argument parser
         arg_parser = argparse.ArgumentParser(description='SolBase.Daemon', add_help=True)
@@ -749,6 +2328,31 @@ class Daemon(object):
             action="store",
             help="Syslog appname (str) (default KnockDaemon) [optional]"
         )
+        arg_parser.add_argument(
+            "-logasync",
+            metavar="logasync",
+            type=bool,
+            default=False,
+            action="store",
+            help="Async logging : records are queued and written by a dedicated thread (boolean) (default False) [optional]"
+        )
+        arg_parser.add_argument(
+            "-logasyncsize",
+            metavar="logasyncsize",
+            type=int,
+            default=10000,
+            action="store",
+            help="Async logging queue size (default 10000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-logasyncpolicy",
+            metavar="logasyncpolicy",
+            type=str,
+            default="drop",
+            choices=list(AsyncLogHandler.POLICIES),
+            action="store",
+            help="Async logging overflow policy, block|drop_oldest|drop (default drop, dropped records are counted) [optional]"
+        )
         arg_parser.add_argument(
             "-loglevel",
             metavar="loglevel",
@@ -768,7 +2372,57 @@ class Daemon(object):
             type=int,
             default=1048576,
             action="store",
-            help="max open files [optional]"
+            help="max open files, degraded to the hard limit if above it (nofile limit, -rlimits overrides it) [optional]"
+        )
+        arg_parser.add_argument(
+            "-rlimits",
+            metavar="rlimits",
+            type=str,
+            default=None,
+            action="store",
+            help="resource limits profile, applied before the forks, ie nproc=65535,core=unlimited,memlock=64m,stack=8m:unlimited,as=unlimited,nofile=65536 "
+                 "(value or soft:hard, k/m/g suffixes, degraded to the hard limit if above it) [optional]"
+        )
+        arg_parser.add_argument(
+            "-cpus",
+            metavar="cpus",
+            type=str,
+            default=None,
+            action="store",
+            help="cpu affinity, applied after the forks, ie 0-3,6 [optional]"
+        )
+        arg_parser.add_argument(
+            "-sched",
+            metavar="sched",
+            type=str,
+            default=None,
+            choices=sorted(ProcessPriority.POLICIES),
+            action="store",
+            help="scheduling policy (other, batch, idle), applied after the forks [optional]"
+        )
+        arg_parser.add_argument(
+            "-nice",
+            metavar="nice",
+            type=int,
+            default=None,
+            action="store",
+            help="nice value (-20..19, absolute), applied after the forks [optional]"
+        )
+        arg_parser.add_argument(
+            "-ionice",
+            metavar="ionice",
+            type=str,
+            default=None,
+            action="store",
+            help="io priority class[:level] (rt, be, idle, none ; level 0..7), ie be:4 or idle, applied after the forks [optional]"
+        )
+        arg_parser.add_argument(
+            "-oomscoreadj",
+            metavar="oomscoreadj",
+            type=int,
+            default=None,
+            action="store",
+            help="oom_score_adj (-1000..1000), applied after the forks [optional]"
         )
         arg_parser.add_argument(
             "-timeoutms",
@@ -794,13 +2448,253 @@ class Daemon(object):
             action="store",
             help="if set, Daemon will exit zero after start [optional]"
         )
+        arg_parser.add_argument(
+            "-workers",
+            metavar="workers",
+            type=int,
+            default=0,
+            action="store",
+            help="if > 0, pre-fork mode : a master process forks (and respawns) this number of workers, each running _on_start [optional]"
+        )
+        arg_parser.add_argument(
+            "-controlsocket",
+            metavar="controlsocket",
+            type=bool,
+            default=True,
+            action="store",
+            help="if set, a unix control socket (pidfile + '.sock') serves status|reload|stop|stats, and is used by these actions (signals are used as fallback) (default True) [optional]"
+        )
+        arg_parser.add_argument(
+            "-metricsms",
+            metavar="metricsms",
+            type=int,
+            default=0,
+            action="store",
+            help="runtime metrics (loop lag, greenlets, rss, cpu, fds) sampling interval in ms, 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-metricslogms",
+            metavar="metricslogms",
+            type=int,
+            default=60000,
+            action="store",
+            help="runtime metrics log interval in ms, 0 to disable (default 60000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-preload",
+            metavar="preload",
+            type=bool,
+            default=True,
+            action="store",
+            help="if set, _on_preload is called in the parent before the forks (default True) [optional]"
+        )
+        arg_parser.add_argument(
+            "-gcfreeze",
+            metavar="gcfreeze",
+            type=bool,
+            default=False,
+            action="store",
+            help="if set, the gc heap is frozen after preload and before forking workers, to keep it shared (default False) [optional]"
+        )
+        arg_parser.add_argument(
+            "-rotatemb",
+            metavar="rotatemb",
+            type=int,
+            default=0,
+            action="store",
+            help="rotate stdout/stderr/logfile once they reach this size in MB (rename, then fd swap, no copy), 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-rotatebackups",
+            metavar="rotatebackups",
+            type=int,
+            default=5,
+            action="store",
+            help="rotated files kept (file.1 ... file.N) (default 5) [optional]"
+        )
+        arg_parser.add_argument(
+            "-rotatecheckms",
+            metavar="rotatecheckms",
+            type=int,
+            default=5000,
+            action="store",
+            help="size rotation check interval in ms (default 5000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-rsssoftmb",
+            metavar="rsssoftmb",
+            type=int,
+            default=0,
+            action="store",
+            help="rss soft limit in MB, calls _on_memory_soft when crossed, 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-rsshardmb",
+            metavar="rsshardmb",
+            type=int,
+            default=0,
+            action="store",
+            help="rss hard limit in MB, recycles the daemon (graceful restart, same pidfile) or the worker when crossed, 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-rsscheckms",
+            metavar="rsscheckms",
+            type=int,
+            default=5000,
+            action="store",
+            help="rss check interval in ms (default 5000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-drainms",
+            metavar="drainms",
+            type=int,
+            default=10000,
+            action="store",
+            help="drain deadline in ms : on SIGTERM, in flight work (_on_drain) is waited up to this, keep it below timeoutms (default 10000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-stopquitms",
+            metavar="stopquitms",
+            type=int,
+            default=0,
+            action="store",
+            help="stop escalation : if still running after timeoutms, send SIGQUIT (stack dump) and wait this ms, 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-stopkill",
+            metavar="stopkill",
+            type=bool,
+            default=True,
+            action="store",
+            help="stop escalation : if still running, send SIGKILL (process group if leader) as last resort (default true) [optional]"
+        )
+        arg_parser.add_argument(
+            "-stopkillms",
+            metavar="stopkillms",
+            type=int,
+            default=5000,
+            action="store",
+            help="stop escalation : ms to wait for exit after SIGKILL (default 5000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-systemd",
+            metavar="systemd",
+            type=bool,
+            default=False,
+            action="store",
+            help="systemd Type=notify mode : no forks, READY=1 through NOTIFY_SOCKET once ready, WATCHDOG=1 (if WatchdogSec is set) and STATUS= from a greenlet (default false) [optional]"
+        )
+        arg_parser.add_argument(
+            "-systemdstatusms",
+            metavar="systemdstatusms",
+            type=int,
+            default=10000,
+            action="store",
+            help="systemd STATUS= update interval in ms (WATCHDOG=1 pings go at half WatchdogSec anyway), 0 to disable (default 10000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-stallms",
+            metavar="stallms",
+            type=int,
+            default=0,
+            action="store",
+            help="event loop stall threshold in ms : all thread and greenlet stacks are written to std err, then logged, 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-stallkillms",
+            metavar="stallkillms",
+            type=int,
+            default=0,
+            action="store",
+            help="event loop stall self termination threshold in ms (exit code 70, for the supervisor to restart us), 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-supervise",
+            metavar="supervise",
+            type=bool,
+            default=False,
+            action="store",
+            help="supervisor mode : the daemonized process watches a child running _on_start, and restarts it when it dies (a single worker master) (default false) [optional]"
+        )
+        arg_parser.add_argument(
+            "-restartbasems",
+            metavar="restartbasems",
+            type=int,
+            default=100,
+            action="store",
+            help="worker restart first delay in ms, doubled at each restart (reset once stable), with jitter (default 100) [optional]"
+        )
+        arg_parser.add_argument(
+            "-restartmaxms",
+            metavar="restartmaxms",
+            type=int,
+            default=30000,
+            action="store",
+            help="worker restart max delay in ms (default 30000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-restartbudget",
+            metavar="restartbudget",
+            type=int,
+            default=10,
+            action="store",
+            help="crash loop budget : max worker restarts within restartwindowms, then the master gives up and exits, 0 for unlimited (default 10) [optional]"
+        )
+        arg_parser.add_argument(
+            "-restartwindowms",
+            metavar="restartwindowms",
+            type=int,
+            default=60000,
+            action="store",
+            help="crash loop window in ms (default 60000) [optional]"
+        )
+        arg_parser.add_argument(
+            "-fdcheckms",
+            metavar="fdcheckms",
+            type=int,
+            default=0,
+            action="store",
+            help="fd census interval in ms (scans /proc/self/fd, classified by type), 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-fdwarnpcts",
+            metavar="fdwarnpcts",
+            type=str,
+            default="50,80,95",
+            action="store",
+            help="fd usage warning thresholds, percent of the soft fd limit, comma separated (default 50,80,95) [optional]"
+        )
+        arg_parser.add_argument(
+            "-fdgrowthpermin",
+            metavar="fdgrowthpermin",
+            type=int,
+            default=0,
+            action="store",
+            help="fd growth rate alert threshold, fds per minute over the last censuses, 0 to disable (default 0) [optional]"
+        )
+        arg_parser.add_argument(
+            "-graceful",
+            metavar="graceful",
+            type=bool,
+            default=False,
+            action="store",
+            help="if set, restart re-execs a new generation handing over listening sockets, previous one exiting once the new one is ready [optional]"
+        )
+        arg_parser.add_argument(
+            "-detailed",
+            metavar="detailed",
+            type=bool,
+            default=False,
+            action="store",
+            help="if set, status fires _on_status in the daemon (otherwise status has no side effect on it) [optional]"
+        )
         arg_parser.add_argument(
             "action",
             metavar="action",
             type=str,
-            choices=["start", "stop", "status", "reload"],
+            choices=["start", "stop", "status", "reload", "reopen", "restart"],
             action="store",
-            help="Daemon action to perform (start|stop|status|reload) [required]"
+            help="Daemon action to perform (start|stop|status|reload|reopen|restart) [required]"
         )
         logger.debug("Done")
         return arg_parser
@@ -848,6 +2742,47 @@ class Daemon(object):
     # MAIN
     # ===============================================
 
+    @classmethod
+    def control_helper(cls, argv):
+        """
+        Control actions (stop, status, reload, reopen) light path, if CONTROL_LIGHT_PATH is set : options are parsed by
+        DaemonCtl (no argparse) and _internal_init is skipped (no logging, limits nor control socket setup), the daemon
+        instance only gets its pid file and DaemonCtl. Gevent is already imported and patched (module import) : for a
+        standard library only command line, use python -m pysoldaemon.daemon.DaemonCtl.
+        :param argv: Command line argv
+        :type argv: list, tuple
+        :return Daemon,None : None if disabled or not a control action (full path)
+        :rtype Daemon,None
+        """
+
+        if not cls.CONTROL_LIGHT_PATH:
+            return None
+        try:
+            d = DaemonCtl.parse_arguments(argv)
+        except ValueError:
+            return None
+        if d["action"] not in DaemonCtl.ACTIONS or not d["pidfile"]:
+            return None
+
+        di = cls.get_daemon_instance()
+        di.vars = d
+        di.argv = argv
+        di._pidfile = d["pidfile"]
+        di._timeout_ms = d["timeoutms"]
+        di._ctl = DaemonCtl(d["pidfile"], d["timeoutms"], d["controlsocket"], reopen_signal=cls.REOPEN_SIGNAL,
+                            stop_quit_ms=d["stopquitms"], stop_kill=d["stopkill"], stop_kill_ms=d["stopkillms"])
+
+        logger.info("action=%s (light path)", d["action"])
+        if d["action"] == "stop":
+            di._daemon_stop()
+        elif d["action"] == "status":
+            di._daemon_status(d["detailed"])
+        elif d["action"] == "reload":
+            di._daemon_reload()
+        else:
+            di._daemon_reopen()
+        return di
+
     @classmethod
     def main_helper(cls, argv, kwargs):
         """
@@ -863,6 +2798,11 @@ class Daemon(object):
         logger.debug("Entering, argv=%s, kwargs=%s", argv, kwargs)
 
         try:
+            # Control actions : light path (opt-in)
+            di = cls.control_helper(argv)
+            if di:
+                return di
+
             # Parse
             vars_hsh = cls.parse_arguments(argv)
 
@@ -893,6 +2833,7 @@ class Daemon(object):
 
             # Store vars
             di.vars = vars_hsh
+            di.argv = argv
 
             logger.debug("Internal initialization, class=%s", SolBase.get_classname(di))
             di._internal_init(
@@ -915,15 +2856,19 @@ class Daemon(object):
             elif action == "stop":
                 di._daemon_stop()
             elif action == "status":
-                di._daemon_status()
+                di._daemon_status(vars_hsh["detailed"])
             elif action == "reload":
                 di._daemon_reload()
+            elif action == "reopen":
+                di._daemon_reopen()
+            elif action == "restart":
+                di._daemon_restart(user, group, vars_hsh["graceful"])
             else:
                 logger.info("Invalid action=%s", action)
                 print(
-                    "usage: %s -pidfile filename [_maxopenfiles int] [-timeoutms int] "
+                    "usage: %s -pidfile filename [_maxopenfiles int] [-rlimits string] [-cpus string] [-sched string] [-nice int] [-ionice string] [-oomscoreadj int] [-timeoutms int] "
                     "[-stdin string] [-stdout string] [-stderr string] [-logfile string] [-loglevel string] [-changedir bool] "
-                    "[-onstartexitzero bool] [-user string] [-group string] start|stop|status|reload" %
+                    "[-onstartexitzero bool] [-user string] [-group string] [-workers int] [-controlsocket bool] [-metricsms int] [-metricslogms int] [-preload bool] [-gcfreeze bool] [-rsssoftmb int] [-rsshardmb int] [-rsscheckms int] [-rotatemb int] [-rotatebackups int] [-rotatecheckms int] [-systemd bool] [-systemdstatusms int] [-supervise bool] [-restartbasems int] [-restartmaxms int] [-restartbudget int] [-restartwindowms int] [-stallms int] [-stallkillms int] [-fdcheckms int] [-fdwarnpcts string] [-fdgrowthpermin int] [-drainms int] [-stopquitms int] [-stopkill bool] [-stopkillms int] [-graceful bool] [-detailed bool] start|stop|status|reload|reopen|restart" %
                     argv[0])
                 sys.exit(2)
 
@@ -0,0 +1,833 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import errno
+import fcntl
+import json
+import logging
+import os
+import sys
+import time
+from signal import SIGKILL, SIGQUIT, SIGTERM, SIGUSR1, SIGUSR2, SIGWINCH
+
+from pysoldaemon.daemon.ControlClient import ControlClient
+from pysoldaemon.daemon.ExitWaiter import ExitWaiter
+from pysoldaemon.daemon.ProcInfo import ProcInfo
+
+logger = logging.getLogger(__name__)
+
+
+class DaemonCtl(object):
+    """
+    Control side of a running daemon (stop, status, reload), through its pid file and control socket (signals as fallback).
+    Standard library only : no gevent, no monkey patching, no argparse.
+
+    Used by Daemon for its stop/status/reload actions, and usable as a fast path command line :
+    python -m pysoldaemon.daemon.DaemonCtl -pidfile=/var/run/x.pid [-timeoutms=15000] [-controlsocket=1] stop|status|reload|reopen
+
+    Status is side effect free : pid file lock probe, signal 0, and the process fingerprint (start time, executable)
+    stored next to the pid file is checked against /proc/<pid>/stat (a pid reused by another process is not us).
+    The daemon _on_status is fired only on detailed status [-detailed=1].
+
+    Stop escalates : SIGTERM (or control stop) then wait up to timeoutms (drain deadline),
+    then optionally SIGQUIT (stacks dump) and wait stopquitms, then SIGKILL (whole process group) and wait stopkillms.
+    The pid file is removed only once the process is confirmed gone.
+    [-stopquitms=0] [-stopkill=1] [-stopkillms=5000]
+
+    Batch status, over a glob or a directory of pid files (probed concurrently, one json line per instance) :
+    python -m pysoldaemon.daemon.DaemonCtl -pidfiles="/var/run/x/*.pid" [-concurrency=32] status
+
+    Group actions, in parallel (one json line per instance, then a summary line with the total elapsed time) :
+    python -m pysoldaemon.daemon.DaemonCtl -pidfiles="/var/run/x/*.pid" [-concurrency=32] stop|reload|reopen
+    python -m pysoldaemon.daemon.DaemonCtl -instances=instances.json [-concurrency=32] start|stop|reload|reopen|status
+    The instances file is a json list of {"pidfile": str, "cmd": [daemon command line, without action]}.
+    """
+
+    # Exit codes (LSB like, as Daemon)
+    EXIT_OK = 0
+    EXIT_DEAD_PIDFILE = 1
+    EXIT_FAILED = 2
+    EXIT_NOT_RUNNING = 3
+    EXIT_UNKNOWN = 4
+
+    # Actions served
+    ACTIONS = ("stop", "status", "reload", "reopen")
+
+    def __init__(self, pidfile, timeout_ms=15000, control_enabled=True, reopen_signal=SIGWINCH, stop_quit_ms=0, stop_kill=True, stop_kill_ms=5000):
+        """
+        Constructor
+        :param pidfile: Pid file
+        :type pidfile: str
+        :param timeout_ms: Timeout in ms
+        :type timeout_ms: int
+        :param control_enabled: Use the control socket (signals are used as fallback)
+        :type control_enabled: bool
+        :param reopen_signal: Signal asking the daemon to reopen its files (fallback)
+        :type reopen_signal: int
+        :param stop_quit_ms: Stop escalation : if > 0, SIGQUIT (stacks dump) after the drain deadline, and wait this
+        :type stop_quit_ms: int
+        :param stop_kill: Stop escalation : SIGKILL if still running
+        :type stop_kill: bool
+        :param stop_kill_ms: Stop escalation : wait this after SIGKILL
+        :type stop_kill_ms: int
+        """
+
+        self.pidfile = pidfile
+        self.timeout_ms = timeout_ms
+        self.control_enabled = control_enabled
+        self.control_path = ControlClient.get_path(pidfile)
+        self.fingerprint_path = DaemonCtl.get_fingerprint_path(pidfile)
+        self.reopen_signal = reopen_signal
+        self.stop_quit_ms = stop_quit_ms
+        self.stop_kill = stop_kill
+        self.stop_kill_ms = stop_kill_ms
+        self.stop_phases = list()
+
+    def get_running_pid(self):
+        """
+        Get the pid from the pid file
+        :return int,None
+        :rtype int,None
+        """
+
+        try:
+            with open(self.pidfile, "r") as f:
+                return int(f.read().strip())
+        except IOError:
+            return None
+
+    def is_locked(self):
+        """
+        Check if the pid file is locked by its daemon (held for its whole lifetime, see Daemon._write_pid_file).
+        Non blocking lock probe : no side effect on the daemon.
+        :return bool,None : True if running, False if stale, None if no pid file
+        :rtype bool,None
+        """
+
+        try:
+            fd = os.open(self.pidfile, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+        return False
+
+    def remove_pid_file(self, pid=None):
+        """
+        Remove the pid file (and its fingerprint, and the control socket if left behind)
+        :param pid: If set, remove it only if it still holds this pid (not taken over by a new generation)
+        :type pid: int,None
+        """
+        try:
+            if pid and self.get_running_pid() != pid:
+                return
+            os.remove(self.pidfile)
+        except (FileNotFoundError, ValueError):
+            pass
+        self.remove_fingerprint(pid)
+        try:
+            # Left behind if the daemon was killed
+            os.remove(self.control_path)
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def get_fingerprint_path(cls, pidfile):
+        """
+        Get the process fingerprint file path associated to a pid file
+        :param pidfile: Pid file
+        :type pidfile: str
+        :return str
+        :rtype str
+        """
+        return pidfile + ".fingerprint"
+
+    def write_fingerprint(self, pid):
+        """
+        Write the fingerprint of a process (ProcInfo.get_fingerprint), atomically
+        :param pid: Pid
+        :type pid: int
+        """
+
+        tmp_file = "%s.%s.tmp" % (self.fingerprint_path, pid)
+        with open(tmp_file, "w") as f:
+            json.dump(ProcInfo.get_fingerprint(pid), f)
+        os.rename(tmp_file, self.fingerprint_path)
+
+    def read_fingerprint(self):
+        """
+        Read the fingerprint
+        :return dict,None
+        :rtype dict,None
+        """
+
+        try:
+            with open(self.fingerprint_path, "r") as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def remove_fingerprint(self, pid=None):
+        """
+        Remove the fingerprint
+        :param pid: If set, remove it only if it is the fingerprint of this pid
+        :type pid: int,None
+        """
+
+        fp = self.read_fingerprint()
+        if pid and fp and fp.get("pid") != pid:
+            return
+        try:
+            os.remove(self.fingerprint_path)
+        except FileNotFoundError:
+            pass
+
+    def is_running(self, pid):
+        """
+        Check if the pid is our daemon, without side effect on it : signal 0, then fingerprint check (pid reuse).
+        Without fingerprint (not yet written, or written for another generation), the pid is trusted if the pid file
+        is locked. If not locked (pid file written by a daemon predating pid file locking), its executable must be ours
+        and its command line must name our pid file. Such a pid is not verified (see is_verified).
+        :param pid: Pid
+        :type pid: int
+        :return bool
+        :rtype bool
+        """
+
+        if not ExitWaiter.is_alive(pid):
+            return False
+        fp = self.read_fingerprint()
+        if fp and fp.get("pid") == pid:
+            if not ProcInfo.is_same_process(fp, pid):
+                logger.info("Pid reused by another process, pid=%s, fingerprint=%s, current=%s", pid, fp, ProcInfo.get_fingerprint(pid))
+                return False
+            return True
+        if self.is_locked() is not False:
+            return True
+
+        # Unlocked, no fingerprint : compare the executable (command name if not readable) with ours, and the command line
+        exe = ProcInfo.get_exe(os.getpid())
+        me = {"pid": pid, "exe": exe, "comm": None if exe else ProcInfo.get_comm(os.getpid())}
+        name = os.path.basename(self.pidfile)
+        if not ProcInfo.is_same_process(me, pid) or not any(name in arg for arg in ProcInfo.get_cmdline(pid) or []):
+            logger.info("Pid file not locked, pid used by another process, pid=%s, current=%s", pid, ProcInfo.get_fingerprint(pid))
+            return False
+        return True
+
+    def is_verified(self, pid):
+        """
+        Check if the pid is positively identified as our daemon : its fingerprint matches, or the pid file is locked.
+        A pid only accepted by the legacy fallback of is_running is not : stop does not escalate past SIGTERM on it.
+        :param pid: Pid
+        :type pid: int
+        :return bool
+        :rtype bool
+        """
+
+        fp = self.read_fingerprint()
+        if fp and fp.get("pid") == pid:
+            return ProcInfo.is_same_process(fp, pid)
+        return self.is_locked() is True
+
+    def request(self, cmd, args=None):
+        """
+        Send a command to the running daemon through its control socket
+        :param cmd: Command
+        :type cmd: str
+        :param args: Command arguments
+        :type args: dict,None
+        :return dict,None (None if control socket unavailable)
+        :rtype dict,None
+        """
+
+        if not self.control_enabled:
+            return None
+        try:
+            return ControlClient.request(self.control_path, cmd, args, timeout_ms=self.timeout_ms)
+        except Exception as ex:
+            logger.info("Control request failed, falling back to signals, cmd=%s, ex=%s", cmd, ex)
+            return None
+
+    def stop(self):
+        """
+        Stop, escalating : SIGTERM (control socket "stop", or signal) and drain deadline (timeout_ms),
+        then SIGQUIT (if stop_quit_ms), then SIGKILL (if stop_kill). Each phase is timed into stop_phases.
+        The daemon leads its process group : SIGKILL goes to the whole group, and a phase ends once all of it is gone (workers included).
+        The pid file is removed only once the process and its group are confirmed gone.
+        A pid not verified (unlocked pid file without fingerprint, see is_verified) only gets SIGTERM.
+        :return tuple (pid, ms) : pid None if not running, ms None if still running
+        :rtype tuple
+        """
+
+        self.stop_phases = list()
+        pid = self.get_running_pid()
+        if not pid:
+            return None, None
+        if ExitWaiter.is_alive(pid) and not self.is_running(pid):
+            # Never signal a process which reused our pid
+            logger.warning("Stop : pid reused by another process, removing stale pid file, pid=%s", pid)
+            self.remove_pid_file(pid)
+            return None, None
+        verified = self.is_verified(pid)
+
+        t = time.monotonic()
+        try:
+            resp = self.request("stop")
+            if resp and resp["code"] == 0:
+                logger.debug("stop requested through control socket")
+            else:
+                os.kill(pid, SIGTERM)
+        except OSError as ex:
+            logger.info("SIGTERM failed, pid=%s, errno=%s, ex=%s", pid, ex.errno, ex)
+        exited = self._stop_wait(pid, "SIGTERM", self.timeout_ms)
+
+        if not exited and not verified:
+            logger.warning("Stop : pid not verified (pid file not locked, no fingerprint), not escalating past SIGTERM, pid=%s", pid)
+            return pid, None
+
+        if not exited and self.stop_quit_ms > 0:
+            self._stop_signal(pid, SIGQUIT)
+            exited = self._stop_wait(pid, "SIGQUIT", self.stop_quit_ms)
+
+        if not exited and self.stop_kill:
+            self._stop_signal(pid, SIGKILL)
+            exited = self._stop_wait(pid, "SIGKILL", self.stop_kill_ms)
+
+        if not exited:
+            logger.warning("Stop failed, process still running, keeping pid file, pid=%s, phases=%s", pid, self.stop_phases)
+            return pid, None
+        self.remove_pid_file(pid)
+        return pid, (time.monotonic() - t) * 1000.0
+
+    def _stop_signal(self, pid, sig):
+        """
+        Stop escalation : send a signal. SIGKILL goes to the whole process group led by pid (workers included,
+        even if pid is already gone : a group outlives its leader).
+        :param pid: Pid
+        :type pid: int
+        :param sig: Signal
+        :type sig: int
+        """
+
+        if sig == SIGKILL:
+            try:
+                os.killpg(pid, sig)
+                return
+            except OSError as ex:
+                # ESRCH : no group led by pid
+                logger.debug("killpg failed, pid=%s, ex=%s", pid, ex)
+        try:
+            os.kill(pid, sig)
+        except OSError as ex:
+            logger.info("Signal failed, pid=%s, sig=%s, ex=%s", pid, sig, ex)
+
+    @classmethod
+    def _get_group_pids(cls, pgid):
+        """
+        Get the live pids of a process group (zombies excluded)
+        :param pgid: Process group id
+        :type pgid: int
+        :return list
+        :rtype list
+        """
+
+        try:
+            os.killpg(pgid, 0)
+        except OSError as ex:
+            if ex.errno == errno.ESRCH:
+                return list()
+        return ProcInfo.get_group_pids(pgid)
+
+    @classmethod
+    def _group_wait(cls, pgid, timeout_ms):
+        """
+        Wait until a process group is gone (backoff polling)
+        :param pgid: Process group id
+        :type pgid: int
+        :param timeout_ms: Timeout in ms
+        :type timeout_ms: float
+        :return list (pids still alive, empty if gone)
+        :rtype list
+        """
+
+        ms_start = time.monotonic() * 1000.0
+        sleep_ms = ExitWaiter.POLL_FIRST_MS
+        while True:
+            pids = cls._get_group_pids(pgid)
+            elapsed_ms = time.monotonic() * 1000.0 - ms_start
+            if not pids or elapsed_ms >= timeout_ms:
+                return pids
+            time.sleep(min(sleep_ms, timeout_ms - elapsed_ms) / 1000.0)
+            sleep_ms = min(sleep_ms * 2, ExitWaiter.POLL_MAX_MS)
+
+    def _stop_wait(self, pid, phase, timeout_ms):
+        """
+        Stop escalation : wait for exit, and time the phase
+        :param pid: Pid
+        :type pid: int
+        :param phase: Phase name
+        :type phase: str
+        :param timeout_ms: Timeout in ms
+        :type timeout_ms: int
+        :return bool (exited)
+        :rtype bool
+        """
+
+        exited, ms = ExitWaiter.wait_exit(pid, timeout_ms)
+        group = list()
+        if exited:
+            # Process group (workers) : within the same phase timeout
+            t = time.monotonic()
+            group = self._group_wait(pid, max(0.0, timeout_ms - ms))
+            ms += (time.monotonic() - t) * 1000.0
+            exited = not group
+        self.stop_phases.append({"phase": phase, "exited": exited, "ms": ms, "group": group})
+        if not exited:
+            logger.warning("Stop : %s timeout=%s ms, pid=%s, group=%s", phase, timeout_ms, pid, group)
+        return exited
+
+    def start(self, cmd):
+        """
+        Start : run the daemon command line (start action), then wait until it is ready (control socket) or alive
+        :param cmd: Daemon command line, without action (it must use our pid file)
+        :type cmd: list
+        :return tuple (pid, ms) : pid None if not started within timeout
+        :rtype tuple
+        """
+
+        import subprocess
+        t = time.monotonic()
+        pid = self.get_running_pid()
+        if pid and self.is_running(pid):
+            raise Exception("Already running, pid=%s" % pid)
+
+        p = subprocess.run(list(cmd) + ["start"], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                           timeout=self.timeout_ms / 1000.0)
+        if p.returncode != 0:
+            raise Exception("Start failed, exit code=%s, stderr=%s" % (p.returncode, p.stderr.decode("utf-8", "replace")[-512:]))
+
+        # Launcher exits after first fork : wait for pid file, then readiness
+        sleep_sec = 0.001
+        while (time.monotonic() - t) * 1000.0 < self.timeout_ms:
+            pid = self.get_running_pid()
+            if pid and self.is_running(pid):
+                resp = self.request("status")
+                if not resp or resp["code"] != 0 or resp["result"].get("ready"):
+                    return pid, (time.monotonic() - t) * 1000.0
+            time.sleep(sleep_sec)
+            sleep_sec = min(sleep_sec * 2, 0.05)
+        return None, None
+
+    def status(self, detailed=False):
+        """
+        Status : signal 0, fingerprint or pid file lock check (is_running), then control socket "status" (no _on_status).
+        Detailed : control socket "status" firing _on_status (or SIGUSR2).
+        :param detailed: Detailed status (fires _on_status in the daemon)
+        :type detailed: bool
+        :return tuple (exit code, pid, status dict or None)
+        :rtype tuple
+        """
+
+        pid = self.get_running_pid()
+        if not pid:
+            return DaemonCtl.EXIT_NOT_RUNNING, None, None
+        if not self.is_running(pid):
+            return DaemonCtl.EXIT_DEAD_PIDFILE, pid, None
+
+        resp = self.request("status", {"detailed": True} if detailed else None)
+        if resp and resp["code"] == 0:
+            return DaemonCtl.EXIT_OK, pid, resp["result"]
+        elif resp:
+            return DaemonCtl.EXIT_UNKNOWN, pid, resp
+
+        if detailed:
+            try:
+                os.kill(pid, SIGUSR2)
+            except OSError as ex:
+                if ex.errno == errno.ESRCH:
+                    return DaemonCtl.EXIT_DEAD_PIDFILE, pid, None
+        return DaemonCtl.EXIT_OK, pid, None
+
+    def reload(self):
+        """
+        Reload : control socket "reload" (or SIGUSR1)
+        :return tuple (exit code, pid, response dict or None)
+        :rtype tuple
+        """
+        return self._command_or_signal("reload", SIGUSR1)
+
+    def reopen(self):
+        """
+        Reopen std redirect targets and log file : control socket "reopen" (or reopen_signal)
+        :return tuple (exit code, pid, response dict or None)
+        :rtype tuple
+        """
+        return self._command_or_signal("reopen", self.reopen_signal)
+
+    def _command_or_signal(self, cmd, sig):
+        """
+        Send a control command, falling back to a signal if the control socket is not available
+        :param cmd: Command
+        :type cmd: str
+        :param sig: Signal
+        :type sig: int
+        :return tuple (exit code, pid, response dict or None)
+        :rtype tuple
+        """
+
+        pid = self.get_running_pid()
+        if not pid:
+            return DaemonCtl.EXIT_NOT_RUNNING, None, None
+
+        resp = self.request(cmd)
+        if resp and resp["code"] == 0:
+            return DaemonCtl.EXIT_OK, pid, resp
+        elif resp:
+            return DaemonCtl.EXIT_FAILED, pid, resp
+
+        if not self.is_running(pid):
+            return DaemonCtl.EXIT_FAILED, pid, None
+        try:
+            os.kill(pid, sig)
+        except OSError as ex:
+            if ex.errno == errno.ESRCH:
+                return DaemonCtl.EXIT_FAILED, pid, None
+        return DaemonCtl.EXIT_OK, pid, None
+
+    def probe(self):
+        """
+        Probe the instance, without side effect on it (no signal, control socket status only)
+        :return dict (pidfile, pid, alive, locked, state, ready, uptime_ms, rss_bytes, fds, proc_state)
+        :rtype dict
+        """
+
+        d = {"pidfile": self.pidfile, "pid": None, "alive": False, "locked": None, "state": "stopped", "ready": None,
+             "uptime_ms": None, "rss_bytes": None, "fds": None, "proc_state": None}
+        try:
+            pid = self.get_running_pid()
+        except ValueError:
+            d["state"] = "invalid"
+            return d
+        if not pid:
+            return d
+        d["pid"] = pid
+
+        d["locked"] = self.is_locked()
+        d["alive"] = self.is_running(pid)
+        if not d["alive"]:
+            d["state"] = "dead"
+            return d
+        d["uptime_ms"] = ProcInfo.get_uptime_ms(pid)
+        d["rss_bytes"] = ProcInfo.get_rss_bytes(pid)
+        d["fds"] = ProcInfo.get_fd_count(pid)
+        d["proc_state"] = ProcInfo.get_state(pid)
+
+        # Readiness (control socket)
+        d["state"] = "running"
+        resp = self.request("status")
+        if resp and resp["code"] == 0:
+            d["ready"] = resp["result"].get("ready")
+            if not d["ready"]:
+                d["state"] = "starting"
+        return d
+
+    @classmethod
+    def find_pidfiles(cls, pattern):
+        """
+        Find pid files from a glob, or a directory (*.pid inside)
+        :param pattern: Glob or directory
+        :type pattern: str
+        :return list
+        :rtype list
+        """
+
+        import glob
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.pid")
+        return sorted(glob.glob(pattern))
+
+    @classmethod
+    def run_many(cls, pidfiles, fn, concurrency=32):
+        """
+        Run fn(pidfile) for each pid file, concurrently (threads), results in pid files order
+        :param pidfiles: Pid files
+        :type pidfiles: list
+        :param fn: Callable(pidfile)
+        :type fn: callable
+        :param concurrency: Max concurrent calls
+        :type concurrency: int
+        :return list
+        :rtype list
+        """
+
+        if not pidfiles:
+            return list()
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pidfiles)))) as pool:
+            return list(pool.map(fn, pidfiles))
+
+    @classmethod
+    def group(cls, action, instances, timeout_ms=15000, control_enabled=True, concurrency=32, stop_quit_ms=0, stop_kill=True, stop_kill_ms=5000):
+        """
+        Run an action over many instances, in parallel
+        :param action: Action (start, stop, reload, reopen, status)
+        :type action: str
+        :param instances: List of dict {"pidfile": str, "cmd": list (start only)}
+        :type instances: list
+        :param timeout_ms: Timeout in ms (per instance)
+        :type timeout_ms: int
+        :param control_enabled: Use the control socket
+        :type control_enabled: bool
+        :param concurrency: Max concurrent actions
+        :type concurrency: int
+        :param stop_quit_ms: Stop escalation, see constructor
+        :type stop_quit_ms: int
+        :param stop_kill: Stop escalation, see constructor
+        :type stop_kill: bool
+        :param stop_kill_ms: Stop escalation, see constructor
+        :type stop_kill_ms: int
+        :return tuple (list of per instance dict {pidfile, action, ok, pid, ms, error}, total elapsed ms)
+        :rtype tuple
+        """
+
+        def _run(inst):
+            t = time.monotonic()
+            d = {"pidfile": inst["pidfile"], "action": action, "ok": False, "pid": None, "ms": None, "error": None}
+            try:
+                ctl = DaemonCtl(inst["pidfile"], timeout_ms, control_enabled,
+                                stop_quit_ms=stop_quit_ms, stop_kill=stop_kill, stop_kill_ms=stop_kill_ms)
+                if action == "start":
+                    d["pid"], ms = ctl.start(inst["cmd"])
+                    d["ok"] = ms is not None
+                elif action == "stop":
+                    d["pid"], ms = ctl.stop()
+                    d["ok"] = d["pid"] is None or ms is not None
+                    d["phases"] = ctl.stop_phases
+                elif action == "status":
+                    code, d["pid"], _ = ctl.status()
+                    d["ok"] = code == DaemonCtl.EXIT_OK
+                else:
+                    code, d["pid"], _ = ctl.reload() if action == "reload" else ctl.reopen()
+                    d["ok"] = code == DaemonCtl.EXIT_OK
+            except Exception as ex:
+                d["error"] = str(ex)
+            d["ms"] = (time.monotonic() - t) * 1000.0
+            return d
+
+        t_start = time.monotonic()
+        ar = cls.run_many(instances, _run, concurrency)
+        return ar, (time.monotonic() - t_start) * 1000.0
+
+    @classmethod
+    def load_instances(cls, path):
+        """
+        Load instances definitions (json list of {"pidfile": str, "cmd": list})
+        :param path: File path
+        :type path: str
+        :return list
+        :rtype list
+        """
+
+        with open(path, "r") as f:
+            ar = json.load(f)
+        for inst in ar:
+            if not inst.get("pidfile"):
+                raise ValueError("Instance without pidfile, instance=%s" % inst)
+        return ar
+
+    @classmethod
+    def batch_status(cls, pidfiles, timeout_ms=15000, control_enabled=True, concurrency=32):
+        """
+        Probe many instances concurrently
+        :param pidfiles: Pid files
+        :type pidfiles: list
+        :param timeout_ms: Timeout in ms (per instance)
+        :type timeout_ms: int
+        :param control_enabled: Use the control socket
+        :type control_enabled: bool
+        :param concurrency: Max concurrent probes
+        :type concurrency: int
+        :return list (probe dicts, pid files order)
+        :rtype list
+        """
+        return cls.run_many(pidfiles, lambda pf: DaemonCtl(pf, timeout_ms, control_enabled).probe(), concurrency)
+
+    # ===============================================
+    # COMMAND LINE
+    # ===============================================
+
+    @classmethod
+    def parse_bool(cls, value):
+        """
+        Parse a boolean option value : "", 0, false, no, off (case insensitive) are False, anything else True
+        :param value: Value
+        :type value: str
+        :return bool
+        :rtype bool
+        """
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+
+    @classmethod
+    def parse_arguments(cls, argv):
+        """
+        Parse the command line (Daemon syntax, "-key=value" or "-key value", last positional is the action).
+        Unknown options (and their value) are ignored, so that the Daemon command line can be reused as is.
+        :param argv: Command line argv (argv[0] is the program name)
+        :type argv: list, tuple
+        :return dict
+        :rtype dict
+        """
+
+        d = {"pidfile": None, "pidfiles": None, "instances": None, "concurrency": 32, "timeoutms": 15000, "controlsocket": True,
+             "stopquitms": 0, "stopkill": True, "stopkillms": 5000, "detailed": False, "action": None}
+        i = 1
+        while i < len(argv):
+            arg = argv[i]
+            i += 1
+            if not arg.startswith("-"):
+                d["action"] = arg
+                continue
+            key, sep, value = arg[1:].partition("=")
+            if not sep:
+                # Daemon options always take a value, unknown ones included : consume it (it is not the action)
+                if i >= len(argv):
+                    raise ValueError("Missing value for option=%s" % arg)
+                value = argv[i]
+                i += 1
+            if key not in d:
+                continue
+            if key in ("timeoutms", "concurrency", "stopquitms", "stopkillms"):
+                d[key] = int(value)
+            elif key in ("controlsocket", "stopkill", "detailed"):
+                d[key] = cls.parse_bool(value)
+            else:
+                d[key] = value
+        return d
+
+    @classmethod
+    def main(cls, argv):
+        """
+        Fast path command line : run an action and print a json line to stdout
+        :param argv: Command line argv
+        :type argv: list, tuple
+        :return int (exit code)
+        :rtype int
+        """
+
+        try:
+            d = cls.parse_arguments(argv)
+        except ValueError as ex:
+            sys.stderr.write("%s\n" % ex)
+            return DaemonCtl.EXIT_FAILED
+        if d["pidfiles"] and d["action"] == "status":
+            return cls._main_batch_status(d)
+        if (d["pidfiles"] or d["instances"]) and d["action"] in DaemonCtl.ACTIONS + ("start",):
+            return cls._main_group(d)
+        if not d["pidfile"] or d["action"] not in DaemonCtl.ACTIONS:
+            sys.stderr.write("usage: %s -pidfile filename [-timeoutms int] [-controlsocket bool] [-stopquitms int] [-stopkill bool] [-stopkillms int] [-detailed bool] %s\n" % (argv[0], "|".join(DaemonCtl.ACTIONS)))
+            sys.stderr.write("usage: %s -pidfiles glob|directory [-concurrency int] [-timeoutms int] [-controlsocket bool] %s\n" % (argv[0], "|".join(DaemonCtl.ACTIONS)))
+            sys.stderr.write("usage: %s -instances file [-concurrency int] [-timeoutms int] [-controlsocket bool] start|%s\n" % (argv[0], "|".join(DaemonCtl.ACTIONS)))
+            return DaemonCtl.EXIT_FAILED
+
+        ctl = DaemonCtl(d["pidfile"], d["timeoutms"], d["controlsocket"],
+                        stop_quit_ms=d["stopquitms"], stop_kill=d["stopkill"], stop_kill_ms=d["stopkillms"])
+        out = {"action": d["action"], "pidfile": d["pidfile"]}
+        if d["action"] == "stop":
+            pid, ms = ctl.stop()
+            code = DaemonCtl.EXIT_OK if pid is None or ms is not None else DaemonCtl.EXIT_FAILED
+            out.update({"pid": pid, "ms": ms, "phases": ctl.stop_phases})
+        elif d["action"] == "status":
+            code, pid, result = ctl.status(d["detailed"])
+            out.update({"pid": pid, "status": result})
+        elif d["action"] == "reload":
+            code, pid, result = ctl.reload()
+            out.update({"pid": pid, "response": result})
+        else:
+            code, pid, result = ctl.reopen()
+            out.update({"pid": pid, "response": result})
+        out["code"] = code
+
+        sys.stdout.write(json.dumps(out) + "\n")
+        sys.stdout.flush()
+        return code
+
+    @classmethod
+    def _main_batch_status(cls, d):
+        """
+        Batch status : one json line per instance
+        :param d: Parsed arguments
+        :type d: dict
+        :return int (exit code : 0 all alive, 1 some not alive, 3 no pid file found)
+        :rtype int
+        """
+
+        pidfiles = cls.find_pidfiles(d["pidfiles"])
+        if not pidfiles:
+            return DaemonCtl.EXIT_NOT_RUNNING
+
+        ar = cls.batch_status(pidfiles, d["timeoutms"], d["controlsocket"], d["concurrency"])
+        sys.stdout.write("".join(json.dumps(r) + "\n" for r in ar))
+        sys.stdout.flush()
+        return DaemonCtl.EXIT_OK if all(r["alive"] for r in ar) else DaemonCtl.EXIT_DEAD_PIDFILE
+
+    @classmethod
+    def _main_group(cls, d):
+        """
+        Group action : one json line per instance, then a summary line
+        :param d: Parsed arguments
+        :type d: dict
+        :return int (exit code : 0 all succeeded, 2 otherwise)
+        :rtype int
+        """
+
+        if d["instances"]:
+            try:
+                instances = cls.load_instances(d["instances"])
+            except (IOError, ValueError) as ex:
+                sys.stderr.write("Invalid instances file=%s, ex=%s\n" % (d["instances"], ex))
+                return DaemonCtl.EXIT_FAILED
+        elif d["action"] == "start":
+            sys.stderr.write("start requires -instances (daemon command lines)\n")
+            return DaemonCtl.EXIT_FAILED
+        else:
+            instances = [{"pidfile": pf} for pf in cls.find_pidfiles(d["pidfiles"])]
+
+        ar, elapsed_ms = cls.group(d["action"], instances, d["timeoutms"], d["controlsocket"], d["concurrency"],
+                                   d["stopquitms"], d["stopkill"], d["stopkillms"])
+        ok_count = len([r for r in ar if r["ok"]])
+        summary = {"action": d["action"], "count": len(ar), "ok": ok_count, "failed": len(ar) - ok_count, "elapsed_ms": elapsed_ms}
+        sys.stdout.write("".join(json.dumps(r) + "\n" for r in ar) + json.dumps(summary) + "\n")
+        sys.stdout.flush()
+        return DaemonCtl.EXIT_OK if ok_count == len(ar) else DaemonCtl.EXIT_FAILED
+
+
+# ==========================
+# MAIN / COMMAND LINE INTERCEPTION
+# ==========================
+
+if __name__ == "__main__":
+    sys.exit(DaemonCtl.main(sys.argv))
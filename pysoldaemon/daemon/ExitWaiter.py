@@ -0,0 +1,138 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+
+import errno
+import logging
+import os
+import select
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ExitWaiter(object):
+    """
+    Wait for a (non child) process exit.
+    Event driven through pidfd_open + poll (linux >= 5.3, python >= 3.9), fallback to backoff polling.
+    """
+
+    # Backoff polling (fallback) : first and max sleep, ms
+    POLL_FIRST_MS = 1
+    POLL_MAX_MS = 50
+
+    @classmethod
+    def is_alive(cls, pid):
+        """
+        Check if a process is alive (signal 0, no side effect on target).
+        A zombie (exited, not yet reaped) is not alive.
+        :param pid: Pid
+        :type pid: int
+        :return bool
+        :rtype bool
+        """
+
+        try:
+            os.kill(pid, 0)
+        except OSError as ex:
+            if ex.errno == errno.ESRCH:
+                return False
+            # EPERM : exists, not ours
+
+        return not cls.is_zombie(pid)
+
+    @classmethod
+    def is_zombie(cls, pid):
+        """
+        Check if a process is a zombie (/proc/<pid>/stat state)
+        :param pid: Pid
+        :type pid: int
+        :return bool
+        :rtype bool
+        """
+
+        try:
+            with open("/proc/%d/stat" % pid, "rb") as f:
+                buf = f.read()
+        except (IOError, OSError):
+            return False
+        # Format : pid (comm) state ..., comm may contain spaces and parenthesis
+        return buf[buf.rfind(b")") + 2:][:1] in (b"Z", b"X")
+
+    @classmethod
+    def wait_exit(cls, pid, timeout_ms):
+        """
+        Wait for process exit
+        :param pid: Pid
+        :type pid: int
+        :param timeout_ms: Timeout in ms
+        :type timeout_ms: int
+        :return tuple (exited, elapsed ms)
+        :rtype tuple
+        """
+
+        ms_start = time.monotonic() * 1000.0
+
+        # Event driven
+        pidfd = cls._pidfd_open(pid)
+        if pidfd == -1:
+            return True, time.monotonic() * 1000.0 - ms_start
+        elif pidfd is not None:
+            try:
+                p = select.poll()
+                p.register(pidfd, select.POLLIN)
+                exited = len(p.poll(timeout_ms)) > 0
+                return exited, time.monotonic() * 1000.0 - ms_start
+            finally:
+                os.close(pidfd)
+
+        # Fallback : backoff polling
+        sleep_ms = cls.POLL_FIRST_MS
+        while True:
+            elapsed_ms = time.monotonic() * 1000.0 - ms_start
+            if not cls.is_alive(pid):
+                return True, elapsed_ms
+            if elapsed_ms >= timeout_ms:
+                return False, elapsed_ms
+            time.sleep(min(sleep_ms, timeout_ms - elapsed_ms) / 1000.0)
+            sleep_ms = min(sleep_ms * 2, cls.POLL_MAX_MS)
+
+    @classmethod
+    def _pidfd_open(cls, pid):
+        """
+        Open a pidfd
+        :param pid: Pid
+        :type pid: int
+        :return int (pidfd), -1 if process is gone, None if pidfd not supported
+        :rtype int,None
+        """
+
+        if not hasattr(os, "pidfd_open"):
+            return None
+        try:
+            return os.pidfd_open(pid)
+        except OSError as ex:
+            if ex.errno == errno.ESRCH:
+                return -1
+            logger.debug("pidfd_open not available, fallback to polling, ex=%s", ex)
+            return None
@@ -0,0 +1,197 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+from collections import deque
+
+import gevent
+from pysolbase.SolBase import SolBase
+
+logger = logging.getLogger(__name__)
+
+
+class FdCensus(object):
+    """
+    File descriptor census (gevent) : scans /proc/self/fd on a timer, classifies fds by type, and warns on :
+    - usage thresholds, as a percentage of the fd limit : once per crossing (re-armed when usage goes back below)
+    - growth rate, fds per minute over a sliding window : once per excursion (re-armed when the rate goes back below)
+    """
+
+    TYPES = ("socket", "pipe", "file", "eventfd", "anon", "other")
+
+    def __init__(self, limit, warn_pcts=(50, 80, 95), growth_per_min=0, interval_ms=10000, window=6):
+        """
+        Constructor
+        :param limit: Fd limit (soft RLIMIT_NOFILE)
+        :type limit: int
+        :param warn_pcts: Warning thresholds, percent of limit
+        :type warn_pcts: tuple,list
+        :param growth_per_min: Growth rate alert threshold, fds per minute (0 : disabled)
+        :type growth_per_min: int
+        :param interval_ms: Census interval, ms
+        :type interval_ms: int
+        :param window: Growth rate window, in censuses
+        :type window: int
+        """
+
+        self.limit = limit
+        self.warn_pcts = sorted(warn_pcts)
+        self.growth_per_min = growth_per_min
+        self._interval_ms = interval_ms
+        self._samples = deque(maxlen=max(2, window))
+
+        self._greenlet = None
+        self._level = 0
+        self._growth_armed = True
+        self.census = dict((t, 0) for t in self.TYPES)
+        self.total = 0
+        self.rate_per_min = 0.0
+        self.warn_count = 0
+        self.growth_count = 0
+
+    def start(self):
+        """
+        Start the census
+        """
+        self.stop()
+        self._greenlet = gevent.spawn(self._run)
+        logger.debug("Fd census started, limit=%s, warn_pcts=%s, growth_per_min=%s, interval_ms=%s", self.limit, self.warn_pcts, self.growth_per_min, self._interval_ms)
+
+    def stop(self):
+        """
+        Stop the census
+        """
+        if self._greenlet:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def get(self):
+        """
+        Get census state
+        :return dict
+        :rtype dict
+        """
+        return {
+            "total": self.total,
+            "limit": self.limit,
+            "pct": self.get_pct(),
+            "types": dict(self.census),
+            "rate_per_min": self.rate_per_min,
+            "warn_count": self.warn_count,
+            "growth_count": self.growth_count,
+        }
+
+    def get_pct(self):
+        """
+        Get usage, percent of limit
+        :return float
+        :rtype float
+        """
+        return round(self.total * 100.0 / self.limit, 2) if self.limit and self.limit > 0 else 0.0
+
+    @classmethod
+    def classify(cls, target):
+        """
+        Classify a fd, from its /proc/self/fd link target
+        :param target: Link target (ie "socket:[1234]", "pipe:[1234]", "anon_inode:[eventfd]", "/var/log/x.log")
+        :type target: str
+        :return str (one of TYPES)
+        :rtype str
+        """
+
+        if target.startswith("socket:"):
+            return "socket"
+        elif target.startswith("pipe:"):
+            return "pipe"
+        elif target.startswith("/"):
+            return "file"
+        elif target == "anon_inode:[eventfd]":
+            return "eventfd"
+        elif target.startswith("anon_inode:"):
+            return "anon"
+        return "other"
+
+    @classmethod
+    def scan(cls):
+        """
+        Scan /proc/self/fd
+        :return dict {type: count}
+        :rtype dict
+        """
+
+        d = dict((t, 0) for t in cls.TYPES)
+        for name in os.listdir("/proc/self/fd"):
+            try:
+                d[cls.classify(os.readlink("/proc/self/fd/" + name))] += 1
+            except OSError:
+                # Closed in between (the listdir fd itself, for instance)
+                continue
+        return d
+
+    def _run(self):
+        """
+        Census loop
+        """
+
+        while True:
+            try:
+                self.check()
+            except Exception as ex:
+                logger.warning("Fd census failed, ex=%s", SolBase.extostr(ex))
+            gevent.sleep(self._interval_ms / 1000.0)
+
+    def check(self):
+        """
+        Run a census, then check thresholds and growth rate
+        """
+
+        self.census = self.scan()
+        self.total = sum(self.census.values())
+        ms = SolBase.mscurrent()
+        self._samples.append((ms, self.total))
+
+        # Thresholds (highest crossed)
+        pct = self.get_pct()
+        level = 0
+        for p in self.warn_pcts:
+            if pct >= p:
+                level = p
+        if level > self._level:
+            self.warn_count += 1
+            logger.warning("Fd usage threshold crossed, threshold_pct=%s, pct=%s, total=%s, limit=%s, types=%s", level, pct, self.total, self.limit, self.census)
+        self._level = level
+
+        # Growth rate
+        first_ms, first_total = self._samples[0]
+        if ms > first_ms:
+            self.rate_per_min = round((self.total - first_total) * 60000.0 / (ms - first_ms), 2)
+        if not self.growth_per_min:
+            return
+        if self.rate_per_min < self.growth_per_min:
+            self._growth_armed = True
+        elif self._growth_armed and len(self._samples) == self._samples.maxlen:
+            self._growth_armed = False
+            self.growth_count += 1
+            logger.warning("Fd growth rate alert (leak ?), rate_per_min=%s, growth_per_min=%s, total=%s, limit=%s, types=%s",
+                           self.rate_per_min, self.growth_per_min, self.total, self.limit, self.census)
@@ -0,0 +1,166 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+import stat
+
+logger = logging.getLogger(__name__)
+
+
+class FdRotator(object):
+    """
+    Reopen / size rotate a file some fds are writing to, without copying it (no copytruncate).
+    The file is renamed (writers keep writing into it), then a new file is opened and dup2-ed over the fds :
+    the swap is atomic for writers, nothing is copied nor lost.
+    Only regular files are handled (/dev/null, sockets and so on are left alone).
+    """
+
+    def __init__(self, path, fds, max_bytes=0, backup_count=5):
+        """
+        Constructor
+        :param path: File path
+        :type path: str
+        :param fds: File descriptors writing to path (swapped on reopen)
+        :type fds: list
+        :param max_bytes: Rotate when the file reaches this size (0 : no size rotation)
+        :type max_bytes: int
+        :param backup_count: Rotated files kept (path.1 ... path.N)
+        :type backup_count: int
+        """
+
+        self.path = path
+        self.fds = list(fds)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.reopen_count = 0
+        self.rotate_count = 0
+
+    @classmethod
+    def is_regular_file(cls, path):
+        """
+        Check if a path is a regular file (or does not exist yet)
+        :param path: Path
+        :type path: str
+        :return bool
+        :rtype bool
+        """
+
+        try:
+            return stat.S_ISREG(os.stat(path).st_mode)
+        except FileNotFoundError:
+            return True
+
+    @classmethod
+    def is_writing_to(cls, fd, path):
+        """
+        Check if a fd is writing to path : a regular file, and the same one if path exists.
+        A fd left to something else (a journal stream socket in systemd mode, a tty...) must not be swapped.
+        :param fd: File descriptor
+        :type fd: int
+        :param path: Path
+        :type path: str
+        :return bool
+        :rtype bool
+        """
+
+        try:
+            st_fd = os.fstat(fd)
+        except OSError:
+            return False
+        if not stat.S_ISREG(st_fd.st_mode):
+            return False
+        try:
+            st_path = os.stat(path)
+        except FileNotFoundError:
+            return True
+        return (st_fd.st_dev, st_fd.st_ino) == (st_path.st_dev, st_path.st_ino)
+
+    def get_size(self):
+        """
+        Get the size of the file our fds are writing to
+        :return int
+        :rtype int
+        """
+        return os.fstat(self.fds[0]).st_size
+
+    def get(self):
+        """
+        Get state
+        :return dict
+        :rtype dict
+        """
+        return {
+            "path": self.path,
+            "fds": self.fds,
+            "size": self.get_size(),
+            "max_bytes": self.max_bytes,
+            "reopen_count": self.reopen_count,
+            "rotate_count": self.rotate_count,
+        }
+
+    def reopen(self):
+        """
+        Open path (created if required) and swap it over our fds (dup2, atomic)
+        """
+
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            for target_fd in self.fds:
+                os.dup2(fd, target_fd)
+        finally:
+            os.close(fd)
+        self.reopen_count += 1
+        logger.debug("Reopened, path=%s, fds=%s", self.path, self.fds)
+
+    def rotate(self):
+        """
+        Rotate : path.N-1 => path.N ... path => path.1, then reopen.
+        Writes issued in between go to path.1 (our fds still point to it until the swap).
+        """
+
+        if not os.path.exists(self.path):
+            pass
+        elif self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = "%s.%s" % (self.path, i)
+                if os.path.exists(src):
+                    os.rename(src, "%s.%s" % (self.path, i + 1))
+            os.rename(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+        self.reopen()
+        self.rotate_count += 1
+        logger.info("Rotated, path=%s, backup_count=%s", self.path, self.backup_count)
+
+    def check(self):
+        """
+        Rotate if the file reached max_bytes
+        :return bool (True if rotated)
+        :rtype bool
+        """
+
+        if not self.max_bytes or self.get_size() < self.max_bytes:
+            return False
+        self.rotate()
+        return True
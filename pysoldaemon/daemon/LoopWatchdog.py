@@ -0,0 +1,198 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import gc
+import logging
+import os
+import sys
+import time
+import traceback
+
+import gevent
+import greenlet
+from gevent import monkey
+
+logger = logging.getLogger(__name__)
+
+# Native primitives (the watchdog runs in a real thread, even if monkey patched)
+_start_new_thread = monkey.get_original("_thread", "start_new_thread")
+_get_ident = monkey.get_original("_thread", "get_ident")
+_sleep = monkey.get_original("time", "sleep")
+
+
+class LoopWatchdog(object):
+    """
+    Event loop stall watchdog.
+    A greenlet beats on a timer, a native thread checks the last beat : if the loop has not turned for stall_ms,
+    all thread and greenlet stacks are captured and written to stderr (lock free, the loop being blocked),
+    then logged once the loop turns again. Above kill_ms (if set), the process exits (os._exit(EXIT_CODE))
+    so that its supervisor restarts it.
+    """
+
+    EXIT_CODE = 70
+
+    def __init__(self, stall_ms=1000, kill_ms=0, beat_ms=100, on_kill=None):
+        """
+        Constructor
+        :param stall_ms: Stall threshold, ms
+        :type stall_ms: int
+        :param kill_ms: Self termination threshold, ms (0 : disabled)
+        :type kill_ms: int
+        :param beat_ms: Heartbeat interval, ms
+        :type beat_ms: int
+        :param on_kill: Callable(stall_ms), called from the watchdog thread instead of os._exit (tests)
+        :type on_kill: callable,None
+        """
+
+        self.stall_ms = stall_ms
+        self.kill_ms = kill_ms
+        self._beat_ms = beat_ms
+        self._on_kill = on_kill
+
+        self._greenlet = None
+        self._running = False
+        self._generation = 0
+        self._beat = time.monotonic()
+        self._stalled_beat = None
+        self._pending = None
+        self.stall_count = 0
+        self.stall_max_ms = 0.0
+        self.last_stall = None
+
+    def start(self):
+        """
+        Start (heartbeat greenlet and watchdog thread)
+        """
+
+        self.stop()
+        self._beat = time.monotonic()
+        self._running = True
+        self._generation += 1
+        self._greenlet = gevent.spawn(self._beat_run)
+        _start_new_thread(self._watch_run, (self._generation,))
+        logger.debug("Loop watchdog started, stall_ms=%s, kill_ms=%s, beat_ms=%s", self.stall_ms, self.kill_ms, self._beat_ms)
+
+    def stop(self):
+        """
+        Stop
+        """
+
+        self._running = False
+        if self._greenlet:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def get(self):
+        """
+        Get watchdog state
+        :return dict
+        :rtype dict
+        """
+        return {
+            "stall_ms": self.stall_ms,
+            "kill_ms": self.kill_ms,
+            "stall_count": self.stall_count,
+            "stall_max_ms": self.stall_max_ms,
+            "last_stall": self.last_stall,
+        }
+
+    def _beat_run(self):
+        """
+        Heartbeat (greenlet) : each turn proves the loop runs. Reports stalls detected meanwhile.
+        """
+
+        while True:
+            self._beat = time.monotonic()
+            pending = self._pending
+            if pending:
+                self._pending = None
+                pending["duration_ms"] = round(max(pending["duration_ms"], (self._beat - pending["beat"]) * 1000.0 - self._beat_ms), 3)
+                del pending["beat"]
+                self.last_stall = pending
+                self.stall_max_ms = max(self.stall_max_ms, pending["duration_ms"])
+                logger.warning("Event loop stalled, duration_ms=%s, stacks=\n%s", pending["duration_ms"], pending["stacks"])
+            gevent.sleep(self._beat_ms / 1000.0)
+
+    def _watch_run(self, generation):
+        """
+        Watchdog (native thread)
+        :param generation: Our generation (a restart makes older threads exit)
+        :type generation: int
+        """
+
+        interval = min(self._beat_ms, self.stall_ms) / 2000.0
+        while self._running and generation == self._generation:
+            _sleep(interval)
+            try:
+                self.check()
+            except Exception as ex:
+                # Nothing else is safe here
+                os.write(2, ("Loop watchdog check failed, ex=%s\n" % ex).encode("utf-8", "replace"))
+
+    def check(self):
+        """
+        Check the last heartbeat (watchdog thread)
+        """
+
+        beat = self._beat
+        stalled_ms = (time.monotonic() - beat) * 1000.0 - self._beat_ms
+        if stalled_ms < self.stall_ms:
+            return
+
+        # New stall : capture now (the blocking call is on the stack right now)
+        if self._stalled_beat != beat:
+            self._stalled_beat = beat
+            self.stall_count += 1
+            stacks = self.get_stacks()
+            self._pending = {"beat": beat, "duration_ms": round(stalled_ms, 3), "stacks": stacks}
+            os.write(2, ("Event loop stalled, pid=%s, stalled_ms=%.1f, stacks=\n%s\n" % (os.getpid(), stalled_ms, stacks)).encode("utf-8", "replace"))
+            return
+
+        # Still stalled : kill ?
+        if self.kill_ms and stalled_ms >= self.kill_ms:
+            os.write(2, ("Event loop stalled above kill_ms, exiting, pid=%s, stalled_ms=%.1f, kill_ms=%s\n" % (os.getpid(), stalled_ms, self.kill_ms)).encode("utf-8"))
+            if self._on_kill:
+                self._running = False
+                self._on_kill(stalled_ms)
+            else:
+                os._exit(self.EXIT_CODE)
+
+    @classmethod
+    def get_stacks(cls):
+        """
+        Get all thread stacks, and all greenlet stacks (the running one is the main thread stack)
+        :return str
+        :rtype str
+        """
+
+        me = _get_ident()
+        out = list()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            out.append("--- thread %s\n%s" % (ident, "".join(traceback.format_stack(frame))))
+        for o in gc.get_objects():
+            if not isinstance(o, greenlet.greenlet) or not o.gr_frame:
+                continue
+            out.append("--- greenlet %r\n%s" % (o, "".join(traceback.format_stack(o.gr_frame))))
+        return "".join(out)
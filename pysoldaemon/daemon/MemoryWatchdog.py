@@ -0,0 +1,188 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+
+import gevent
+from pysolbase.SolBase import SolBase
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryWatchdog(object):
+    """
+    Resident memory watchdog (gevent), checking rss on a timer against :
+    - a soft limit : on_soft callback, once per crossing (re-armed when rss goes back below)
+    - a hard limit : on_hard callback, once (re-armed by rearm_hard, if the callback could not recycle us)
+    A limit of 0 disables it.
+    """
+
+    def __init__(self, soft_bytes=0, hard_bytes=0, interval_ms=5000, on_soft=None, on_hard=None):
+        """
+        Constructor
+        :param soft_bytes: Soft limit, bytes (0 : disabled)
+        :type soft_bytes: int
+        :param hard_bytes: Hard limit, bytes (0 : disabled)
+        :type hard_bytes: int
+        :param interval_ms: Check interval, ms
+        :type interval_ms: int
+        :param on_soft: Callback(rss_bytes), soft limit crossed
+        :type on_soft: callable,None
+        :param on_hard: Callback(rss_bytes), hard limit crossed
+        :type on_hard: callable,None
+        """
+
+        self.soft_bytes = soft_bytes
+        self.hard_bytes = hard_bytes
+        self._interval_ms = interval_ms
+        self._on_soft = on_soft
+        self._on_hard = on_hard
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+        self._greenlet = None
+        self._soft_armed = True
+        self._hard_armed = True
+        self.rss_bytes = 0
+        self.soft_count = 0
+        self.hard_count = 0
+
+    def start(self):
+        """
+        Start checking
+        """
+        self.stop()
+        self._greenlet = gevent.spawn(self._run)
+        logger.debug("Memory watchdog started, soft_bytes=%s, hard_bytes=%s, interval_ms=%s", self.soft_bytes, self.hard_bytes, self._interval_ms)
+
+    def stop(self):
+        """
+        Stop checking
+        """
+        if self._greenlet:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def rearm_hard(self):
+        """
+        Re-arm the hard limit (next check above it will call on_hard again)
+        """
+        self._hard_armed = True
+
+    def get(self):
+        """
+        Get watchdog state
+        :return dict
+        :rtype dict
+        """
+        return {
+            "rss_bytes": self.rss_bytes,
+            "soft_bytes": self.soft_bytes,
+            "hard_bytes": self.hard_bytes,
+            "soft_count": self.soft_count,
+            "hard_count": self.hard_count,
+        }
+
+    def get_rss(self):
+        """
+        Get our resident set size
+        :return int
+        :rtype int
+        """
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * self._page_size
+
+    @classmethod
+    def get_page_split(cls, pid="self"):
+        """
+        Get the shared / private split of a process resident pages (bytes), from /proc/<pid>/smaps_rollup (or smaps).
+        Shared pages are the ones still shared with a parent or children (copy on write not triggered yet).
+        :param pid: Pid ("self" for us)
+        :type pid: int,str
+        :return dict (rss, pss, shared_clean, shared_dirty, private_clean, private_dirty, shared, private), None if not available
+        :rtype dict,None
+        """
+
+        keys = {
+            "Rss:": "rss",
+            "Pss:": "pss",
+            "Shared_Clean:": "shared_clean",
+            "Shared_Dirty:": "shared_dirty",
+            "Private_Clean:": "private_clean",
+            "Private_Dirty:": "private_dirty",
+        }
+        d = dict((k, 0) for k in keys.values())
+        for name in ["smaps_rollup", "smaps"]:
+            try:
+                with open("/proc/%s/%s" % (pid, name), "r") as f:
+                    for line in f:
+                        ar = line.split()
+                        k = keys.get(ar[0])
+                        if k:
+                            d[k] += int(ar[1]) * 1024
+                break
+            except IOError:
+                continue
+        else:
+            return None
+        d["shared"] = d["shared_clean"] + d["shared_dirty"]
+        d["private"] = d["private_clean"] + d["private_dirty"]
+        return d
+
+    def _run(self):
+        """
+        Check loop
+        """
+
+        while True:
+            gevent.sleep(self._interval_ms / 1000.0)
+            try:
+                self.check()
+            except Exception as ex:
+                logger.warning("Memory check failed, ex=%s", SolBase.extostr(ex))
+
+    def check(self):
+        """
+        Check rss against limits, and fire callbacks
+        """
+
+        self.rss_bytes = self.get_rss()
+
+        # Soft
+        if self.soft_bytes:
+            if self.rss_bytes < self.soft_bytes:
+                self._soft_armed = True
+            elif self._soft_armed:
+                self._soft_armed = False
+                self.soft_count += 1
+                logger.warning("Memory soft limit crossed, rss_bytes=%s, soft_bytes=%s", self.rss_bytes, self.soft_bytes)
+                if self._on_soft:
+                    self._on_soft(self.rss_bytes)
+
+        # Hard
+        if self.hard_bytes and self.rss_bytes >= self.hard_bytes and self._hard_armed:
+            self._hard_armed = False
+            self.hard_count += 1
+            logger.warning("Memory hard limit crossed, rss_bytes=%s, hard_bytes=%s", self.rss_bytes, self.hard_bytes)
+            if self._on_hard:
+                self._on_hard(self.rss_bytes)
@@ -0,0 +1,193 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+
+import gc
+import logging
+import os
+import time
+
+import gevent
+from greenlet import greenlet
+from pysolbase.SolBase import SolBase
+
+try:
+    import resource
+except Exception as e:
+    print("Possible windows, ex=" + str(e))
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsCollector(object):
+    """
+    Runtime metrics collector (gevent), sampling on a timer :
+    - hub loop lag (last and max over the sampling window), from a periodic probe
+    - live greenlets count (gc walk, so only every greenlet_every samples)
+    - rss / vms, cpu time and cpu percent
+    - open fds, against the fd limit
+    Warnings are logged on loop lag threshold (fd usage thresholds are FdCensus ones), and metrics are logged periodically.
+    """
+
+    def __init__(self, interval_ms=10000, log_interval_ms=60000, fd_limit=None,
+                 lag_probe_ms=250, lag_warn_ms=500, greenlet_every=6):
+        """
+        Constructor
+        :param interval_ms: Sampling interval, ms
+        :type interval_ms: int
+        :param log_interval_ms: Log interval, ms (0 : no periodic log)
+        :type log_interval_ms: int
+        :param fd_limit: Open files limit (None : RLIMIT_NOFILE soft limit)
+        :type fd_limit: int,None
+        :param lag_probe_ms: Loop lag probe interval, ms
+        :type lag_probe_ms: int
+        :param lag_warn_ms: Loop lag warning threshold, ms
+        :type lag_warn_ms: int
+        :param greenlet_every: Count greenlets every this number of samples
+        :type greenlet_every: int
+        """
+
+        self._interval_ms = interval_ms
+        self._log_interval_ms = log_interval_ms
+        self._fd_limit = fd_limit
+        self._lag_probe_ms = lag_probe_ms
+        self._lag_warn_ms = lag_warn_ms
+        self._greenlet_every = greenlet_every
+
+        if self._fd_limit is None:
+            self._fd_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+        self._page_size = resource.getpagesize()
+        self._greenlet = None
+        self._metrics = dict()
+        self._sample_count = 0
+        self._greenlets = None
+        self._cpu_last = None
+
+    def start(self):
+        """
+        Start sampling
+        """
+        self.stop()
+        self._cpu_last = None
+        self._greenlet = gevent.spawn(self._run)
+        logger.debug("Metrics started, interval_ms=%s, log_interval_ms=%s, fd_limit=%s", self._interval_ms, self._log_interval_ms, self._fd_limit)
+
+    def stop(self):
+        """
+        Stop sampling
+        """
+        if self._greenlet:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def get(self):
+        """
+        Get last sampled metrics
+        :return dict
+        :rtype dict
+        """
+        return dict(self._metrics)
+
+    def _run(self):
+        """
+        Probe and sample loop
+        """
+
+        ms_sample = ms_log = SolBase.mscurrent()
+        lag_max_ms = 0.0
+        probe_sec = self._lag_probe_ms / 1000.0
+        while True:
+            # Loop lag probe
+            t = time.monotonic()
+            gevent.sleep(probe_sec)
+            lag_ms = max(0.0, (time.monotonic() - t - probe_sec) * 1000.0)
+            lag_max_ms = max(lag_max_ms, lag_ms)
+
+            # Sample
+            if SolBase.msdiff(ms_sample) < self._interval_ms:
+                continue
+            ms_sample = SolBase.mscurrent()
+            try:
+                self.sample(lag_ms, lag_max_ms)
+            except Exception as ex:
+                logger.warning("Metrics sampling failed, ex=%s", SolBase.extostr(ex))
+            lag_max_ms = 0.0
+
+            # Log
+            if self._log_interval_ms and SolBase.msdiff(ms_log) >= self._log_interval_ms:
+                ms_log = SolBase.mscurrent()
+                logger.info("Metrics, %s", ", ".join("%s=%s" % (k, v) for k, v in sorted(self._metrics.items())))
+
+    def sample(self, lag_ms=0.0, lag_max_ms=0.0):
+        """
+        Sample now
+        :param lag_ms: Last loop lag, ms
+        :type lag_ms: float
+        :param lag_max_ms: Max loop lag over the window, ms
+        :type lag_max_ms: float
+        :return dict
+        :rtype dict
+        """
+
+        d = dict()
+
+        # Loop
+        d["loop_lag_ms"] = round(lag_ms, 3)
+        d["loop_lag_max_ms"] = round(lag_max_ms, 3)
+
+        # Greenlets (gc walk, costly on large heaps)
+        if self._greenlets is None or self._sample_count % self._greenlet_every == 0:
+            self._greenlets = sum(1 for o in gc.get_objects() if isinstance(o, greenlet))
+        d["greenlets"] = self._greenlets
+        self._sample_count += 1
+
+        # Memory
+        with open("/proc/self/statm", "r") as f:
+            ar = f.read().split()
+        d["vms_bytes"] = int(ar[0]) * self._page_size
+        d["rss_bytes"] = int(ar[1]) * self._page_size
+
+        # Cpu
+        t = os.times()
+        cpu_sec = t.user + t.system
+        d["cpu_user_sec"] = t.user
+        d["cpu_system_sec"] = t.system
+        now = time.monotonic()
+        if self._cpu_last:
+            d["cpu_percent"] = round(100.0 * (cpu_sec - self._cpu_last[0]) / max(now - self._cpu_last[1], 0.001), 2)
+        else:
+            d["cpu_percent"] = 0.0
+        self._cpu_last = (cpu_sec, now)
+
+        # Fds
+        d["fds"] = len(os.listdir("/proc/self/fd")) - 1
+        d["fds_limit"] = self._fd_limit
+        d["fds_percent"] = round(100.0 * d["fds"] / self._fd_limit, 2) if self._fd_limit else 0.0
+
+        # Warnings
+        if lag_max_ms >= self._lag_warn_ms:
+            logger.warning("Loop lag above threshold, lag_max_ms=%s, threshold_ms=%s", d["loop_lag_max_ms"], self._lag_warn_ms)
+
+        self._metrics = d
+        return d
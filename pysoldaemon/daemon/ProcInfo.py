@@ -0,0 +1,230 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import os
+
+
+class ProcInfo(object):
+    """
+    Process information from /proc (linux), for any pid (not only us).
+    Standard library only. Methods return None when the information is not available (process gone, permission).
+    """
+
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+    @classmethod
+    def get_stat(cls, pid):
+        """
+        Get /proc/<pid>/stat fields, starting at field 3 (state) : the command name (field 2) may contain spaces
+        :param pid: Pid
+        :type pid: int
+        :return list,None
+        :rtype list,None
+        """
+
+        try:
+            with open("/proc/%s/stat" % pid, "rb") as f:
+                buf = f.read()
+        except (IOError, OSError):
+            return None
+        return buf[buf.rindex(b")") + 2:].decode("ascii").split()
+
+    @classmethod
+    def get_comm(cls, pid):
+        """
+        Get process command name (/proc/<pid>/stat field 2, executable name truncated to 15 chars)
+        :param pid: Pid
+        :type pid: int
+        :return str,None
+        :rtype str,None
+        """
+
+        try:
+            with open("/proc/%s/stat" % pid, "rb") as f:
+                buf = f.read()
+        except (IOError, OSError):
+            return None
+        return buf[buf.index(b"(") + 1:buf.rindex(b")")].decode("utf-8", "replace")
+
+    @classmethod
+    def get_exe(cls, pid):
+        """
+        Get process executable path (/proc/<pid>/exe, readable for our own processes only)
+        :param pid: Pid
+        :type pid: int
+        :return str,None
+        :rtype str,None
+        """
+
+        try:
+            return os.readlink("/proc/%s/exe" % pid)
+        except (IOError, OSError):
+            return None
+
+    @classmethod
+    def get_cmdline(cls, pid):
+        """
+        Get process command line arguments (/proc/<pid>/cmdline)
+        :param pid: Pid
+        :type pid: int
+        :return list,None
+        :rtype list,None
+        """
+
+        try:
+            with open("/proc/%s/cmdline" % pid, "rb") as f:
+                buf = f.read()
+        except (IOError, OSError):
+            return None
+        return buf.decode("utf-8", "replace").split("\0")[:-1]
+
+    @classmethod
+    def get_fingerprint(cls, pid):
+        """
+        Get process fingerprint : pid, start time (clock ticks since boot), command name and executable.
+        A pid reused by another process has another start time.
+        :param pid: Pid
+        :type pid: int
+        :return dict,None
+        :rtype dict,None
+        """
+
+        ticks = cls.get_start_ticks(pid)
+        if ticks is None:
+            return None
+        return {"pid": pid, "start_ticks": ticks, "comm": cls.get_comm(pid), "exe": cls.get_exe(pid)}
+
+    @classmethod
+    def is_same_process(cls, fingerprint, pid):
+        """
+        Check if a running pid is the process a fingerprint was taken from.
+        Fields not available on one side (exe of a process not ours) are not compared.
+        :param fingerprint: Fingerprint (get_fingerprint)
+        :type fingerprint: dict
+        :param pid: Pid
+        :type pid: int
+        :return bool
+        :rtype bool
+        """
+
+        cur = cls.get_fingerprint(pid)
+        if cur is None or fingerprint.get("pid") != pid:
+            return False
+        for key in ("start_ticks", "comm", "exe"):
+            if fingerprint.get(key) is not None and cur[key] is not None and fingerprint[key] != cur[key]:
+                return False
+        return True
+
+    @classmethod
+    def get_group_pids(cls, pgid):
+        """
+        Get the pids of a process group, zombies excluded
+        :param pgid: Process group id
+        :type pgid: int
+        :return list
+        :rtype list
+        """
+
+        out = list()
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            ar = cls.get_stat(name)
+            if ar and int(ar[2]) == pgid and ar[0] not in ("Z", "X"):
+                out.append(int(name))
+        return out
+
+    @classmethod
+    def get_state(cls, pid):
+        """
+        Get process state letter (R, S, D, Z, T...)
+        :param pid: Pid
+        :type pid: int
+        :return str,None
+        :rtype str,None
+        """
+
+        ar = cls.get_stat(pid)
+        return ar[0] if ar else None
+
+    @classmethod
+    def get_start_ticks(cls, pid):
+        """
+        Get process start time, in clock ticks since boot (field 22)
+        :param pid: Pid
+        :type pid: int
+        :return int,None
+        :rtype int,None
+        """
+
+        ar = cls.get_stat(pid)
+        return int(ar[19]) if ar else None
+
+    @classmethod
+    def get_uptime_ms(cls, pid):
+        """
+        Get process uptime
+        :param pid: Pid
+        :type pid: int
+        :return float,None
+        :rtype float,None
+        """
+
+        ticks = cls.get_start_ticks(pid)
+        if ticks is None:
+            return None
+        with open("/proc/uptime", "r") as f:
+            boot_sec = float(f.read().split()[0])
+        return max(0.0, (boot_sec - float(ticks) / cls._CLK_TCK) * 1000.0)
+
+    @classmethod
+    def get_rss_bytes(cls, pid):
+        """
+        Get process resident set size
+        :param pid: Pid
+        :type pid: int
+        :return int,None
+        :rtype int,None
+        """
+
+        try:
+            with open("/proc/%s/statm" % pid, "r") as f:
+                return int(f.read().split()[1]) * cls._PAGE_SIZE
+        except (IOError, OSError):
+            return None
+
+    @classmethod
+    def get_fd_count(cls, pid):
+        """
+        Get process open fds count
+        :param pid: Pid
+        :type pid: int
+        :return int,None
+        :rtype int,None
+        """
+
+        try:
+            return len(os.listdir("/proc/%s/fd" % pid))
+        except (IOError, OSError):
+            return None
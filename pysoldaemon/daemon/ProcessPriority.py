@@ -0,0 +1,250 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import ctypes
+import logging
+import os
+import platform
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessPriority(object):
+    """
+    Process placement and priority : cpu affinity, scheduling policy, nice, io priority (ioprio_set) and oom_score_adj.
+    Linux only. Each control is independent : a failure is logged and reported, it does not abort the others.
+    Affinity, policy, nice and io priority are per thread on linux : they are applied to all our threads (/proc/self/task),
+    threads started later inherit them from their creator.
+    """
+
+    POLICIES = {
+        "other": os.SCHED_OTHER,
+        "batch": os.SCHED_BATCH,
+        "idle": os.SCHED_IDLE,
+    }
+
+    # ioprio classes (linux/ioprio.h)
+    IO_CLASSES = {"none": 0, "rt": 1, "be": 2, "idle": 3}
+    IOPRIO_CLASS_SHIFT = 13
+    IOPRIO_WHO_PROCESS = 1
+
+    # ioprio_set / ioprio_get syscall numbers, per machine
+    IOPRIO_SYSCALLS = {
+        "x86_64": (251, 252),
+        "aarch64": (30, 31),
+        "i386": (289, 290),
+        "i686": (289, 290),
+    }
+
+    OOM_SCORE_ADJ = "/proc/self/oom_score_adj"
+    TASKS = "/proc/self/task"
+
+    @classmethod
+    def parse_cpus(cls, cpus):
+        """
+        Parse a cpu list
+        :param cpus: str ("0-3,6"), or iterable of int
+        :type cpus: str,list,set
+        :return set of int
+        :rtype set
+        """
+
+        if not isinstance(cpus, str):
+            return set(int(c) for c in cpus)
+        out = set()
+        for item in cpus.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            lo, sep, hi = item.partition("-")
+            if sep:
+                out.update(range(int(lo), int(hi) + 1))
+            else:
+                out.add(int(lo))
+        if not out:
+            raise ValueError("Empty cpu list")
+        return out
+
+    @classmethod
+    def parse_ionice(cls, ionice):
+        """
+        Parse an io priority
+        :param ionice: str "class[:level]", class being rt, be, idle or none, level 0 (highest) to 7 (ie "be:4", "idle")
+        :type ionice: str
+        :return tuple (class, level)
+        :rtype tuple
+        """
+
+        name, _, level = ionice.strip().lower().partition(":")
+        if name not in cls.IO_CLASSES:
+            raise ValueError("Unknown io class=%s, allowed=%s" % (name, sorted(cls.IO_CLASSES)))
+        level = int(level) if level else 0
+        if not 0 <= level <= 7:
+            raise ValueError("Invalid io level=%s, expecting 0..7" % level)
+        return cls.IO_CLASSES[name], level
+
+    @classmethod
+    def _ioprio_syscall(cls, idx, *args):
+        """
+        ioprio_set (idx 0) / ioprio_get (idx 1) syscall
+        :return int
+        :rtype int
+        """
+
+        nrs = cls.IOPRIO_SYSCALLS.get(platform.machine())
+        if not nrs:
+            raise OSError("ioprio not supported on machine=%s" % platform.machine())
+        libc = ctypes.CDLL(None, use_errno=True)
+        r = libc.syscall(nrs[idx], *args)
+        if r < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        return r
+
+    @classmethod
+    def set_ionice(cls, io_class, level, tid=0):
+        """
+        Set our io priority
+        :param io_class: Class (IO_CLASSES values)
+        :type io_class: int
+        :param level: Level (0..7)
+        :type level: int
+        :param tid: Thread id (0 : calling thread)
+        :type tid: int
+        """
+        cls._ioprio_syscall(0, cls.IOPRIO_WHO_PROCESS, tid, (io_class << cls.IOPRIO_CLASS_SHIFT) | level)
+
+    @classmethod
+    def get_tids(cls):
+        """
+        Get our thread ids
+        :return list of int ([0] : calling thread, if /proc is not available)
+        :rtype list
+        """
+
+        try:
+            return sorted(int(name) for name in os.listdir(cls.TASKS))
+        except OSError:
+            return [0]
+
+    @classmethod
+    def get_ionice(cls):
+        """
+        Get our io priority
+        :return str "class:level"
+        :rtype str
+        """
+
+        v = cls._ioprio_syscall(1, cls.IOPRIO_WHO_PROCESS, 0)
+        names = dict((c, n) for n, c in cls.IO_CLASSES.items())
+        return "%s:%s" % (names.get(v >> cls.IOPRIO_CLASS_SHIFT, "unknown"), v & ((1 << cls.IOPRIO_CLASS_SHIFT) - 1))
+
+    @classmethod
+    def set_oom_score_adj(cls, value):
+        """
+        Set our oom_score_adj (-1000 : never killed, 1000 : killed first). Lowering it requires privileges.
+        :param value: int
+        :type value: int
+        """
+
+        with open(cls.OOM_SCORE_ADJ, "w") as f:
+            f.write(str(value))
+
+    @classmethod
+    def get_oom_score_adj(cls):
+        """
+        Get our oom_score_adj
+        :return int
+        :rtype int
+        """
+
+        with open(cls.OOM_SCORE_ADJ, "r") as f:
+            return int(f.read().strip())
+
+    @classmethod
+    def apply(cls, cpus=None, policy=None, nice=None, ionice=None, oom_score_adj=None):
+        """
+        Apply controls to the current process (None : left alone)
+        :param cpus: Cpu affinity, str "0-3,6" or iterable of int
+        :type cpus: str,list,set,None
+        :param policy: Scheduling policy (other, batch, idle)
+        :type policy: str,None
+        :param nice: Nice value (absolute, -20..19)
+        :type nice: int,None
+        :param ionice: Io priority, str "class[:level]" (see parse_ionice)
+        :type ionice: str,None
+        :param oom_score_adj: oom_score_adj (-1000..1000)
+        :type oom_score_adj: int,None
+        :return dict {control: error str} for failed controls (empty : all applied)
+        :rtype dict
+        """
+
+        errors = dict()
+        # Per thread controls get (value, tid), oom_score_adj is per process
+        steps = [
+            ("cpus", cpus, True, lambda v, tid: os.sched_setaffinity(tid, cls.parse_cpus(v))),
+            ("policy", policy, True, lambda v, tid: os.sched_setscheduler(tid, cls.POLICIES[v.lower()], os.sched_param(0))),
+            ("nice", nice, True, lambda v, tid: os.setpriority(os.PRIO_PROCESS, tid, int(v))),
+            ("ionice", ionice, True, lambda v, tid: cls.set_ionice(*cls.parse_ionice(v), tid=tid)),
+            ("oom_score_adj", oom_score_adj, False, lambda v, tid: cls.set_oom_score_adj(int(v))),
+        ]
+        tids = cls.get_tids()
+        for name, value, per_thread, fn in steps:
+            if value is None:
+                continue
+            try:
+                for tid in tids if per_thread else [0]:
+                    try:
+                        fn(value, tid)
+                    except ProcessLookupError:
+                        # Thread gone meanwhile
+                        pass
+                logger.info("Applied, %s=%s, threads=%s", name, value, len(tids) if per_thread else None)
+            except (KeyError, ValueError, OSError) as ex:
+                logger.warning("Apply failed, %s=%s, ex=%s", name, value, ex)
+                errors[name] = str(ex)
+        return errors
+
+    @classmethod
+    def get(cls):
+        """
+        Get current controls
+        :return dict {cpus, policy, nice, ionice, oom_score_adj} (None if unavailable)
+        :rtype dict
+        """
+
+        d = dict()
+        getters = [
+            ("cpus", lambda: sorted(os.sched_getaffinity(0))),
+            ("policy", lambda: dict((v, n) for n, v in cls.POLICIES.items()).get(os.sched_getscheduler(0), str(os.sched_getscheduler(0)))),
+            ("nice", lambda: os.getpriority(os.PRIO_PROCESS, 0)),
+            ("ionice", cls.get_ionice),
+            ("oom_score_adj", cls.get_oom_score_adj),
+        ]
+        for name, fn in getters:
+            try:
+                d[name] = fn()
+            except (ValueError, OSError) as ex:
+                logger.debug("get failed, name=%s, ex=%s", name, ex)
+                d[name] = None
+        return d
@@ -0,0 +1,162 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import resource
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceLimits(object):
+    """
+    Declarative resource limits profile : {name: value}, name being nofile, nproc, core, memlock, stack or as.
+    A value is an int (soft = hard), a (soft, hard) tuple, or a string ("65536", "64m", "unlimited", "8m:unlimited" for soft:hard).
+    Sizes accept k, m, g suffixes (bytes), -1 or "unlimited" is RLIM_INFINITY.
+    Applied with graceful degradation : a value above the hard limit we cannot raise is lowered to it (no failure).
+    """
+
+    NAMES = {
+        "nofile": resource.RLIMIT_NOFILE,
+        "nproc": resource.RLIMIT_NPROC,
+        "core": resource.RLIMIT_CORE,
+        "memlock": resource.RLIMIT_MEMLOCK,
+        "stack": resource.RLIMIT_STACK,
+        "as": resource.RLIMIT_AS,
+    }
+
+    UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+    @classmethod
+    def parse_value(cls, value):
+        """
+        Parse a single limit value
+        :param value: int, or str ("65536", "64m", "unlimited")
+        :type value: int,str
+        :return int (RLIM_INFINITY for unlimited)
+        :rtype int
+        """
+
+        if isinstance(value, int):
+            return resource.RLIM_INFINITY if value < 0 else value
+        value = value.strip().lower()
+        if value in ("unlimited", "infinity", "-1"):
+            return resource.RLIM_INFINITY
+        if value and value[-1] in cls.UNITS:
+            return int(value[:-1]) * cls.UNITS[value[-1]]
+        return int(value)
+
+    @classmethod
+    def parse(cls, profile):
+        """
+        Parse a profile
+        :param profile: dict {name: value}, or str "name=value,name=soft:hard,..." (None or empty : nothing)
+        :type profile: dict,str,None
+        :return dict {name: (soft, hard)}
+        :rtype dict
+        """
+
+        if not profile:
+            return dict()
+        if isinstance(profile, str):
+            d = dict()
+            for item in profile.split(","):
+                if not item.strip():
+                    continue
+                k, sep, v = item.partition("=")
+                if not sep:
+                    raise ValueError("Invalid limit, expecting name=value, got=%s" % item)
+                d[k.strip()] = v
+            profile = d
+
+        out = dict()
+        for name, value in profile.items():
+            name = name.lower()
+            if name not in cls.NAMES:
+                raise ValueError("Unknown limit=%s, allowed=%s" % (name, sorted(cls.NAMES)))
+            if isinstance(value, str) and ":" in value:
+                value = tuple(value.split(":", 1))
+            if isinstance(value, (tuple, list)):
+                soft, hard = cls.parse_value(value[0]), cls.parse_value(value[1])
+            else:
+                soft = hard = cls.parse_value(value)
+            out[name] = (soft, hard)
+        return out
+
+    @classmethod
+    def _lower(cls, a, b):
+        """
+        Min of two limits, RLIM_INFINITY being the highest
+        """
+
+        if a == resource.RLIM_INFINITY:
+            return b
+        if b == resource.RLIM_INFINITY:
+            return a
+        return min(a, b)
+
+    @classmethod
+    def apply(cls, profile):
+        """
+        Apply a profile. Each limit is tried as requested, then degraded to the current hard limit if refused.
+        :param profile: Profile (see parse)
+        :type profile: dict,str,None
+        :return dict {name: {requested: [soft, hard], soft: int, hard: int, degraded: bool, error: str|None}}, effective values (-1 : unlimited)
+        :rtype dict
+        """
+
+        out = dict()
+        for name, (soft, hard) in cls.parse(profile).items():
+            res = cls.NAMES[name]
+            d = {"requested": [soft, hard], "degraded": False, "error": None}
+            try:
+                resource.setrlimit(res, (soft, hard))
+            except (ValueError, OSError) as ex:
+                # Degrade : we cannot go above the current hard limit (or above the kernel max, nr_open for nofile)
+                cur_hard = resource.getrlimit(res)[1]
+                d_hard = cls._lower(hard, cur_hard)
+                d_soft = cls._lower(soft, d_hard)
+                logger.warning("setrlimit refused, degrading to the hard limit, limit=%s, requested=%s, applying=%s, ex=%s",
+                               name, (soft, hard), (d_soft, d_hard), ex)
+                d["degraded"] = True
+                try:
+                    resource.setrlimit(res, (d_soft, d_hard))
+                except (ValueError, OSError) as ex2:
+                    logger.warning("setrlimit failed, keeping current, limit=%s, ex=%s", name, ex2)
+                    d["error"] = str(ex2)
+            d["soft"], d["hard"] = resource.getrlimit(res)
+            out[name] = d
+        return out
+
+    @classmethod
+    def get(cls):
+        """
+        Get all current limits
+        :return dict {name: {soft: int, hard: int}} (-1 : unlimited)
+        :rtype dict
+        """
+
+        out = dict()
+        for name, res in cls.NAMES.items():
+            soft, hard = resource.getrlimit(res)
+            out[name] = {"soft": soft, "hard": hard}
+        return out
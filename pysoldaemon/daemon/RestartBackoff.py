@@ -0,0 +1,143 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+import random
+import signal
+from collections import deque
+
+from pysolbase.SolBase import SolBase
+
+logger = logging.getLogger(__name__)
+
+
+class RestartBackoff(object):
+    """
+    Restart policy of a supervised child : exponential backoff with jitter, and a crash loop budget.
+    - delay : base_ms * 2^attempt, capped to max_ms, +/- jitter ratio. The attempt counter is reset once a child stayed alive reset_ms.
+    - budget : more than budget restarts within window_ms is a crash loop, we give up.
+    """
+
+    def __init__(self, base_ms=100, max_ms=30000, jitter=0.2, budget=10, window_ms=60000, reset_ms=10000):
+        """
+        Constructor
+        :param base_ms: First restart delay, ms
+        :type base_ms: int
+        :param max_ms: Max restart delay, ms
+        :type max_ms: int
+        :param jitter: Jitter ratio (0.2 : +/- 20%)
+        :type jitter: float
+        :param budget: Max restarts within window_ms (0 : unlimited)
+        :type budget: int
+        :param window_ms: Crash loop window, ms
+        :type window_ms: int
+        :param reset_ms: Alive time after which the backoff is reset, ms
+        :type reset_ms: int
+        """
+
+        self.base_ms = base_ms
+        self.max_ms = max_ms
+        self.jitter = jitter
+        self.budget = budget
+        self.window_ms = window_ms
+        self.reset_ms = reset_ms
+
+        self._restarts_ms = deque()
+        self.attempt = 0
+        self.restart_count = 0
+        self.last_reasons = deque(maxlen=5)
+        self.last_delay_ms = None
+        self.gave_up = False
+
+    @classmethod
+    def get_reason(cls, status):
+        """
+        Get a readable exit reason from a waitpid status
+        :param status: waitpid status (None : unknown)
+        :type status: int,None
+        :return str
+        :rtype str
+        """
+
+        if status is None:
+            return "unknown"
+        if os.WIFSIGNALED(status):
+            sig = os.WTERMSIG(status)
+            try:
+                return "signal %s (%s)" % (sig, signal.Signals(sig).name)
+            except ValueError:
+                return "signal %s" % sig
+        if os.WIFEXITED(status):
+            return "exit %s" % os.WEXITSTATUS(status)
+        return "status %s" % status
+
+    def on_exit(self, status, alive_ms):
+        """
+        A child exited : get the delay before restarting it
+        :param status: waitpid status
+        :type status: int,None
+        :param alive_ms: Time the child stayed alive, ms
+        :type alive_ms: float
+        :return float,None : delay in ms, None to give up (crash loop)
+        :rtype float,None
+        """
+
+        reason = self.get_reason(status)
+        now_ms = SolBase.mscurrent()
+        self.last_reasons.append({"reason": reason, "alive_ms": round(alive_ms, 1), "ms": now_ms})
+
+        # Stable for long enough : start over
+        if alive_ms >= self.reset_ms:
+            self.attempt = 0
+
+        # Budget
+        while self._restarts_ms and now_ms - self._restarts_ms[0] > self.window_ms:
+            self._restarts_ms.popleft()
+        if self.budget and len(self._restarts_ms) >= self.budget:
+            self.gave_up = True
+            logger.error("Crash loop, giving up, restarts=%s, window_ms=%s, reason=%s", len(self._restarts_ms), self.window_ms, reason)
+            return None
+        self._restarts_ms.append(now_ms)
+
+        # Delay
+        delay_ms = min(self.max_ms, self.base_ms * (2 ** min(self.attempt, 30)))
+        delay_ms *= 1.0 + random.uniform(-self.jitter, self.jitter)
+        self.attempt += 1
+        self.restart_count += 1
+        self.last_delay_ms = round(delay_ms, 1)
+        return delay_ms
+
+    def get(self):
+        """
+        Get state
+        :return dict
+        :rtype dict
+        """
+        return {
+            "restart_count": self.restart_count,
+            "attempt": self.attempt,
+            "last_delay_ms": self.last_delay_ms,
+            "last_reasons": list(self.last_reasons),
+            "gave_up": self.gave_up,
+        }
@@ -0,0 +1,217 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+
+import logging
+import os
+import sys
+from collections import defaultdict
+
+import greenlet
+from gevent import monkey
+from pysolbase.SolBase import SolBase
+
+logger = logging.getLogger(__name__)
+
+# Native primitives (the sampler runs in a real thread, even if monkey patched)
+_start_new_thread = monkey.get_original("_thread", "start_new_thread")
+_allocate_lock = monkey.get_original("_thread", "allocate_lock")
+_get_ident = monkey.get_original("_thread", "get_ident")
+_sleep = monkey.get_original("time", "sleep")
+
+
+class StackProfiler(object):
+    """
+    Low overhead sampling profiler, greenlet aware.
+    A native thread samples all thread stacks (sys._current_frames) at a fixed interval.
+    Main thread samples are tagged with the running greenlet (tracked through greenlet.settrace).
+    Output is a collapsed stack file (flamegraph.pl / speedscope compatible).
+    Modes :
+    - "wall" : all samples
+    - "cpu" : samples where the main thread idles in the gevent hub are skipped
+    """
+
+    def __init__(self, path, interval_ms=10, mode="wall", max_duration_ms=600000):
+        """
+        Constructor
+        :param path: Output file (collapsed stacks)
+        :type path: str
+        :param interval_ms: Sampling interval, ms
+        :type interval_ms: int
+        :param mode: "wall" or "cpu"
+        :type mode: str
+        :param max_duration_ms: Auto stop after this duration, ms (0 : never)
+        :type max_duration_ms: int
+        """
+
+        if mode not in ("wall", "cpu"):
+            raise Exception("Invalid mode=%s" % mode)
+
+        self.path = path
+        self._interval_ms = interval_ms
+        self._mode = mode
+        self._max_duration_ms = max_duration_ms
+
+        self._lock = _allocate_lock()
+        self._running = False
+        self._expired = False
+        self._stacks = defaultdict(int)
+        self._sample_count = 0
+        self._ms_start = None
+        self._main_ident = None
+        self._hub = None
+        self._current = None
+        self._previous_trace = None
+
+    @property
+    def is_running(self):
+        """
+        Running
+        :return bool
+        :rtype bool
+        """
+        return self._running
+
+    def start(self):
+        """
+        Start sampling (must be called from the main thread)
+        """
+
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._expired = False
+            self._stacks = defaultdict(int)
+            self._sample_count = 0
+            self._ms_start = SolBase.mscurrent()
+
+        # Greenlet tracking
+        from gevent import get_hub
+        self._hub = get_hub()
+        self._main_ident = _get_ident()
+        self._current = greenlet.getcurrent()
+        self._previous_trace = greenlet.settrace(self._trace)
+
+        _start_new_thread(self._run, ())
+        logger.info("Profiler started, path=%s, interval_ms=%s, mode=%s", self.path, self._interval_ms, self._mode)
+
+    def stop(self):
+        """
+        Stop sampling and write the collapsed stack file
+        :return dict (path, samples, duration_ms), None if not running
+        :rtype dict,None
+        """
+
+        with self._lock:
+            if not self._running:
+                return None
+            self._running = False
+            stacks = self._stacks
+            self._stacks = defaultdict(int)
+
+        # Restore trace (settrace is per thread : if not called from the main thread, _trace will do it)
+        if _get_ident() == self._main_ident:
+            greenlet.settrace(self._previous_trace)
+
+        # Write
+        tmp_file = self.path + ".tmp"
+        with open(tmp_file, "w") as f:
+            for k, v in sorted(stacks.items()):
+                f.write("%s %s\n" % (k, v))
+        os.rename(tmp_file, self.path)
+
+        d = {"path": self.path, "samples": self._sample_count, "stacks": len(stacks), "duration_ms": SolBase.msdiff(self._ms_start)}
+        logger.info("Profiler stopped, %s", d)
+        return d
+
+    def _trace(self, event, args):
+        """
+        Greenlet trace : track the running greenlet
+        """
+
+        if not self._running:
+            greenlet.settrace(self._previous_trace)
+        elif event in ("switch", "throw"):
+            self._current = args[1]
+        if self._previous_trace:
+            self._previous_trace(event, args)
+
+    def _run(self):
+        """
+        Sampler thread
+        """
+
+        interval_sec = self._interval_ms / 1000.0
+        while self._running:
+            _sleep(interval_sec)
+            with self._lock:
+                if not self._running:
+                    return
+                self._sample()
+                if self._max_duration_ms and SolBase.msdiff(self._ms_start) >= self._max_duration_ms:
+                    # Sampling ends here, stop (write, trace restore, logging) is handed to the hub thread
+                    self._expired = True
+                    break
+        if self._expired:
+            self._hub.loop.run_callback_threadsafe(self._stop_expired)
+
+    def _stop_expired(self):
+        """
+        Max duration reached (hub thread)
+        """
+
+        if self._expired and self._running:
+            logger.info("Profiler max duration reached, stopping")
+            self.stop()
+
+    def _sample(self):
+        """
+        Take a sample (lock held)
+        """
+
+        my_ident = _get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == my_ident:
+                continue
+
+            if ident == self._main_ident:
+                g = self._current
+                if g is self._hub:
+                    if self._mode == "cpu":
+                        continue
+                    root = "MainThread;hub"
+                else:
+                    root = "MainThread;%s" % (getattr(g, "name", None) or type(g).__name__)
+            else:
+                root = "thread-%s" % ident
+
+            ar = list()
+            while frame is not None:
+                code = frame.f_code
+                ar.append("%s (%s:%s)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            ar.append(root)
+            ar.reverse()
+            self._stacks[";".join(ar)] += 1
+        self._sample_count += 1
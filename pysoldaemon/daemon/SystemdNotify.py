@@ -0,0 +1,147 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+
+class SystemdNotify(object):
+    """
+    systemd notify protocol (sd_notify), without libsystemd : datagrams "KEY=value\\n..." sent to NOTIFY_SOCKET.
+    Disabled (no-op) if NOTIFY_SOCKET is not set.
+    """
+
+    ENV_NOTIFY_SOCKET = "NOTIFY_SOCKET"
+    ENV_WATCHDOG_USEC = "WATCHDOG_USEC"
+    ENV_WATCHDOG_PID = "WATCHDOG_PID"
+
+    def __init__(self, path=None, watchdog_usec=None, unset_environment=True):
+        """
+        Constructor
+        :param path: Notify socket path (default : NOTIFY_SOCKET, "@" prefix for abstract sockets)
+        :type path: str,None
+        :param watchdog_usec: Watchdog interval, usec (default : WATCHDOG_USEC, if WATCHDOG_PID is unset or us)
+        :type watchdog_usec: int,None
+        :param unset_environment: Remove the variables from our environment (not inherited by children)
+        :type unset_environment: bool
+        """
+
+        self.path = path if path is not None else os.environ.get(self.ENV_NOTIFY_SOCKET)
+        if watchdog_usec is None:
+            watchdog_pid = os.environ.get(self.ENV_WATCHDOG_PID)
+            if not watchdog_pid or int(watchdog_pid) == os.getpid():
+                watchdog_usec = int(os.environ.get(self.ENV_WATCHDOG_USEC, 0))
+        self.watchdog_usec = watchdog_usec or 0
+        if unset_environment:
+            for k in (self.ENV_NOTIFY_SOCKET, self.ENV_WATCHDOG_USEC, self.ENV_WATCHDOG_PID):
+                os.environ.pop(k, None)
+
+        self._socket = None
+        self.send_count = 0
+        self.error_count = 0
+
+    @property
+    def enabled(self):
+        """
+        Notify socket available
+        :return bool
+        :rtype bool
+        """
+        return bool(self.path)
+
+    def notify(self, **kwargs):
+        """
+        Send a notification, ie notify(READY=1, STATUS="serving"). No-op if disabled.
+        :return bool (sent)
+        :rtype bool
+        """
+
+        if not self.enabled:
+            return False
+        buf = "\n".join("%s=%s" % (k, v) for k, v in kwargs.items()).encode("utf-8")
+        addr = "\0" + self.path[1:] if self.path.startswith("@") else self.path
+        try:
+            if not self._socket:
+                self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC)
+            self._socket.sendto(buf, addr)
+            self.send_count += 1
+            return True
+        except (OSError, socket.error) as ex:
+            self.error_count += 1
+            logger.warning("Notify failed, path=%s, ex=%s", self.path, ex)
+            return False
+
+    def ready(self, status=None):
+        """
+        Notify READY=1 (with our pid, and an optional status)
+        :param status: Status line
+        :type status: str,None
+        :return bool
+        :rtype bool
+        """
+
+        if status is None:
+            return self.notify(READY=1, MAINPID=os.getpid())
+        return self.notify(READY=1, MAINPID=os.getpid(), STATUS=status)
+
+    def watchdog(self, status=None):
+        """
+        Notify WATCHDOG=1 (with an optional status)
+        :param status: Status line
+        :type status: str,None
+        :return bool
+        :rtype bool
+        """
+
+        if status is None:
+            return self.notify(WATCHDOG=1)
+        return self.notify(WATCHDOG=1, STATUS=status)
+
+    def status(self, status):
+        """
+        Notify STATUS=
+        :param status: Status line
+        :type status: str
+        :return bool
+        :rtype bool
+        """
+        return self.notify(STATUS=status)
+
+    def stopping(self):
+        """
+        Notify STOPPING=1
+        :return bool
+        :rtype bool
+        """
+        return self.notify(STOPPING=1)
+
+    def close(self):
+        """
+        Close our socket
+        """
+        if self._socket:
+            self._socket.close()
+            self._socket = None
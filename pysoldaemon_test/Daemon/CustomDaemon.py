@@ -27,6 +27,8 @@ from logging.handlers import SysLogHandler
 
 import os
 
+import gevent
+from gevent import monkey
 from gevent.event import Event
 from pysolbase.SolBase import SolBase
 
@@ -65,11 +67,19 @@ class CustomDaemon(Daemon):
         self.status_count = 0
         self.start_loop_exited = Event()
         self.last_action = "noaction"
+        self.listen_socket = None
+        self.preload_pid = 0
+        self.preload_data = None
+        self.job_done_count = 0
 
         # Base
         Daemon._internal_init(self, pidfile, stdin, stdout, stderr, logfile, loglevel, on_start_exit_zero, max_open_files, change_dir, timeout_ms,
                               logtosyslog, logtosyslog_facility, logtoconsole, app_name)
 
+        # In flight jobs (drained on stop)
+        self._control_register("job", self._control_job)
+        self._control_register("block", self._control_block)
+
         # Log
         logger.debug("Done, self.class=%s", SolBase.get_classname(self))
 
@@ -82,6 +92,25 @@ class CustomDaemon(Daemon):
         """
         return CustomDaemon()
 
+    @classmethod
+    def initialize_arguments_parser(cls):
+        """
+        Initialize the parser
+        :return ArgumentParser
+        :rtype ArgumentParser
+        """
+
+        arg_parser = Daemon.initialize_arguments_parser()
+        arg_parser.add_argument(
+            "-listenport",
+            metavar="listenport",
+            type=int,
+            default=0,
+            action="store",
+            help="test listening port (default 0 : any) [optional]"
+        )
+        return arg_parser
+
     def _write_state(self):
         """
         Write state
@@ -89,17 +118,30 @@ class CustomDaemon(Daemon):
         f = open(CustomDaemon.DAEMON_LAST_ACTION_FILE, "w")
         buf = "" \
               "pid={0}\nppid={1}\nis_running={2}\nstart_count={3}\nstop_count={4}\n" \
-              "reload_count={5}\nstatus_count={6}\nlast_action={7}\nstart_loop_exited={8}\n" \
+              "reload_count={5}\nstatus_count={6}\nlast_action={7}\nstart_loop_exited={8}\nlisten_port={9}\nlast_action_ms={10}\n" \
+              "preload_pid={11}\njob_done_count={12}\n" \
             .format(os.getpid(),
                     os.getppid(),
                     self.is_running,
                     self.start_count, self.stop_count, self.reload_count, self.status_count,
                     self.last_action,
                     self.start_loop_exited.is_set(),
+                    self.listen_socket.getsockname()[1] if self.listen_socket else 0,
+                    SolBase.mscurrent(),
+                    self.preload_pid,
+                    self.job_done_count,
                     )
         f.write(buf)
         f.close()
 
+    def _on_preload(self):
+        """
+        Test
+        """
+        logger.info("Called")
+        self.preload_pid = os.getpid()
+        self.preload_data = dict((i, "data_%s" % i) for i in range(0, 100000))
+
     def _on_stop(self):
         """
         Test
@@ -113,11 +155,39 @@ class CustomDaemon(Daemon):
         # Signal
         self.is_running = False
 
-        # As described in https://github.com/gevent/gevent/issues/799
-        # - signals run into the main thread
-        # - we cannot wait or switch here => direct exit
+        # We run in the drain greenlet (not in the signal handler), in flight jobs are drained by _on_drain after us
         return
 
+    def _control_job(self, args):
+        """
+        Test : run an in flight job (args : {"ms": int}), drained on stop
+        """
+
+        if self._is_stopping():
+            return False
+        gevent.spawn(self._job_run, args.get("ms", 1000) if args else 1000)
+        return True
+
+    # noinspection PyMethodMayBeStatic
+    def _control_block(self, args):
+        """
+        Test : block the event loop (args : {"ms": int})
+        """
+
+        monkey.get_original("time", "sleep")((args.get("ms", 1000) if args else 1000) / 1000.0)
+        return True
+
+    def _job_run(self, ms):
+        """
+        Test
+        """
+
+        with self._inflight():
+            SolBase.sleep(ms)
+            self.job_done_count += 1
+            logger.info("Job done, ms=%s, job_done_count=%s", ms, self.job_done_count)
+        self._write_state()
+
     def _on_reload(self, *args, **kwargs):
         """
         Test
@@ -127,6 +197,13 @@ class CustomDaemon(Daemon):
         self.last_action = "reload"
         self._write_state()
 
+    def _on_listen(self):
+        """
+        Test
+        """
+        logger.info("Called")
+        self._get_listen_socket("test", ("127.0.0.1", self._get_var("listenport", 0)))
+
     def _on_start(self):
         """
         Test
@@ -134,11 +211,16 @@ class CustomDaemon(Daemon):
         logger.info("Called")
         self.start_count += 1
         self.last_action = "start"
+
+        # Listening socket (bound by _on_listen, shared with workers, handed over on graceful restart)
+        self.listen_socket = self._get_listen_socket("test")
         self._write_state()
 
+        # Serving (explicit : no auto ready in systemd notify mode)
+        self._notify_ready()
+
         logger.info("Engaging running loop")
-        while self.is_running:
-            SolBase.sleep(10)
+        self._wait_stop()
         logger.info("Exited running loop")
 
         self._write_state()
@@ -0,0 +1,320 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from os.path import dirname, abspath
+from signal import SIGUSR2
+
+from pysoldaemon.daemon.DaemonCtl import DaemonCtl
+from pysoldaemon.daemon.ExitWaiter import ExitWaiter
+
+
+class LifecycleBench(object):
+    """
+    Lifecycle benchmark : run full start/status/reload/stop cycles of CustomDaemon, and report percentiles.
+    Standard library only (the bench process does not import gevent).
+
+    python -m pysoldaemon_test.Daemon.LifecycleBench [-cycles 20] [-output bench.json] [daemon options...]
+    Unknown options are forwarded to the daemon command line.
+
+    Reported (ms, unless stated) :
+    - start_ms : start command invocation until the daemon reports ready (control socket)
+    - fork_to_pidfile_ms, fork_to_ready_ms : reported by the daemon (first fork to pid file written / ready)
+    - status_ms, status_fast_ms : status command, full daemon command line / DaemonCtl fast path
+    - control_ping_ms : control socket round trip
+    - reload_ms, stop_ms : reload and stop commands (stop includes exit confirmation)
+    - signal_to_handler_ms : SIGUSR2 sent until _on_status runs in the daemon
+    - rss_kb : daemon resident set size once ready (baseline)
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, cycles=20, pidfile="/tmp/LifecycleBench.pid", daemon_args=None, timeout_ms=15000):
+        """
+        Constructor
+        :param cycles: Number of lifecycle cycles
+        :type cycles: int
+        :param pidfile: Pid file
+        :type pidfile: str
+        :param daemon_args: Additional daemon command line options
+        :type daemon_args: list,None
+        :param timeout_ms: Timeout in ms (per action)
+        :type timeout_ms: int
+        """
+
+        self.cycles = cycles
+        self.pidfile = pidfile
+        self.daemon_args = list(daemon_args) if daemon_args else list()
+        self.timeout_ms = timeout_ms
+        self.daemon_file = abspath(dirname(abspath(__file__)) + os.sep + "CustomDaemon.py")
+        self.state_file = "/tmp/daemon_last_action.txt"
+        self.ctl = DaemonCtl(pidfile, timeout_ms)
+        self.samples = dict()
+        self.env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+    # ===============================================
+    # UTILITIES
+    # ===============================================
+
+    @classmethod
+    def percentile(cls, values, p):
+        """
+        Percentile (nearest rank)
+        :param values: Sorted values
+        :type values: list
+        :param p: Percentile (0-100)
+        :type p: int,float
+        :return float,None
+        :rtype float,None
+        """
+
+        if not values:
+            return None
+        idx = int(math.ceil(p / 100.0 * len(values))) - 1
+        return values[max(0, min(len(values) - 1, idx))]
+
+    @classmethod
+    def summarize(cls, values):
+        """
+        Summarize samples
+        :param values: Values
+        :type values: list
+        :return dict
+        :rtype dict
+        """
+
+        values = sorted(v for v in values if v is not None)
+        d = {"count": len(values)}
+        if values:
+            d["min"] = values[0]
+            d["mean"] = sum(values) / len(values)
+            d["max"] = values[-1]
+        for p in cls.PERCENTILES:
+            d["p%s" % p] = cls.percentile(values, p)
+        return d
+
+    def _add(self, key, value):
+        """
+        Add a sample
+        :param key: Sample name
+        :type key: str
+        :param value: Value
+        :type value: float,int,None
+        """
+        self.samples.setdefault(key, list()).append(value)
+
+    def _run_daemon_cmd(self, action, extra=None):
+        """
+        Run a daemon command line action, and return its duration
+        :param action: Action
+        :type action: str
+        :param extra: Additional options
+        :type extra: list,None
+        :return float (ms)
+        :rtype float
+        """
+
+        ar = [sys.executable, self.daemon_file, "-pidfile=%s" % self.pidfile] + self.daemon_args + (extra or list()) + [action]
+        t = time.monotonic()
+        p = subprocess.run(ar, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=self.env, timeout=self.timeout_ms / 1000.0)
+        ms = (time.monotonic() - t) * 1000.0
+        if p.returncode != 0:
+            raise Exception("Action failed, action=%s, code=%s" % (action, p.returncode))
+        return ms
+
+    def _read_state(self):
+        """
+        Read CustomDaemon state file
+        :return dict
+        :rtype dict
+        """
+
+        d = dict()
+        try:
+            with open(self.state_file, "r") as f:
+                for line in f.read().split("\n"):
+                    k, _, v = line.partition("=")
+                    if k:
+                        d[k] = v
+        except IOError:
+            pass
+        return d
+
+    def _wait_ready(self):
+        """
+        Wait until the daemon reports ready through its control socket
+        :return dict (status)
+        :rtype dict
+        """
+
+        t = time.monotonic()
+        while (time.monotonic() - t) * 1000.0 < self.timeout_ms:
+            resp = self.ctl.request("status")
+            if resp and resp["code"] == 0 and resp["result"]["ready"]:
+                return resp["result"]
+            time.sleep(0.001)
+        raise Exception("Daemon not ready, timeout_ms=%s" % self.timeout_ms)
+
+    @classmethod
+    def _get_rss_kb(cls, pid):
+        """
+        Get process resident set size
+        :param pid: Pid
+        :type pid: int
+        :return int,None
+        :rtype int,None
+        """
+
+        try:
+            with open("/proc/%s/status" % pid, "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except IOError:
+            pass
+        return None
+
+    # ===============================================
+    # RUN
+    # ===============================================
+
+    def run_cycle(self):
+        """
+        Run one lifecycle cycle (start, status, reload, signal, stop)
+        """
+
+        # Start (launcher exits after first fork : wait for ready)
+        t = time.monotonic()
+        self._run_daemon_cmd("start")
+        status = self._wait_ready()
+        self._add("start_ms", (time.monotonic() - t) * 1000.0)
+        self._add("fork_to_pidfile_ms", status["startup"]["fork_to_pidfile_ms"])
+        self._add("fork_to_ready_ms", status["startup"]["fork_to_ready_ms"])
+        pid = status["pid"]
+        self._add("rss_kb", self._get_rss_kb(pid))
+
+        # Status
+        self._add("status_ms", self._run_daemon_cmd("status"))
+        ar = [sys.executable, "-m", "pysoldaemon.daemon.DaemonCtl", "-pidfile=%s" % self.pidfile, "status"]
+        t = time.monotonic()
+        subprocess.run(ar, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=self.env, timeout=self.timeout_ms / 1000.0)
+        self._add("status_fast_ms", (time.monotonic() - t) * 1000.0)
+        t = time.monotonic()
+        self.ctl.request("ping")
+        self._add("control_ping_ms", (time.monotonic() - t) * 1000.0)
+
+        # Reload
+        self._add("reload_ms", self._run_daemon_cmd("reload"))
+
+        # Signal to handler (CustomDaemon._on_status writes its state with a timestamp)
+        count = self._read_state().get("status_count")
+        ms_sent = time.time() * 1000.0
+        os.kill(pid, SIGUSR2)
+        t = time.monotonic()
+        while (time.monotonic() - t) * 1000.0 < self.timeout_ms:
+            d = self._read_state()
+            if d.get("status_count") != count and d.get("last_action") == "status":
+                self._add("signal_to_handler_ms", float(d["last_action_ms"]) - ms_sent)
+                break
+            time.sleep(0.001)
+
+        # Stop
+        self._add("stop_ms", self._run_daemon_cmd("stop"))
+        if ExitWaiter.is_alive(pid):
+            raise Exception("Daemon still alive after stop, pid=%s" % pid)
+
+    def run(self):
+        """
+        Run all cycles
+        :return dict (machine readable results)
+        :rtype dict
+        """
+
+        t = time.monotonic()
+        for _ in range(0, self.cycles):
+            self.run_cycle()
+
+        return {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "pysoldaemon": self.get_version(),
+                "cycles": self.cycles,
+                "daemon_args": self.daemon_args,
+                "elapsed_ms": (time.monotonic() - t) * 1000.0,
+            },
+            "results": dict((k, self.summarize(v)) for k, v in self.samples.items()),
+            "samples": self.samples,
+        }
+
+    @classmethod
+    def get_version(cls):
+        """
+        Get pysoldaemon version, if installed
+        :return str,None
+        :rtype str,None
+        """
+
+        try:
+            from importlib.metadata import version
+            return version("pysoldaemon")
+        except Exception:
+            return None
+
+    @classmethod
+    def main(cls, argv):
+        """
+        Main
+        :param argv: Command line argv
+        :type argv: list, tuple
+        """
+
+        arg_parser = argparse.ArgumentParser(description="pysoldaemon lifecycle benchmark")
+        arg_parser.add_argument("-cycles", type=int, default=20, help="lifecycle cycles [optional]")
+        arg_parser.add_argument("-pidfile", type=str, default="/tmp/LifecycleBench.pid", help="pid filename [optional]")
+        arg_parser.add_argument("-output", type=str, default="", help="json output file (stdout if not set) [optional]")
+        arg_parser.add_argument("-timeoutms", type=int, default=15000, help="timeout per action [optional]")
+        args, daemon_args = arg_parser.parse_known_args(argv[1:])
+
+        d = LifecycleBench(args.cycles, args.pidfile, daemon_args, args.timeoutms).run()
+        buf = json.dumps(d, indent=2, sort_keys=True)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(buf)
+        else:
+            sys.stdout.write(buf + "\n")
+
+
+# ==========================
+# MAIN / COMMAND LINE INTERCEPTION
+# ==========================
+
+if __name__ == "__main__":
+    LifecycleBench.main(sys.argv)
@@ -0,0 +1,290 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import gc
+import logging
+import os
+import socket
+import time
+import unittest
+import weakref
+from logging.handlers import SysLogHandler
+
+from gevent import monkey
+from gevent import socket as gevent_socket
+from pysolbase.FileUtility import FileUtility
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.AsyncLogHandler import AsyncLogHandler
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+_sleep = monkey.get_original("time", "sleep")
+
+
+class SlowHandler(logging.Handler):
+    """
+    Slow handler
+    """
+
+    def __init__(self, sleep_ms):
+        """
+        Constructor
+        """
+        logging.Handler.__init__(self)
+        self.sleep_ms = sleep_ms
+        self.messages = list()
+        self.inside = 0
+        self.violations = 0
+        self.closed = False
+
+    def emit(self, record):
+        """
+        Emit
+        """
+        self.inside += 1
+        if self.inside > 1 or self.closed:
+            self.violations += 1
+        _sleep(self.sleep_ms / 1000.0)
+        self.messages.append(self.format(record))
+        self.inside -= 1
+
+    def close(self):
+        """
+        Close
+        """
+        self.closed = True
+        logging.Handler.close(self)
+
+
+class TestAsyncLogHandler(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.log_file = "/tmp/AsyncLogHandler.log"
+        if FileUtility.is_file_exist(self.log_file):
+            os.remove(self.log_file)
+        self.test_logger = logging.getLogger("async_test")
+        self.test_logger.propagate = False
+        self.test_logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        """
+        Test
+        """
+        for h in self.test_logger.handlers:
+            h.close()
+        self.test_logger.handlers = []
+
+    def test_file(self):
+        """
+        Test
+        """
+
+        target = logging.FileHandler(self.log_file)
+        target.setFormatter(logging.Formatter("%(levelname)s | %(message)s"))
+        h = AsyncLogHandler([target])
+        self.test_logger.addHandler(h)
+
+        for i in range(0, 1000):
+            self.test_logger.info("msg %s", i)
+        try:
+            raise Exception("boom")
+        except Exception:
+            self.test_logger.exception("failed")
+        self.assertTrue(h.flush())
+
+        lines = FileUtility.file_to_textbuffer(self.log_file, "utf-8").split("\n")
+        self.assertEqual(lines[0], "INFO | msg 0")
+        self.assertEqual(lines[999], "INFO | msg 999")
+        self.assertEqual(lines[1000], "ERROR | failed")
+        self.assertEqual(lines[1001], "Traceback (most recent call last):")
+        self.assertEqual(h.get_stats()["written"], 1001)
+        self.assertEqual(h.get_stats()["dropped"], 0)
+
+    def test_target_level(self):
+        """
+        Test
+        """
+
+        target = SlowHandler(0)
+        target.setLevel(logging.WARNING)
+        h = AsyncLogHandler([target])
+        self.test_logger.addHandler(h)
+
+        self.test_logger.info("info")
+        self.test_logger.warning("warn")
+        h.flush()
+        self.assertEqual(target.messages, ["warn"])
+
+    def test_drop(self):
+        """
+        Test
+        """
+
+        target = SlowHandler(10)
+        h = AsyncLogHandler([target], max_size=10, policy="drop")
+        self.test_logger.addHandler(h)
+
+        # Caller does not block
+        t = time.monotonic()
+        for i in range(0, 100):
+            self.test_logger.info("msg %s", i)
+        self.assertLess(time.monotonic() - t, 0.5)
+        self.assertTrue(h.flush())
+
+        self.assertGreater(h.dropped_count, 0)
+        # Drop report record is written as well
+        self.assertEqual(h.written_count + h.dropped_count, 101)
+        self.assertEqual(target.messages[0], "msg 0")
+        # Reported after the batch written while they were dropped (records queued meanwhile may follow)
+        self.assertTrue(any(m.startswith("AsyncLogHandler dropped records") for m in target.messages))
+
+    def test_drop_oldest(self):
+        """
+        Test
+        """
+
+        target = SlowHandler(10)
+        h = AsyncLogHandler([target], max_size=10, policy="drop_oldest")
+        self.test_logger.addHandler(h)
+
+        for i in range(0, 100):
+            self.test_logger.info("msg %s", i)
+        self.assertTrue(h.flush())
+
+        self.assertGreater(h.dropped_count, 0)
+        self.assertTrue("msg 99" in target.messages)
+
+    def test_block(self):
+        """
+        Test
+        """
+
+        target = SlowHandler(1)
+        h = AsyncLogHandler([target], max_size=10, policy="block")
+        self.test_logger.addHandler(h)
+
+        for i in range(0, 100):
+            self.test_logger.info("msg %s", i)
+        self.assertTrue(h.flush())
+
+        self.assertEqual(h.dropped_count, 0)
+        self.assertEqual(target.messages, ["msg %s" % i for i in range(0, 100)])
+
+    def test_block_timeout(self):
+        """
+        Test
+        """
+
+        target = SlowHandler(200)
+        h = AsyncLogHandler([target], max_size=1, policy="block", block_timeout_ms=50)
+        self.test_logger.addHandler(h)
+
+        # Writer stuck in the target, queue full : callers wait at most block_timeout_ms, then drop
+        ms_start = SolBase.mscurrent()
+        for i in range(0, 5):
+            self.test_logger.info("msg %s", i)
+        self.assertLess(SolBase.msdiff(ms_start), 1000)
+        self.assertGreater(h.dropped_count, 0)
+        self.assertTrue(h.flush())
+
+    def test_close(self):
+        """
+        Test
+        """
+
+        target = SlowHandler(1)
+        h = AsyncLogHandler([target], batch_size=4)
+        self.test_logger.addHandler(h)
+
+        for i in range(0, 50):
+            self.test_logger.info("msg %s", i)
+
+        # Flush times out while the writer is still busy : final drain only once the writer is gone
+        h.close(timeout_ms=10)
+
+        self.assertTrue(target.closed)
+        self.assertEqual(target.violations, 0)
+        self.assertEqual(target.messages, ["msg %s" % i for i in range(0, 50)])
+
+    def test_invalid_policy(self):
+        """
+        Test
+        """
+        self.assertRaises(Exception, AsyncLogHandler, [], policy="invalid")
+
+    def test_syslog_native_socket(self):
+        """
+        Test
+        """
+
+        path = "/tmp/AsyncLogHandler.sock"
+        if os.path.exists(path):
+            os.remove(path)
+        server = monkey.get_original("socket", "socket")(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            server.bind(path)
+            server.settimeout(5)
+
+            # Created after monkey patching : gevent socket, owned by our hub
+            target = SysLogHandler(address=path)
+            self.assertIsInstance(target.socket, gevent_socket.socket)
+            h = AsyncLogHandler([target])
+            self.test_logger.addHandler(h)
+
+            self.test_logger.info("to syslog")
+            self.assertTrue(h.flush())
+            self.assertIn(b"to syslog", server.recv(4096))
+
+            # Writer thread uses a native socket
+            self.assertNotIsInstance(target.socket, gevent_socket.socket)
+            self.assertTrue(target.socket.getblocking())
+        finally:
+            server.close()
+            os.remove(path)
+
+    def test_release(self):
+        """
+        Test
+        """
+
+        h = AsyncLogHandler([SlowHandler(0)])
+        r = weakref.ref(h)
+        h.close()
+        del h
+
+        # No fork nor exit hook keeps it alive (writer thread exits on close)
+        ms_start = SolBase.mscurrent()
+        while r() is not None and SolBase.msdiff(ms_start) < 5000:
+            gc.collect()
+            SolBase.sleep(10)
+        self.assertIsNone(r())
+
@@ -0,0 +1,130 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+import unittest
+
+import gevent
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.ControlClient import ControlClient
+from pysoldaemon.daemon.ControlServer import ControlServer
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestControlServer(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+
+        SolBase.voodoo_init()
+        self.path = ControlClient.get_path("/tmp/ControlServer.pid")
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        self.reload_count = 0
+        self.server = ControlServer(self.path, {
+            "ping": lambda args: "pong",
+            "reload": self._reload,
+            "echo": lambda args: args,
+            "fail": self._fail,
+        })
+
+    def tearDown(self):
+        """
+        Test
+        """
+        self.server.stop()
+
+    def _reload(self, args):
+        """
+        Test
+        """
+        self.reload_count += 1
+        return self.reload_count
+
+    def _fail(self, args):
+        """
+        Test
+        """
+        raise Exception("failed")
+
+    def _request(self, cmd, args=None):
+        """
+        Request, from a thread (client is blocking)
+        """
+        return gevent.get_hub().threadpool.apply(ControlClient.request, (self.path, cmd, args))
+
+    def test_not_available(self):
+        """
+        Test
+        """
+        self.assertIsNone(ControlClient.request(self.path, "ping"))
+
+    def test_commands(self):
+        """
+        Test
+        """
+
+        self.server.start()
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+        self.assertEqual(self._request("ping"), {"code": ControlServer.CODE_OK, "result": "pong"})
+        self.assertEqual(self._request("reload"), {"code": ControlServer.CODE_OK, "result": 1})
+        self.assertEqual(self._request("reload"), {"code": ControlServer.CODE_OK, "result": 2})
+        self.assertEqual(self._request("echo", {"a": 1}), {"code": ControlServer.CODE_OK, "result": {"a": 1}})
+        self.assertEqual(self._request("fail")["code"], ControlServer.CODE_FAILED)
+        self.assertEqual(self._request("invalid")["code"], ControlServer.CODE_UNKNOWN_COMMAND)
+        self.assertEqual(self.server.process(b"not json")["code"], ControlServer.CODE_BAD_REQUEST)
+
+        self.assertEqual(self.server.request_count, 7)
+        self.assertEqual(self.server.error_count, 3)
+
+        # Stop : socket file removed
+        self.server.stop()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_stop_not_owner(self):
+        """
+        Test
+        """
+
+        # A new server took the path over : the first one must not remove it
+        self.server.start()
+        other = ControlServer(self.path, {"ping": lambda args: "pong2"})
+        other.start()
+        try:
+            self.server.stop()
+            self.assertTrue(os.path.exists(self.path))
+            self.assertEqual(self._request("ping")["result"], "pong2")
+        finally:
+            other.stop()
+        self.assertFalse(os.path.exists(self.path))
@@ -21,7 +21,10 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 # ===============================================================================
 """
+import json
+import socket
 import subprocess
+from signal import SIGTERM, SIGKILL, SIGSTOP
 from os.path import dirname, abspath
 
 import sys
@@ -33,6 +36,9 @@ import os
 
 from pysolbase.FileUtility import FileUtility
 from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.DaemonCtl import DaemonCtl
+from pysoldaemon.daemon.ExitWaiter import ExitWaiter
 from pysoldaemon_test.Daemon.CustomDaemon import CustomDaemon
 
 SolBase.voodoo_init()
@@ -353,6 +359,7 @@ class TestDaemon(unittest.TestCase):
                 ar.append(sys.executable)
                 ar.append(main_helper_file)
                 ar.append("-pidfile={0}".format(self.daemon_pid_file))
+                ar.append("-detailed=true")
                 ar.append("status")
 
                 # Launch
@@ -509,6 +516,7 @@ class TestDaemon(unittest.TestCase):
                 ar.append(sys.executable)
                 ar.append(main_helper_file)
                 ar.append("-pidfile={0}".format(self.daemon_pid_file))
+                ar.append("-detailed=true")
                 ar.append("status")
 
                 # Launch
@@ -592,3 +600,1056 @@ class TestDaemon(unittest.TestCase):
 
         finally:
             logger.debug("Exiting test, idx=%s", self.run_idx)
+
+    def test_start_stop_workers(self):
+        """
+        Test
+        """
+
+        try:
+            main_helper_file = self.current_dir + "CustomDaemon.py"
+            main_helper_file = abspath(main_helper_file)
+            self.assertTrue(FileUtility.is_file_exist(main_helper_file))
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("-logconsole=true")
+            ar.append("-workers=2")
+            ar.append("-gcfreeze=true")
+            # No periodic activity : workers only wait for the stop event
+            ar.append("-fdcheckms=0")
+            ar.append("start")
+
+            # =========================
+            # START
+            # =========================
+
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+
+            # Wait for workers
+            ms_start = SolBase.mscurrent()
+            while SolBase.msdiff(ms_start) < self.stdout_timeout_ms:
+                if "\n".join(self._get_std_out()).count("Worker started") >= 2:
+                    break
+                else:
+                    SolBase.sleep(10)
+            self.assertEqual("\n".join(self._get_std_out()).count("Worker started"), 2)
+
+            # Master and its workers
+            master_pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+            buf = FileUtility.file_to_textbuffer("/proc/{0}/task/{0}/children".format(master_pid), "ascii")
+            worker_pids = [int(s) for s in buf.split()]
+            self.assertEqual(len(worker_pids), 2)
+
+            # Preloaded in the launcher (before forks), pages shared with workers
+            ms_start = SolBase.mscurrent()
+            while SolBase.msdiff(ms_start) < self.stdout_timeout_ms:
+                if "preload_pid" in self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE):
+                    break
+                else:
+                    SolBase.sleep(10)
+            self.assertNotEqual(int(self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE)["preload_pid"]), master_pid)
+            self.assertTrue("\n".join(self._get_std_out()).find("Gc heap frozen") >= 0)
+            self.assertIsNone(DaemonCtl(self.daemon_pid_file).request("status")["result"]["pages"])
+            pages = DaemonCtl(self.daemon_pid_file).request("stats")["result"]["pages"]
+            self.assertGreater(pages["self"]["shared"], 0)
+            self.assertEqual(len(pages["workers"]), 2)
+            for d in pages["workers"].values():
+                self.assertGreater(d["shared"], 0)
+
+            # =========================
+            # STOP
+            # =========================
+
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("stop")
+
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+
+            # All gone
+            for pid in [master_pid] + worker_pids:
+                self.assertFalse(ExitWaiter.is_alive(pid))
+            self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
+
+            # Check
+            self.assertEqual(len(self._get_std_err()), 0)
+            self.assertEqual("\n".join(self._get_std_out()).count(" INFO | CustomDaemon@_on_stop"), 2)
+            self.assertTrue("\n".join(self._get_std_out()).find(" ERROR ") < 0)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_start_workers_stop_kill(self):
+        """
+        Test
+        """
+
+        try:
+            main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("-logconsole=true")
+            ar.append("-workers=2")
+            ar.append("start")
+
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+
+            # Wait for workers
+            ms_start = SolBase.mscurrent()
+            while SolBase.msdiff(ms_start) < self.stdout_timeout_ms:
+                if "\n".join(self._get_std_out()).count("Worker started") >= 2:
+                    break
+                else:
+                    SolBase.sleep(10)
+            master_pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+            buf = FileUtility.file_to_textbuffer("/proc/{0}/task/{0}/children".format(master_pid), "ascii")
+            worker_pids = [int(s) for s in buf.split()]
+            self.assertEqual(len(worker_pids), 2)
+
+            # Master leads its process group, workers in it
+            self.assertEqual(os.getpgid(master_pid), master_pid)
+            for pid in worker_pids:
+                self.assertEqual(os.getpgid(pid), master_pid)
+
+            # Master stuck : SIGTERM phase times out, SIGKILL goes to the whole group
+            os.kill(master_pid, SIGSTOP)
+            ctl = DaemonCtl(self.daemon_pid_file, timeout_ms=300)
+            pid, ms = ctl.stop()
+            logger.info("Stop, pid=%s, ms=%s, phases=%s", pid, ms, ctl.stop_phases)
+            self.assertEqual(pid, master_pid)
+            self.assertIsNotNone(ms)
+            self.assertEqual([d["phase"] for d in ctl.stop_phases], ["SIGTERM", "SIGKILL"])
+            self.assertTrue(ctl.stop_phases[1]["exited"])
+            for pid in [master_pid] + worker_pids:
+                self.assertFalse(ExitWaiter.is_alive(pid))
+            self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
+            self.assertFalse(os.path.exists(ctl.control_path))
+            self.assertEqual(ctl.status()[0], DaemonCtl.EXIT_NOT_RUNNING)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_start_restart_graceful_stop(self):
+        """
+        Test
+        """
+
+        try:
+            # Relative script path, while the daemon leaves the launch directory (re-exec must not depend on it)
+            main_helper_file = "CustomDaemon.py"
+            self.assertTrue(FileUtility.is_file_exist(self.current_dir + main_helper_file))
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("-logconsole=true")
+            ar.append("-changedir=true")
+            ar.append("start")
+
+            # =========================
+            # START
+            # =========================
+
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar, cwd=self.current_dir)
+            self._wait_process(p)
+
+            # Wait for listening socket
+            ms_start = SolBase.mscurrent()
+            while SolBase.msdiff(ms_start) < self.stdout_timeout_ms:
+                if int(self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE).get("listen_port", 0)) > 0:
+                    break
+                else:
+                    SolBase.sleep(10)
+            listen_port = int(self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE).get("listen_port", 0))
+            self.assertGreater(listen_port, 0)
+            old_pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+
+            # =========================
+            # RESTART GRACEFUL
+            # =========================
+
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-graceful=true")
+            ar.append("restart")
+
+            p = subprocess.Popen(args=ar, cwd=self.current_dir)
+            self._wait_process(p)
+
+            # New generation owns the pidfile, previous one is gone
+            new_pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+            self.assertNotEqual(new_pid, old_pid)
+            self.assertFalse(ExitWaiter.is_alive(old_pid))
+            self.assertTrue(ExitWaiter.is_alive(new_pid))
+
+            # Listening socket handed over
+            self.assertTrue("\n".join(self._get_std_out()).find("Inherited listening socket, name=test") >= 0)
+            soc = socket.create_connection(("127.0.0.1", listen_port), timeout=5)
+            soc.close()
+
+            # =========================
+            # STOP
+            # =========================
+
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("stop")
+
+            p = subprocess.Popen(args=ar, cwd=self.current_dir)
+            self._wait_process(p)
+
+            self.assertFalse(ExitWaiter.is_alive(new_pid))
+            self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
+            self.assertTrue("\n".join(self._get_std_out()).find(" ERROR ") < 0)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_start_workers_fixed_port_restart_graceful(self):
+        """
+        Test
+        """
+
+        # A fixed port, bound once by the master (_on_listen) and shared by workers
+        soc = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        soc.bind(("127.0.0.1", 0))
+        port = soc.getsockname()[1]
+        soc.close()
+
+        try:
+            main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("-logconsole=true")
+            ar.append("-workers=2")
+            ar.append("-listenport={0}".format(port))
+            ar.append("start")
+
+            # =========================
+            # START
+            # =========================
+
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+
+            # Wait for workers
+            ms_start = SolBase.mscurrent()
+            while SolBase.msdiff(ms_start) < self.stdout_timeout_ms:
+                if "\n".join(self._get_std_out()).count("Worker started") >= 2:
+                    break
+                else:
+                    SolBase.sleep(10)
+            self.assertEqual("\n".join(self._get_std_out()).count("Worker started"), 2)
+            self.assertEqual(int(self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE)["listen_port"]), port)
+            socket.create_connection(("127.0.0.1", port), timeout=5).close()
+            old_pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+
+            # =========================
+            # RESTART GRACEFUL
+            # =========================
+
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-graceful=true")
+            ar.append("restart")
+
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+
+            # New generation owns the pidfile and the port, previous one is gone
+            new_pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+            self.assertNotEqual(new_pid, old_pid)
+            self.assertFalse(ExitWaiter.is_alive(old_pid))
+            self.assertTrue("\n".join(self._get_std_out()).find("Inherited listening socket, name=test") >= 0)
+            socket.create_connection(("127.0.0.1", port), timeout=5).close()
+
+            # =========================
+            # STOP
+            # =========================
+
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("stop")
+
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+
+            self.assertFalse(ExitWaiter.is_alive(new_pid))
+            self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
+            self.assertTrue("\n".join(self._get_std_out()).find(" ERROR ") < 0)
+            self.assertTrue("\n".join(self._get_std_out()).find("bound in a worker") < 0)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_start_fastpath_status_stop(self):
+        """
+        Test
+        """
+
+        try:
+            main_helper_file = self.current_dir + "CustomDaemon.py"
+            main_helper_file = abspath(main_helper_file)
+            self.assertTrue(FileUtility.is_file_exist(main_helper_file))
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("-logconsole=true")
+            ar.append("-rlimits=core=0")
+            ar.append("-fdcheckms=10000")
+            ar.append("-nice=3")
+            ar.append("-sched=batch")
+            ar.append("-oomscoreadj=200")
+            ar.append("start")
+
+            # =========================
+            # START
+            # =========================
+
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+            pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+
+            # =========================
+            # STATUS (fast path, no gevent)
+            # =========================
+
+            # Timed from the DaemonCtl import to the json line (interpreter start excluded), reported on stderr
+            code = "import sys, time; ms = time.monotonic(); from pysoldaemon.daemon.DaemonCtl import DaemonCtl; c = DaemonCtl.main(sys.argv); " \
+                   "sys.stderr.write('%.1f' % ((time.monotonic() - ms) * 1000.0)); assert 'gevent' not in sys.modules; sys.exit(c)"
+            ar = [sys.executable, "-c", code, "-pidfile={0}".format(self.daemon_pid_file), "status"]
+            p = subprocess.run(ar, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+            ms = float(p.stderr.decode("utf-8"))
+            logger.info("Fast path status, ms=%s", ms)
+            self.assertEqual(p.returncode, 0)
+            d = json.loads(p.stdout.decode("utf-8"))
+            self.assertEqual(d["pid"], pid)
+            self.assertEqual(d["status"]["pid"], pid)
+            self.assertEqual(d["status"]["rlimits"]["core"]["soft"], 0)
+            self.assertGreater(d["status"]["rlimits"]["nofile"]["soft"], 0)
+            self.assertEqual(d["status"]["priority"]["nice"], 3)
+            self.assertEqual(d["status"]["priority"]["policy"], "batch")
+            self.assertEqual(d["status"]["priority"]["oom_score_adj"], 200)
+            self.assertEqual(d["status"]["priority"]["errors"], {})
+            self.assertGreater(d["status"]["fds"]["total"], 0)
+            self.assertGreater(d["status"]["fds"]["types"]["socket"], 0)
+            self.assertEqual(d["status"]["fds"]["limit"], d["status"]["rlimits"]["nofile"]["soft"])
+            self.assertLess(ms, 100)
+
+            # Daemon command line : full path by default (CustomDaemon has its own _internal_init)
+            ar = [sys.executable, abspath(self.current_dir + "CustomDaemon.py"), "-pidfile={0}".format(self.daemon_pid_file), "-logsyslog=", "status"]
+            p = subprocess.run(ar, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+            self.assertEqual(p.returncode, 0)
+            self.assertNotIn("(light path)", p.stdout.decode("utf-8"))
+            self.assertIsNone(CustomDaemon.control_helper(["x", "-pidfile={0}".format(self.daemon_pid_file), "status"]))
+
+            # Light path, opt-in : control actions skip argparse and _internal_init
+            light = type("LightDaemon", (CustomDaemon,), {"CONTROL_LIGHT_PATH": True})
+            self.assertIsNone(light.control_helper(["x", "-pidfile={0}".format(self.daemon_pid_file), "start"]))
+            with self.assertRaises(SystemExit) as cm:
+                light.control_helper(["x", "-pidfile={0}".format(self.daemon_pid_file), "-workers", "2", "status"])
+            self.assertEqual(cm.exception.code, 0)
+
+            # =========================
+            # STOP (fast path)
+            # =========================
+
+            self.assertEqual(DaemonCtl.main(["ctl", "-pidfile", self.daemon_pid_file, "stop"]), DaemonCtl.EXIT_OK)
+            self.assertFalse(ExitWaiter.is_alive(pid))
+            self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
+
+            # Not running
+            self.assertEqual(DaemonCtl.main(["ctl", "-pidfile={0}".format(self.daemon_pid_file), "status"]), DaemonCtl.EXIT_NOT_RUNNING)
+            self.assertEqual(DaemonCtl.main(["ctl", "status"]), DaemonCtl.EXIT_FAILED)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def _start_job_stop(self, drain_ms, job_ms):
+        """
+        Start, run an in flight job, stop
+        :return tuple (stop ms, state dict)
+        :rtype tuple
+        """
+
+        main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+        # Params
+        ar = list()
+        ar.append(sys.executable)
+        ar.append(main_helper_file)
+        ar.append("-pidfile={0}".format(self.daemon_pid_file))
+        ar.append("-stderr={0}".format(self.daemon_std_err))
+        ar.append("-stdout={0}".format(self.daemon_std_out))
+        ar.append("-logconsole=true")
+        ar.append("-drainms={0}".format(drain_ms))
+        ar.append("start")
+
+        # Start
+        logger.info("Start : %s", " ".join(ar))
+        p = subprocess.Popen(args=ar)
+        self._wait_process(p)
+        pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+
+        # Job (in flight), then stop
+        ctl = DaemonCtl(self.daemon_pid_file, 15000, stop_kill=False)
+        resp = ctl.request("job", {"ms": job_ms})
+        self.assertEqual(resp["code"], 0)
+        self.assertTrue(resp["result"])
+        _, ms = ctl.stop()
+        logger.info("Stopped, ms=%s, phases=%s", ms, ctl.stop_phases)
+        self.assertIsNotNone(ms)
+        self.assertFalse(ExitWaiter.is_alive(pid))
+        return ms, self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE)
+
+    def test_start_job_drain_stop(self):
+        """
+        Test
+        """
+
+        try:
+            # Drained : stop waits for the in flight job
+            ms, d = self._start_job_stop(10000, 1000)
+            self.assertGreaterEqual(ms, 800)
+            self.assertLess(ms, 5000)
+            self.assertEqual(d["job_done_count"], "1")
+            self.assertEqual(d["stop_count"], "1")
+            self.assertTrue("\n".join(self._get_std_out()).find("Drained, ms=") >= 0)
+
+            # Drain deadline : exit anyway
+            self._clean_files()
+            ms, d = self._start_job_stop(300, 10000)
+            self.assertLess(ms, 5000)
+            self.assertEqual(d["job_done_count"], "0")
+            self.assertTrue("\n".join(self._get_std_out()).find("Drain deadline reached") >= 0)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_systemd_notify(self):
+        """
+        Test
+        """
+
+        notify_path = "/tmp/Daemon.notify"
+        if os.path.exists(notify_path):
+            os.remove(notify_path)
+        sd = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # Journal stream standing for systemd (std are not redirected, -stdout must not be swapped over it)
+        journal_r, journal_w = socket.socketpair()
+        stdout_path = "/tmp/Daemon.systemd.stdout"
+        if os.path.exists(stdout_path):
+            os.remove(stdout_path)
+        p = None
+        try:
+            # Local datagram socket standing for systemd
+            sd.bind(notify_path)
+            sd.settimeout(5.0)
+
+            main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-systemd=true")
+            ar.append("-systemdstatusms=5000")
+            ar.append("-metricsms=100")
+            ar.append("-stdout={0}".format(stdout_path))
+            ar.append("start")
+
+            # Start (no forks : the process we run is the daemon)
+            st = os.fstat(journal_w.fileno())
+            env = dict(os.environ, NOTIFY_SOCKET=notify_path, WATCHDOG_USEC="200000", JOURNAL_STREAM="%s:%s" % (st.st_dev, st.st_ino))
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar, env=env, stdout=journal_w.fileno(), stderr=subprocess.DEVNULL)
+
+            # Collect messages
+            msgs = list()
+            ms_start = SolBase.mscurrent()
+            while SolBase.msdiff(ms_start) < 1500:
+                msgs.append(dict(line.split("=", 1) for line in sd.recv(4096).decode("utf-8").split("\n")))
+            logger.info("msgs=%s", msgs)
+
+            # Ready, with our pid and a status
+            ready = [d for d in msgs if d.get("READY") == "1"]
+            self.assertEqual(len(ready), 1)
+            self.assertEqual(int(ready[0]["MAINPID"]), p.pid)
+            self.assertTrue(ready[0]["STATUS"].startswith("ready"))
+            self.assertEqual(int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip()), p.pid)
+
+            # Watchdog every 100 ms, with live metrics
+            watchdog = [d for d in msgs if d.get("WATCHDOG") == "1"]
+            self.assertGreaterEqual(len(watchdog), 5)
+            self.assertTrue(watchdog[-1]["STATUS"].find("rss_mb=") >= 0)
+
+            # Reopen : stdout still goes to the journal stream
+            p.send_signal(CustomDaemon.REOPEN_SIGNAL)
+            SolBase.sleep(500)
+            self.assertTrue(os.readlink("/proc/%s/fd/1" % p.pid).startswith("socket:"))
+
+            # Stop
+            p.send_signal(SIGTERM)
+            while True:
+                d = dict(line.split("=", 1) for line in sd.recv(4096).decode("utf-8").split("\n"))
+                if d.get("STOPPING") == "1":
+                    break
+            self.assertEqual(p.wait(timeout=10), 0)
+            p = None
+            self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
+        finally:
+            if p:
+                p.kill()
+                p.wait()
+            sd.close()
+            journal_r.close()
+            journal_w.close()
+            os.remove(notify_path)
+            if os.path.exists(stdout_path):
+                os.remove(stdout_path)
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_systemd_notify_workers(self):
+        """
+        Test
+        """
+
+        # Auto ready (first hub yield of _on_start) is off in systemd notify mode, unless forced
+        d = CustomDaemon()
+        for systemd, auto_ready, expected in [(False, None, True), (True, None, False), (True, True, True), (False, False, False)]:
+            d._systemd = systemd
+            d.AUTO_READY = auto_ready
+            self.assertEqual(d._is_auto_ready(), expected)
+
+        notify_path = "/tmp/Daemon.notify"
+        out_path = "/tmp/Daemon.systemd.out"
+        for f in (notify_path, out_path):
+            if os.path.exists(f):
+                os.remove(f)
+        sd = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        p = None
+        try:
+            sd.bind(notify_path)
+            sd.settimeout(5.0)
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(abspath(self.current_dir + "CustomDaemon.py"))
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-systemd=true")
+            ar.append("-logconsole=true")
+            ar.append("-workers=2")
+            ar.append("start")
+
+            # Start
+            logger.info("Start : %s", " ".join(ar))
+            with open(out_path, "w") as f:
+                p = subprocess.Popen(args=ar, env=dict(os.environ, NOTIFY_SOCKET=notify_path), stdout=f, stderr=subprocess.STDOUT)
+
+            # READY=1 from the master, once both workers are ready
+            while True:
+                d = dict(line.split("=", 1) for line in sd.recv(4096).decode("utf-8").split("\n"))
+                if d.get("READY") == "1":
+                    break
+            self.assertEqual(int(d["MAINPID"]), p.pid)
+            buf = FileUtility.file_to_textbuffer(out_path, "utf-8")
+            self.assertEqual(buf.count("Worker ready, idx="), 2)
+            self.assertLess(buf.rfind("Worker ready, idx="), buf.find("Daemon ready, pid=%s" % p.pid))
+
+            # Stop
+            p.send_signal(SIGTERM)
+            self.assertEqual(p.wait(timeout=10), 0)
+            p = None
+        finally:
+            if p:
+                p.kill()
+                p.wait()
+            sd.close()
+            for f in (notify_path, out_path):
+                if os.path.exists(f):
+                    os.remove(f)
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_socket_activation(self):
+        """
+        Test
+        """
+
+        # Pre-bound by us (the service manager), kept across the daemon life
+        soc = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        soc.bind(("127.0.0.1", 0))
+        soc.listen(16)
+        port = soc.getsockname()[1]
+        try:
+            # A connection queued before the daemon runs
+            c = socket.create_connection(("127.0.0.1", port))
+            c.close()
+
+            main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+            # Params : fd 3 and LISTEN_PID set in the exec-ed process, as systemd does
+            code = "import os, sys; os.dup2(int(sys.argv[1]), 3); os.environ['LISTEN_PID'] = str(os.getpid()); os.execv(sys.executable, [sys.executable] + sys.argv[2:])"
+            ar = list()
+            ar.append(sys.executable)
+            ar.append("-c")
+            ar.append(code)
+            ar.append(str(soc.fileno()))
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("start")
+
+            # Start
+            env = dict(os.environ, LISTEN_FDS="1", LISTEN_FDNAMES="test")
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar, env=env, pass_fds=[soc.fileno()])
+            self._wait_process(p)
+
+            # The daemon got it as its "test" listening socket
+            d = self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE)
+            ms_start = SolBase.mscurrent()
+            while d.get("listen_port", "0") == "0" and SolBase.msdiff(ms_start) < self.stdout_timeout_ms:
+                SolBase.sleep(50)
+                d = self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE)
+            self.assertEqual(int(d["listen_port"]), port)
+            resp = DaemonCtl(self.daemon_pid_file).request("status")
+            self.assertEqual(resp["result"]["listen"], {"test": str(("127.0.0.1", port))})
+
+            # Stop : the socket is still ours, connections are queued, no bind needed again
+            self.assertEqual(DaemonCtl.main(["ctl", "-pidfile", self.daemon_pid_file, "stop"]), DaemonCtl.EXIT_OK)
+            c = socket.create_connection(("127.0.0.1", port))
+            c.close()
+        finally:
+            soc.close()
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_loop_stall(self):
+        """
+        Test
+        """
+
+        try:
+            main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("-logconsole=true")
+            ar.append("-stallms=200")
+            ar.append("-stallkillms=1500")
+            ar.append("start")
+
+            # Start
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+            pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+            ctl = DaemonCtl(self.daemon_pid_file)
+
+            # Stall (below kill) : stacks in std err, then in the log, counted in status
+            self.assertTrue(ctl.request("block", {"ms": 600})["result"])
+            SolBase.sleep(300)
+            d = ctl.request("status")["result"]["stall"]
+            logger.info("stall=%s", d)
+            self.assertEqual(d["stall_count"], 1)
+            self.assertGreaterEqual(d["last_stall"]["duration_ms"], 300)
+            self.assertIn("_control_block", d["last_stall"]["stacks"])
+            self.assertTrue("\n".join(self._get_std_err()).find("Event loop stalled") >= 0)
+            self.assertTrue("\n".join(self._get_std_out()).find("Event loop stalled, duration_ms=") >= 0)
+
+            # Stall above kill : we exit
+            self.assertIsNone(ctl.request("block", {"ms": 10000}))
+            exited, _ = ExitWaiter.wait_exit(pid, 5000)
+            self.assertTrue(exited)
+            self.assertTrue("\n".join(self._get_std_err()).find("above kill_ms, exiting") >= 0)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def _wait_worker(self, ctl, previous_pid, ready=False):
+        """
+        Wait for the supervised worker (other than previous_pid)
+        :param ready: Wait for the worker readiness too (its signal handlers are set)
+        :type ready: bool
+        :return tuple (worker pid, status)
+        :rtype tuple
+        """
+
+        ms_start = SolBase.mscurrent()
+        while SolBase.msdiff(ms_start) < self.stdout_timeout_ms:
+            d = ctl.request("status")["result"]
+            pid = d["workers"].get("0")
+            if pid and pid != previous_pid and (not ready or "\n".join(self._get_std_out()).find("Worker ready, idx=0, pid=%s" % pid) >= 0):
+                return pid, d
+            SolBase.sleep(20)
+        self.fail("no worker")
+
+    def test_supervise_restart(self):
+        """
+        Test
+        """
+
+        try:
+            main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("-logconsole=true")
+            ar.append("-supervise=true")
+            ar.append("-restartbasems=50")
+            ar.append("-restartbudget=3")
+            ar.append("start")
+
+            # Start
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+            supervisor_pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+            ctl = DaemonCtl(self.daemon_pid_file)
+            pid, _ = self._wait_worker(ctl, None)
+
+            # Crash : restarted, reason recorded
+            for i in range(0, 3):
+                ms = SolBase.mscurrent()
+                os.kill(pid, SIGKILL)
+                pid, d = self._wait_worker(ctl, pid)
+                logger.info("Restarted, ms=%s, restarts=%s", SolBase.msdiff(ms), d["restarts"])
+                self.assertEqual(d["restarts"]["0"]["restart_count"], i + 1)
+                self.assertEqual(d["restarts"]["0"]["last_reasons"][-1]["reason"], "signal 9 (SIGKILL)")
+                self.assertTrue(ExitWaiter.is_alive(supervisor_pid))
+
+            # Crash loop : the supervisor gives up
+            os.kill(pid, SIGKILL)
+            exited, _ = ExitWaiter.wait_exit(supervisor_pid, 5000)
+            self.assertTrue(exited)
+            self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
+            self.assertTrue("\n".join(self._get_std_out()).find("Worker crash loop, giving up") >= 0)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_supervise_worker_end(self):
+        """
+        Test
+        """
+
+        try:
+            main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("-logconsole=true")
+            ar.append("-supervise=true")
+            ar.append("-restartbasems=50")
+            ar.append("start")
+
+            # Start
+            logger.info("Start : %s", " ".join(ar))
+            p = subprocess.Popen(args=ar)
+            self._wait_process(p)
+            supervisor_pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+            ctl = DaemonCtl(self.daemon_pid_file)
+            pid, _ = self._wait_worker(ctl, None)
+
+            # Crash : respawned (forked from a master greenlet)
+            os.kill(pid, SIGKILL)
+            pid, _ = self._wait_worker(ctl, pid, ready=True)
+
+            # Respawned worker ends normally (exit 0) : not respawned nor counted, the supervisor has nothing left and stops
+            os.kill(pid, SIGTERM)
+            exited, _ = ExitWaiter.wait_exit(supervisor_pid, 5000)
+            self.assertTrue(exited)
+            self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
+            buf = "\n".join(self._get_std_out())
+            self.assertTrue(buf.find("Worker ended, not respawned, idx=0, pid=%s," % pid) >= 0)
+            self.assertEqual(buf.count("Worker respawn scheduled"), 1)
+            self.assertTrue(buf.find("crash loop") < 0)
+            self.assertTrue(buf.find("Worker failed") < 0)
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def _get_daemon_pids(self):
+        """
+        Get pids of processes running CustomDaemon with our pid file
+        :return list
+        :rtype list
+        """
+
+        out = list()
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            try:
+                with open("/proc/%s/cmdline" % name, "rb") as f:
+                    ar = f.read().decode("utf-8", "replace").split("\0")
+            except IOError:
+                continue
+            if "-pidfile={0}".format(self.daemon_pid_file) in ar and any(a.endswith("CustomDaemon.py") for a in ar):
+                out.append(int(name))
+        return out
+
+    def test_start_locked_pidfile(self):
+        """
+        Test
+        """
+
+        try:
+            main_helper_file = abspath(self.current_dir + "CustomDaemon.py")
+
+            # Params
+            ar = list()
+            ar.append(sys.executable)
+            ar.append(main_helper_file)
+            ar.append("-pidfile={0}".format(self.daemon_pid_file))
+            ar.append("-stderr={0}".format(self.daemon_std_err))
+            ar.append("-stdout={0}".format(self.daemon_std_out))
+            ar.append("start")
+
+            # Stale pid file (not locked) : removed, started
+            with open(self.daemon_pid_file, "w") as f:
+                f.write("999999")
+            ctl = DaemonCtl(self.daemon_pid_file)
+            self.assertFalse(ctl.is_locked())
+            self.assertEqual(ctl.status()[0], DaemonCtl.EXIT_DEAD_PIDFILE)
+
+            # Pid file not locked, live process of ours with our pid file in its command line (daemon predating pid file locking) : refused
+            other = subprocess.Popen(args=[sys.executable, "-c", "import time; time.sleep(60)", "-pidfile={0}".format(self.daemon_pid_file)])
+            try:
+                with open(self.daemon_pid_file, "w") as f:
+                    f.write(str(other.pid))
+                self.assertEqual(ctl.status()[0], DaemonCtl.EXIT_OK)
+                p = subprocess.Popen(args=ar)
+                self.assertEqual(p.wait(), 1)
+                self.assertEqual(self._get_daemon_pids(), [])
+            finally:
+                other.kill()
+                other.wait()
+
+            # Concurrent starts : a single winner
+            ps = [subprocess.Popen(args=ar) for _ in range(0, 3)]
+            for p in ps:
+                self._wait_process(p)
+            ms_start = SolBase.mscurrent()
+            while len(self._get_daemon_pids()) > 1 and SolBase.msdiff(ms_start) < self.stdout_timeout_ms:
+                SolBase.sleep(50)
+            pid = int(FileUtility.file_to_textbuffer(self.daemon_pid_file, "ascii").strip())
+            self.assertEqual(self._get_daemon_pids(), [pid])
+            self.assertTrue(ctl.is_locked())
+
+            # Start again : refused through the lock probe, no signal to the daemon (no _on_status)
+            p = subprocess.Popen(args=ar)
+            self.assertEqual(p.wait(), 1)
+            d = self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE)
+            self.assertEqual(d["status_count"], "0")
+            self.assertEqual(d["pid"], str(pid))
+
+            # Status : fingerprint checked, no _on_status unless detailed
+            self.assertEqual(ctl.read_fingerprint()["pid"], pid)
+            self.assertEqual(ctl.status()[0], DaemonCtl.EXIT_OK)
+            self.assertEqual(ctl.status()[2]["pid"], pid)
+            d = self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE)
+            self.assertEqual(d["status_count"], "0")
+            self.assertEqual(ctl.status(detailed=True)[0], DaemonCtl.EXIT_OK)
+            d = self._status_to_dict(CustomDaemon.DAEMON_LAST_ACTION_FILE)
+            self.assertEqual(d["status_count"], "1")
+
+            # Stop : unlocked, removed
+            self.assertEqual(DaemonCtl.main(["ctl", "-pidfile", self.daemon_pid_file, "stop"]), DaemonCtl.EXIT_OK)
+            self.assertIsNone(ctl.is_locked())
+            self.assertIsNone(ctl.read_fingerprint())
+        finally:
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_batch_status(self):
+        """
+        Test
+        """
+
+        batch_dir = "/tmp/DaemonBatch"
+        pidfiles = ["{0}/d{1}.pid".format(batch_dir, i) for i in range(0, 2)]
+        dead_pidfile = "{0}/dead.pid".format(batch_dir)
+        if not os.path.isdir(batch_dir):
+            os.makedirs(batch_dir)
+        for f in os.listdir(batch_dir):
+            os.remove(os.path.join(batch_dir, f))
+
+        try:
+            main_helper_file = self.current_dir + "CustomDaemon.py"
+            main_helper_file = abspath(main_helper_file)
+            self.assertTrue(FileUtility.is_file_exist(main_helper_file))
+
+            # =========================
+            # START (2 instances, and a dead pid file)
+            # =========================
+
+            for pidfile in pidfiles:
+                ar = list()
+                ar.append(sys.executable)
+                ar.append(main_helper_file)
+                ar.append("-pidfile={0}".format(pidfile))
+                ar.append("start")
+
+                logger.info("Start : %s", " ".join(ar))
+                p = subprocess.Popen(args=ar)
+                self._wait_process(p)
+
+            p = subprocess.Popen(args=["true"])
+            p.wait()
+            with open(dead_pidfile, "w") as f:
+                f.write("%s" % p.pid)
+
+            # =========================
+            # BATCH STATUS
+            # =========================
+
+            ar = [sys.executable, "-m", "pysoldaemon.daemon.DaemonCtl", "-pidfiles={0}".format(batch_dir), "status"]
+            ms = SolBase.mscurrent()
+            p = subprocess.run(ar, stdout=subprocess.PIPE, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+            logger.info("Batch status, ms=%s", SolBase.msdiff(ms))
+            self.assertEqual(p.returncode, DaemonCtl.EXIT_DEAD_PIDFILE)
+
+            ar = [json.loads(s) for s in p.stdout.decode("utf-8").split("\n") if s]
+            self.assertEqual([d["pidfile"] for d in ar], sorted([dead_pidfile] + pidfiles))
+            for d in ar:
+                if d["pidfile"] == dead_pidfile:
+                    self.assertFalse(d["alive"])
+                    self.assertEqual(d["state"], "dead")
+                else:
+                    self.assertTrue(d["alive"])
+                    self.assertIn(d["state"], ["running", "starting"])
+                    self.assertEqual(d["pid"], int(FileUtility.file_to_textbuffer(d["pidfile"], "ascii").strip()))
+                    self.assertGreater(d["uptime_ms"], 0)
+                    self.assertGreater(d["rss_bytes"], 0)
+                    self.assertGreater(d["fds"], 0)
+        finally:
+            for pidfile in pidfiles:
+                DaemonCtl(pidfile).stop()
+            logger.info("Exiting test, idx=%s", self.run_idx)
+
+    def test_group_start_stop(self):
+        """
+        Test
+        """
+
+        batch_dir = "/tmp/DaemonGroup"
+        instances_file = "{0}/instances.json".format(batch_dir)
+        if not os.path.isdir(batch_dir):
+            os.makedirs(batch_dir)
+        for f in os.listdir(batch_dir):
+            os.remove(os.path.join(batch_dir, f))
+
+        main_helper_file = self.current_dir + "CustomDaemon.py"
+        main_helper_file = abspath(main_helper_file)
+        self.assertTrue(FileUtility.is_file_exist(main_helper_file))
+
+        # Instances
+        instances = list()
+        for i in range(0, 3):
+            pidfile = "{0}/d{1}.pid".format(batch_dir, i)
+            cmd = list()
+            cmd.append(sys.executable)
+            cmd.append(main_helper_file)
+            cmd.append("-pidfile={0}".format(pidfile))
+            cmd.append("-logconsole=true")
+            instances.append({"pidfile": pidfile, "cmd": cmd})
+        with open(instances_file, "w") as f:
+            f.write(json.dumps(instances))
+
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        try:
+            # =========================
+            # START
+            # =========================
+
+            ar = [sys.executable, "-m", "pysoldaemon.daemon.DaemonCtl", "-instances={0}".format(instances_file), "-concurrency=2", "start"]
+            p = subprocess.run(ar, stdout=subprocess.PIPE, env=env)
+            ar = [json.loads(s) for s in p.stdout.decode("utf-8").split("\n") if s]
+            logger.info("Group start, results=%s", ar)
+            self.assertEqual(p.returncode, 0)
+            self.assertEqual(len(ar), 4)
+            self.assertEqual([d["pidfile"] for d in ar[0:3]], [d["pidfile"] for d in instances])
+            for d in ar[0:3]:
+                self.assertTrue(d["ok"])
+                self.assertTrue(ExitWaiter.is_alive(d["pid"]))
+            pids = [d["pid"] for d in ar[0:3]]
+            self.assertEqual(ar[3]["count"], 3)
+            self.assertEqual(ar[3]["ok"], 3)
+            self.assertGreater(ar[3]["elapsed_ms"], 0)
+
+            # Already running : per instance failure
+            ar, elapsed_ms = DaemonCtl.group("start", instances[0:1])
+            self.assertFalse(ar[0]["ok"])
+            self.assertTrue(ar[0]["error"].startswith("Already running"))
+
+            # =========================
+            # STOP (pid files glob)
+            # =========================
+
+            ar = [sys.executable, "-m", "pysoldaemon.daemon.DaemonCtl", "-pidfiles={0}/*.pid".format(batch_dir), "stop"]
+            p = subprocess.run(ar, stdout=subprocess.PIPE, env=env)
+            ar = [json.loads(s) for s in p.stdout.decode("utf-8").split("\n") if s]
+            logger.info("Group stop, results=%s", ar)
+            self.assertEqual(p.returncode, 0)
+            self.assertEqual(ar[3]["ok"], 3)
+            # Parallel : as long as the slowest one, not the sum
+            self.assertLess(ar[3]["elapsed_ms"], sum(d["ms"] for d in ar[0:3]))
+            for pid in pids:
+                self.assertFalse(ExitWaiter.is_alive(pid))
+            for d in instances:
+                self.assertFalse(FileUtility.is_file_exist(d["pidfile"]))
+        finally:
+            DaemonCtl.group("stop", instances)
+            logger.info("Exiting test, idx=%s", self.run_idx)
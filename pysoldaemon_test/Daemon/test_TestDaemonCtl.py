@@ -0,0 +1,221 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import fcntl
+import json
+import logging
+import os
+import subprocess
+import sys
+import unittest
+
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.DaemonCtl import DaemonCtl
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestDaemonCtl(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.pidfile = "/tmp/DaemonCtl.pid"
+        self.p = None
+
+    def tearDown(self):
+        """
+        Test
+        """
+        if self.p:
+            self.p.kill()
+            self.p.wait()
+        for path in (self.pidfile, DaemonCtl.get_fingerprint_path(self.pidfile)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _start_stubborn(self, locked=True):
+        """
+        Start a process ignoring SIGTERM, and write its pid file (locked by it, as a daemon does, if locked)
+        """
+
+        self.p = subprocess.Popen(args=[
+            sys.executable, "-c",
+            "import fcntl, os, signal, sys, time\n"
+            "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+            "fd = os.open(sys.argv[1], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)\n"
+            "os.write(fd, str(os.getpid()).encode('ascii'))\n"
+            "if sys.argv[2] == '1':\n"
+            "    fcntl.flock(fd, fcntl.LOCK_EX)\n"
+            "else:\n"
+            "    os.close(fd)\n"
+            "sys.stdout.write('ready\\n')\n"
+            "sys.stdout.flush()\n"
+            "time.sleep(60)\n",
+            self.pidfile, "1" if locked else "0",
+        ], stdout=subprocess.PIPE)
+        self.assertEqual(self.p.stdout.readline().strip(), b"ready")
+
+    def test_stop_escalation_kill(self):
+        """
+        Test
+        """
+
+        self._start_stubborn()
+        ctl = DaemonCtl(self.pidfile, timeout_ms=200, control_enabled=False, stop_quit_ms=0, stop_kill=True, stop_kill_ms=5000)
+        pid, ms = ctl.stop()
+        logger.info("Stop, pid=%s, ms=%s, phases=%s", pid, ms, ctl.stop_phases)
+        self.assertEqual(pid, self.p.pid)
+        self.assertIsNotNone(ms)
+        self.assertEqual([d["phase"] for d in ctl.stop_phases], ["SIGTERM", "SIGKILL"])
+        self.assertFalse(ctl.stop_phases[0]["exited"])
+        self.assertGreaterEqual(ctl.stop_phases[0]["ms"], 150)
+        self.assertTrue(ctl.stop_phases[1]["exited"])
+        self.assertFalse(os.path.exists(self.pidfile))
+        self.assertEqual(self.p.wait(), -9)
+
+    def test_stop_escalation_no_kill(self):
+        """
+        Test
+        """
+
+        self._start_stubborn()
+        ctl = DaemonCtl(self.pidfile, timeout_ms=200, control_enabled=False, stop_kill=False)
+        pid, ms = ctl.stop()
+        self.assertEqual(pid, self.p.pid)
+        self.assertIsNone(ms)
+        self.assertEqual([d["phase"] for d in ctl.stop_phases], ["SIGTERM"])
+
+        # Still running : pid file kept, status running
+        self.assertTrue(os.path.exists(self.pidfile))
+        self.assertIsNone(self.p.poll())
+
+    def test_status_pid_reuse(self):
+        """
+        Test
+        """
+
+        self._start_stubborn(locked=False)
+        ctl = DaemonCtl(self.pidfile, timeout_ms=200, control_enabled=False)
+
+        # Pid file locked, as by a running daemon
+        fd = os.open(self.pidfile, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self.assertTrue(ctl.is_locked())
+
+            # Our fingerprint : running, no signal sent (SIGUSR2 would kill it)
+            ctl.write_fingerprint(self.p.pid)
+            self.assertTrue(ctl.is_running(self.p.pid))
+            self.assertEqual(ctl.status(), (DaemonCtl.EXIT_OK, self.p.pid, None))
+            self.assertEqual(ctl.probe()["state"], "running")
+            self.assertIsNone(self.p.poll())
+
+            # Another process start time : pid reused, not us
+            fp = ctl.read_fingerprint()
+            fp["start_ticks"] -= 1
+            with open(ctl.fingerprint_path, "w") as f:
+                json.dump(fp, f)
+            self.assertFalse(ctl.is_running(self.p.pid))
+            self.assertEqual(ctl.status()[0], DaemonCtl.EXIT_DEAD_PIDFILE)
+            self.assertEqual(ctl.probe()["state"], "dead")
+            self.assertEqual(ctl.reload()[0], DaemonCtl.EXIT_FAILED)
+
+            # Stop : never signals it, stale files removed
+            self.assertEqual(ctl.stop(), (None, None))
+            self.assertEqual(ctl.stop_phases, [])
+            self.assertIsNone(self.p.poll())
+            self.assertFalse(os.path.exists(self.pidfile))
+            self.assertIsNone(ctl.read_fingerprint())
+        finally:
+            os.close(fd)
+
+    def test_status_unlocked_legacy(self):
+        """
+        Test
+        """
+
+        # Pid file not locked, without fingerprint (daemon predating pid file locking), our executable, our pid file
+        # in its command line : running, but not verified
+        self._start_stubborn(locked=False)
+        ctl = DaemonCtl(self.pidfile, timeout_ms=200, control_enabled=False, stop_quit_ms=100, stop_kill=True)
+        self.assertFalse(ctl.is_locked())
+        self.assertTrue(ctl.is_running(self.p.pid))
+        self.assertFalse(ctl.is_verified(self.p.pid))
+        self.assertEqual(ctl.status(), (DaemonCtl.EXIT_OK, self.p.pid, None))
+        self.assertIsNone(self.p.poll())
+
+        # Stop : SIGTERM only (ignored here), no escalation on an unverified pid, pid file kept
+        self.assertEqual(ctl.stop(), (self.p.pid, None))
+        self.assertEqual([d["phase"] for d in ctl.stop_phases], ["SIGTERM"])
+        self.assertIsNone(self.p.poll())
+        self.assertTrue(os.path.exists(self.pidfile))
+
+        # Another executable, or our executable without our pid file in its command line (pid reused) : stale
+        for args in (["sleep", "60"], [sys.executable, "-c", "import time; time.sleep(60)"]):
+            other = subprocess.Popen(args=args)
+            try:
+                with open(self.pidfile, "w") as f:
+                    f.write(str(other.pid))
+                self.assertFalse(ctl.is_running(other.pid))
+                self.assertEqual(ctl.status()[0], DaemonCtl.EXIT_DEAD_PIDFILE)
+            finally:
+                other.kill()
+                other.wait()
+
+    def test_parse_arguments_bool(self):
+        """
+        Test
+        """
+
+        for value in ("", "0", "false", "False", "no", "off", "OFF"):
+            d = DaemonCtl.parse_arguments(["ctl", "-pidfile=/tmp/x.pid", "-detailed=" + value, "-stopkill", value, "status"])
+            self.assertFalse(d["detailed"], value)
+            self.assertFalse(d["stopkill"], value)
+        for value in ("1", "true", "yes", "on"):
+            d = DaemonCtl.parse_arguments(["ctl", "-controlsocket=" + value, "status"])
+            self.assertTrue(d["controlsocket"], value)
+        d = DaemonCtl.parse_arguments(["ctl", "status"])
+        self.assertTrue(d["controlsocket"])
+        self.assertFalse(d["detailed"])
+        self.assertEqual(d["action"], "status")
+
+    def test_parse_arguments_unknown(self):
+        """
+        Test
+        """
+
+        # Unknown options consume their value, which is never taken as the action
+        d = DaemonCtl.parse_arguments(["ctl", "status", "-logconsole", "true", "-workers=2"])
+        self.assertEqual(d["action"], "status")
+        d = DaemonCtl.parse_arguments(["ctl", "-workers", "4", "-pidfile", "/tmp/x.pid", "reload"])
+        self.assertEqual(d["action"], "reload")
+        self.assertEqual(d["pidfile"], "/tmp/x.pid")
+        self.assertRaises(ValueError, DaemonCtl.parse_arguments, ["ctl", "status", "-logconsole"])
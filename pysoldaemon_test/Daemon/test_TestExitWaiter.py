@@ -0,0 +1,97 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import subprocess
+import unittest
+from signal import SIGTERM
+
+import gevent
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.ExitWaiter import ExitWaiter
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestExitWaiter(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.pidfd_open = ExitWaiter._pidfd_open
+
+    def tearDown(self):
+        """
+        Test
+        """
+        ExitWaiter._pidfd_open = self.pidfd_open
+
+    def _wait_exit(self):
+        """
+        Test
+        """
+
+        p = subprocess.Popen(args=["sleep", "30"])
+        try:
+            self.assertTrue(ExitWaiter.is_alive(p.pid))
+
+            # Timeout
+            exited, ms = ExitWaiter.wait_exit(p.pid, 50)
+            self.assertFalse(exited)
+            self.assertGreaterEqual(ms, 40)
+
+            # Exit
+            gevent.spawn_later(0.1, p.send_signal, SIGTERM)
+            exited, ms = ExitWaiter.wait_exit(p.pid, 5000)
+            self.assertTrue(exited)
+            self.assertLess(ms, 2000)
+            logger.info("Exited, ms=%s", ms)
+        finally:
+            p.kill()
+            p.wait()
+
+        # Gone
+        self.assertFalse(ExitWaiter.is_alive(p.pid))
+        exited, ms = ExitWaiter.wait_exit(p.pid, 5000)
+        self.assertTrue(exited)
+        self.assertLess(ms, 100)
+
+    def test_wait_exit(self):
+        """
+        Test
+        """
+        self._wait_exit()
+
+    def test_wait_exit_polling(self):
+        """
+        Test
+        """
+        ExitWaiter._pidfd_open = classmethod(lambda cls, pid: None)
+        self._wait_exit()
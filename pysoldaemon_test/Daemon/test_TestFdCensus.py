@@ -0,0 +1,134 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+import socket
+import unittest
+
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.FdCensus import FdCensus
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestFdCensus(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.fds = list()
+
+    def tearDown(self):
+        """
+        Test
+        """
+        for fd in self.fds:
+            os.close(fd)
+
+    def test_classify(self):
+        """
+        Test
+        """
+
+        self.assertEqual(FdCensus.classify("socket:[1234]"), "socket")
+        self.assertEqual(FdCensus.classify("pipe:[1234]"), "pipe")
+        self.assertEqual(FdCensus.classify("/var/log/x.log"), "file")
+        self.assertEqual(FdCensus.classify("anon_inode:[eventfd]"), "eventfd")
+        self.assertEqual(FdCensus.classify("anon_inode:[eventpoll]"), "anon")
+        self.assertEqual(FdCensus.classify("net:[4026531840]"), "other")
+
+    def test_scan(self):
+        """
+        Test
+        """
+
+        d1 = FdCensus.scan()
+        self.fds.extend(os.pipe())
+        s = socket.socket()
+        self.fds.append(s.detach())
+        self.fds.append(os.open("/dev/null", os.O_RDONLY))
+        d2 = FdCensus.scan()
+        logger.info("d1=%s, d2=%s", d1, d2)
+        self.assertEqual(d2["pipe"] - d1["pipe"], 2)
+        self.assertEqual(d2["socket"] - d1["socket"], 1)
+        self.assertEqual(d2["file"] - d1["file"], 1)
+
+    def test_check_thresholds(self):
+        """
+        Test
+        """
+
+        total = sum(FdCensus.scan().values())
+
+        # Limit such as we are at ~60%
+        c = FdCensus(limit=int(total / 0.6), warn_pcts=(50, 80))
+        c.check()
+        self.assertEqual(c.warn_count, 1)
+        self.assertGreaterEqual(c.get()["pct"], 50)
+
+        # Same level : no new warning
+        c.check()
+        self.assertEqual(c.warn_count, 1)
+
+        # Above 80% : warning
+        c.limit = total
+        c.check()
+        self.assertEqual(c.warn_count, 2)
+
+        # Back below, then above again : warning
+        c.limit = total * 100
+        c.check()
+        c.limit = total
+        c.check()
+        self.assertEqual(c.warn_count, 3)
+
+    def test_check_growth(self):
+        """
+        Test
+        """
+
+        c = FdCensus(limit=1000000, growth_per_min=60, window=3)
+        c.check()
+        for _ in range(0, 3):
+            SolBase.sleep(50)
+            self.fds.extend(os.pipe())
+            c.check()
+        d = c.get()
+        logger.info("d=%s", d)
+        self.assertGreater(d["rate_per_min"], 60)
+        self.assertEqual(d["growth_count"], 1)
+
+        # Stable : rate drops, re-armed
+        for _ in range(0, 3):
+            SolBase.sleep(50)
+            c.check()
+        self.assertEqual(c.get()["rate_per_min"], 0)
+        self.assertEqual(c.get()["growth_count"], 1)
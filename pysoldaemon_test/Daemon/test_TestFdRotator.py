@@ -0,0 +1,137 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import glob
+import logging
+import os
+import unittest
+
+from pysolbase.FileUtility import FileUtility
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.FdRotator import FdRotator
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestFdRotator(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.path = "/tmp/FdRotator.txt"
+        self._clean()
+        self.fd1 = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.fd2 = os.dup(self.fd1)
+
+    def tearDown(self):
+        """
+        Test
+        """
+        os.close(self.fd1)
+        os.close(self.fd2)
+        self._clean()
+
+    def _clean(self):
+        """
+        Clean
+        """
+        for f in glob.glob(self.path + "*"):
+            os.remove(f)
+
+    def test_reopen(self):
+        """
+        Test
+        """
+
+        r = FdRotator(self.path, [self.fd1, self.fd2])
+        os.write(self.fd1, b"a\n")
+
+        # Moved away (logrotate), then reopen : new file, nothing lost
+        os.rename(self.path, self.path + ".old")
+        os.write(self.fd2, b"b\n")
+        r.reopen()
+        os.write(self.fd1, b"c\n")
+        os.write(self.fd2, b"d\n")
+
+        self.assertEqual(FileUtility.file_to_textbuffer(self.path + ".old", "ascii"), "a\nb\n")
+        self.assertEqual(FileUtility.file_to_textbuffer(self.path, "ascii"), "c\nd\n")
+        self.assertEqual(r.get()["reopen_count"], 1)
+        self.assertEqual(r.get()["size"], 4)
+
+    def test_rotate(self):
+        """
+        Test
+        """
+
+        r = FdRotator(self.path, [self.fd1, self.fd2], max_bytes=10, backup_count=2)
+
+        # Below
+        os.write(self.fd1, b"12345\n")
+        self.assertFalse(r.check())
+
+        # Rotate 3 times, 2 backups kept
+        for i in range(0, 3):
+            os.write(self.fd2, b"%d23456789\n" % i)
+            self.assertTrue(r.check())
+            self.assertEqual(r.get_size(), 0)
+        os.write(self.fd1, b"last\n")
+
+        self.assertEqual(r.rotate_count, 3)
+        self.assertEqual(FileUtility.file_to_textbuffer(self.path, "ascii"), "last\n")
+        self.assertEqual(FileUtility.file_to_textbuffer(self.path + ".1", "ascii"), "223456789\n")
+        self.assertEqual(FileUtility.file_to_textbuffer(self.path + ".2", "ascii"), "123456789\n")
+        self.assertFalse(FileUtility.is_file_exist(self.path + ".3"))
+
+    def test_is_regular_file(self):
+        """
+        Test
+        """
+        self.assertTrue(FdRotator.is_regular_file(self.path))
+        self.assertTrue(FdRotator.is_regular_file(self.path + ".notthere"))
+        self.assertFalse(FdRotator.is_regular_file("/dev/null"))
+
+    def test_is_writing_to(self):
+        """
+        Test
+        """
+        self.assertTrue(FdRotator.is_writing_to(self.fd1, self.path))
+        self.assertTrue(FdRotator.is_writing_to(self.fd1, self.path + ".notthere"))
+
+        # Another file, a pipe (journal stream like), a closed fd
+        other = os.open(self.path + ".other", os.O_WRONLY | os.O_CREAT, 0o644)
+        r, w = os.pipe()
+        try:
+            self.assertFalse(FdRotator.is_writing_to(other, self.path))
+            self.assertFalse(FdRotator.is_writing_to(w, self.path))
+        finally:
+            os.close(other)
+            os.close(r)
+            os.close(w)
+        self.assertFalse(FdRotator.is_writing_to(w, self.path))
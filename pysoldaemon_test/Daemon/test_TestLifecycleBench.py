@@ -0,0 +1,92 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import json
+import logging
+import unittest
+
+import os
+from pysolbase.FileUtility import FileUtility
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon_test.Daemon.LifecycleBench import LifecycleBench
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestLifecycleBench(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.daemon_pid_file = "/tmp/LifecycleBench.pid"
+        self.output_file = "/tmp/LifecycleBench.json"
+        for f in [self.daemon_pid_file, self.output_file]:
+            if FileUtility.is_file_exist(f):
+                os.remove(f)
+
+    def test_percentile(self):
+        """
+        Test
+        """
+
+        ar = list(range(1, 101))
+        self.assertEqual(LifecycleBench.percentile(ar, 50), 50)
+        self.assertEqual(LifecycleBench.percentile(ar, 90), 90)
+        self.assertEqual(LifecycleBench.percentile(ar, 99), 99)
+        self.assertEqual(LifecycleBench.percentile([7], 99), 7)
+        self.assertIsNone(LifecycleBench.percentile([], 50))
+
+        d = LifecycleBench.summarize([3, None, 1, 2])
+        self.assertEqual(d["count"], 3)
+        self.assertEqual(d["min"], 1)
+        self.assertEqual(d["max"], 3)
+        self.assertEqual(d["p50"], 2)
+
+    def test_run(self):
+        """
+        Test
+        """
+
+        ar = list()
+        ar.append("-cycles=2")
+        ar.append("-pidfile={0}".format(self.daemon_pid_file))
+        ar.append("-output={0}".format(self.output_file))
+        ar.append("-logconsole=true")
+        LifecycleBench.main(["bench"] + ar)
+
+        d = json.loads(FileUtility.file_to_textbuffer(self.output_file, "utf-8"))
+        logger.info("Got results=%s", d["results"])
+        self.assertEqual(d["meta"]["cycles"], 2)
+        self.assertEqual(d["meta"]["daemon_args"][-1], "-logconsole=true")
+        for k in ["start_ms", "fork_to_pidfile_ms", "fork_to_ready_ms", "rss_kb",
+                  "status_ms", "status_fast_ms", "control_ping_ms", "reload_ms", "signal_to_handler_ms", "stop_ms"]:
+            self.assertEqual(d["results"][k]["count"], 2, k)
+            self.assertGreater(d["results"][k]["p50"], 0, k)
+        self.assertFalse(FileUtility.is_file_exist(self.daemon_pid_file))
@@ -0,0 +1,97 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import unittest
+
+import gevent
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.LoopWatchdog import LoopWatchdog
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestLoopWatchdog(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.kills = list()
+
+    def _blocking_call(self, sec):
+        """
+        Test : a blocking call (not monkey patched)
+        """
+        from gevent import monkey
+        monkey.get_original("time", "sleep")(sec)
+
+    def test_stall(self):
+        """
+        Test
+        """
+
+        w = LoopWatchdog(stall_ms=200, kill_ms=0, beat_ms=50)
+        w.start()
+        try:
+            # No stall
+            gevent.sleep(0.5)
+            self.assertEqual(w.stall_count, 0)
+
+            # Stall : captured while blocked, logged once the loop turns
+            self._blocking_call(0.6)
+            gevent.sleep(0.2)
+            d = w.get()
+            logger.info("d=%s", d)
+            self.assertEqual(d["stall_count"], 1)
+            self.assertGreaterEqual(d["last_stall"]["duration_ms"], 400)
+            self.assertLess(d["last_stall"]["duration_ms"], 2000)
+            self.assertIn("_blocking_call", d["last_stall"]["stacks"])
+            self.assertIn("--- greenlet", d["last_stall"]["stacks"])
+
+            # Back to normal
+            gevent.sleep(0.5)
+            self.assertEqual(w.stall_count, 1)
+        finally:
+            w.stop()
+
+    def test_kill(self):
+        """
+        Test
+        """
+
+        w = LoopWatchdog(stall_ms=100, kill_ms=300, beat_ms=50, on_kill=self.kills.append)
+        w.start()
+        try:
+            gevent.sleep(0.2)
+            self._blocking_call(0.6)
+            self.assertEqual(len(self.kills), 1)
+            self.assertGreaterEqual(self.kills[0], 300)
+        finally:
+            w.stop()
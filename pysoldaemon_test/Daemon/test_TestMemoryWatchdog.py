@@ -0,0 +1,108 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import unittest
+
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.MemoryWatchdog import MemoryWatchdog
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestMemoryWatchdog(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.soft_calls = list()
+        self.hard_calls = list()
+
+    def test_check(self):
+        """
+        Test
+        """
+
+        w = MemoryWatchdog(on_soft=self.soft_calls.append, on_hard=self.hard_calls.append)
+        rss = w.get_rss()
+        self.assertGreater(rss, 0)
+
+        # Disabled
+        w.check()
+        self.assertEqual(len(self.soft_calls), 0)
+        self.assertEqual(len(self.hard_calls), 0)
+
+        # Below
+        w.soft_bytes = rss * 4
+        w.hard_bytes = rss * 8
+        w.check()
+        self.assertEqual(len(self.soft_calls), 0)
+        self.assertEqual(len(self.hard_calls), 0)
+
+        # Soft : once per crossing
+        w.soft_bytes = 1
+        w.check()
+        w.check()
+        self.assertEqual(len(self.soft_calls), 1)
+        self.assertEqual(len(self.hard_calls), 0)
+        w.soft_bytes = rss * 4
+        w.check()
+        w.soft_bytes = 1
+        w.check()
+        self.assertEqual(len(self.soft_calls), 2)
+
+        # Hard : once, until re-armed
+        w.hard_bytes = 1
+        w.check()
+        w.check()
+        self.assertEqual(len(self.hard_calls), 1)
+        w.rearm_hard()
+        w.check()
+        self.assertEqual(len(self.hard_calls), 2)
+
+        d = w.get()
+        self.assertEqual(d["soft_count"], 2)
+        self.assertEqual(d["hard_count"], 2)
+        self.assertGreater(d["rss_bytes"], 0)
+
+    def test_run(self):
+        """
+        Test
+        """
+
+        w = MemoryWatchdog(soft_bytes=1, interval_ms=10, on_soft=self.soft_calls.append)
+        w.start()
+        try:
+            ms = SolBase.mscurrent()
+            while SolBase.msdiff(ms) < 5000 and len(self.soft_calls) == 0:
+                SolBase.sleep(10)
+            self.assertEqual(len(self.soft_calls), 1)
+        finally:
+            w.stop()
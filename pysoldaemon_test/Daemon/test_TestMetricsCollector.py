@@ -0,0 +1,84 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import time
+import unittest
+
+import gevent
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.MetricsCollector import MetricsCollector
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestMetricsCollector(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+
+    def test_sample(self):
+        """
+        Test
+        """
+
+        m = MetricsCollector(fd_limit=1000)
+        d = m.sample()
+        logger.info("d=%s", d)
+
+        self.assertGreater(d["greenlets"], 0)
+        self.assertGreater(d["rss_bytes"], 0)
+        self.assertGreaterEqual(d["vms_bytes"], d["rss_bytes"])
+        self.assertGreater(d["fds"], 0)
+        self.assertEqual(d["fds_limit"], 1000)
+        self.assertEqual(d["fds_percent"], round(100.0 * d["fds"] / 1000, 2))
+        self.assertEqual(m.get(), d)
+
+    def test_loop_lag(self):
+        """
+        Test
+        """
+
+        m = MetricsCollector(interval_ms=100, log_interval_ms=0, lag_probe_ms=20)
+        m.start()
+        try:
+            gevent.sleep(0.2)
+            self.assertLess(m.get()["loop_lag_max_ms"], 200)
+
+            # Block the loop
+            t = time.monotonic()
+            while time.monotonic() - t < 0.3:
+                pass
+            gevent.sleep(0.01)
+            logger.info("metrics=%s", m.get())
+            self.assertGreaterEqual(m.get()["loop_lag_max_ms"], 200)
+        finally:
+            m.stop()
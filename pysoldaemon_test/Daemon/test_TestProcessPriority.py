@@ -0,0 +1,110 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import json
+import logging
+import os
+import subprocess
+import sys
+import unittest
+
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.ProcessPriority import ProcessPriority
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestProcessPriority(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+
+    def test_parse(self):
+        """
+        Test
+        """
+
+        self.assertEqual(ProcessPriority.parse_cpus("0-3,6"), {0, 1, 2, 3, 6})
+        self.assertEqual(ProcessPriority.parse_cpus(" 1 ,"), {1})
+        self.assertEqual(ProcessPriority.parse_cpus([2, 1]), {1, 2})
+        self.assertRaises(ValueError, ProcessPriority.parse_cpus, "")
+        self.assertRaises(ValueError, ProcessPriority.parse_cpus, "a-b")
+
+        self.assertEqual(ProcessPriority.parse_ionice("be:4"), (2, 4))
+        self.assertEqual(ProcessPriority.parse_ionice("idle"), (3, 0))
+        self.assertEqual(ProcessPriority.parse_ionice("RT:0"), (1, 0))
+        self.assertRaises(ValueError, ProcessPriority.parse_ionice, "be:8")
+        self.assertRaises(ValueError, ProcessPriority.parse_ionice, "fast")
+
+    def test_apply(self):
+        """
+        Test
+        """
+
+        # In a child (nice and oom_score_adj cannot be lowered back without privileges)
+        cpu = sorted(os.sched_getaffinity(0))[0]
+        code = "import json; from pysoldaemon.daemon.ProcessPriority import ProcessPriority as P; " \
+               "e = P.apply(cpus=[%s], policy='batch', nice=5, ionice='be:6', oom_score_adj=300); " \
+               "e.update(P.apply(policy='realtime')); " \
+               "print(json.dumps({'errors': e, 'current': P.get()}))" % cpu
+        p = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+        self.assertEqual(p.returncode, 0)
+        d = json.loads(p.stdout.decode("utf-8"))
+        logger.info("d=%s", d)
+        self.assertEqual(list(d["errors"].keys()), ["policy"])
+        self.assertEqual(d["current"]["cpus"], [cpu])
+        self.assertEqual(d["current"]["policy"], "batch")
+        self.assertEqual(d["current"]["nice"], 5)
+        self.assertEqual(d["current"]["oom_score_adj"], 300)
+        if d["current"]["ionice"] is not None:
+            self.assertEqual(d["current"]["ionice"], "be:6")
+
+    def test_apply_threads(self):
+        """
+        Test
+        """
+
+        # A thread started before apply must get the settings too (nice is per thread on linux)
+        code = "import json, os, threading; from pysoldaemon.daemon.ProcessPriority import ProcessPriority as P; " \
+               "ev = threading.Event(); t = threading.Thread(target=ev.wait); t.start(); " \
+               "e = P.apply(nice=7, ionice='be:5'); " \
+               "n = os.getpriority(os.PRIO_PROCESS, t.native_id); " \
+               "i = P._ioprio_syscall(1, P.IOPRIO_WHO_PROCESS, t.native_id) if 'ionice' not in e else None; " \
+               "ev.set(); t.join(); " \
+               "print(json.dumps({'errors': e, 'nice': n, 'ionice': i}))"
+        p = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+        self.assertEqual(p.returncode, 0)
+        d = json.loads(p.stdout.decode("utf-8"))
+        logger.info("d=%s", d)
+        self.assertNotIn("nice", d["errors"])
+        self.assertEqual(d["nice"], 7)
+        if d["ionice"] is not None:
+            self.assertEqual(d["ionice"], (2 << ProcessPriority.IOPRIO_CLASS_SHIFT) | 5)
@@ -0,0 +1,107 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import resource
+import unittest
+
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.ResourceLimits import ResourceLimits
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestResourceLimits(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.saved = dict((name, resource.getrlimit(res)) for name, res in ResourceLimits.NAMES.items())
+
+    def tearDown(self):
+        """
+        Test
+        """
+        for name, v in self.saved.items():
+            try:
+                resource.setrlimit(ResourceLimits.NAMES[name], v)
+            except (ValueError, OSError) as ex:
+                logger.warning("restore failed, name=%s, ex=%s", name, ex)
+
+    def test_parse(self):
+        """
+        Test
+        """
+
+        inf = resource.RLIM_INFINITY
+        self.assertEqual(ResourceLimits.parse(None), {})
+        self.assertEqual(ResourceLimits.parse(""), {})
+        self.assertEqual(
+            ResourceLimits.parse("nofile=65536, core=unlimited,memlock=64m,stack=8m:unlimited,AS=-1,nproc=1k"),
+            {
+                "nofile": (65536, 65536),
+                "core": (inf, inf),
+                "memlock": (64 * 1024 ** 2, 64 * 1024 ** 2),
+                "stack": (8 * 1024 ** 2, inf),
+                "as": (inf, inf),
+                "nproc": (1024, 1024),
+            })
+        self.assertEqual(ResourceLimits.parse({"nofile": (1024, "2k"), "core": 0}), {"nofile": (1024, 2048), "core": (0, 0)})
+        self.assertRaises(ValueError, ResourceLimits.parse, "cpu=10")
+        self.assertRaises(ValueError, ResourceLimits.parse, "nofile")
+        self.assertRaises(ValueError, ResourceLimits.parse, "nofile=abc")
+
+    def test_apply(self):
+        """
+        Test
+        """
+
+        # Lower is always allowed
+        d = ResourceLimits.apply({"core": (0, self.saved["core"][1])})
+        self.assertFalse(d["core"]["degraded"])
+        self.assertEqual(d["core"]["soft"], 0)
+        self.assertEqual(ResourceLimits.get()["core"]["soft"], 0)
+
+    def test_apply_degraded(self):
+        """
+        Test
+        """
+
+        # Above the kernel max (nr_open) : refused even when privileged, degraded to the hard limit
+        with open("/proc/sys/fs/nr_open") as f:
+            nr_open = int(f.read())
+        hard = resource.getrlimit(resource.RLIMIT_NOFILE)[1]
+        d = ResourceLimits.apply("nofile=%s" % (nr_open + 1))
+        logger.info("d=%s", d)
+        self.assertTrue(d["nofile"]["degraded"])
+        self.assertIsNone(d["nofile"]["error"])
+        self.assertEqual(d["nofile"]["hard"], hard)
+        self.assertEqual(d["nofile"]["soft"], hard)
+        self.assertEqual(d["nofile"]["requested"], [nr_open + 1, nr_open + 1])
@@ -0,0 +1,92 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import unittest
+
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.RestartBackoff import RestartBackoff
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestRestartBackoff(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+
+    def test_reason(self):
+        """
+        Test
+        """
+
+        self.assertEqual(RestartBackoff.get_reason(None), "unknown")
+        self.assertEqual(RestartBackoff.get_reason(9), "signal 9 (SIGKILL)")
+        self.assertEqual(RestartBackoff.get_reason(70 << 8), "exit 70")
+        self.assertEqual(RestartBackoff.get_reason(0), "exit 0")
+
+    def test_backoff(self):
+        """
+        Test
+        """
+
+        b = RestartBackoff(base_ms=100, max_ms=1000, jitter=0.2, budget=0, reset_ms=10000)
+        delays = [b.on_exit(9, 10) for _ in range(0, 6)]
+        logger.info("delays=%s", delays)
+        for delay, expected in zip(delays, [100, 200, 400, 800, 1000, 1000]):
+            self.assertGreaterEqual(delay, expected * 0.8)
+            self.assertLessEqual(delay, expected * 1.2)
+
+        # Stable long enough : reset
+        self.assertLessEqual(b.on_exit(0, 20000), 120)
+        d = b.get()
+        self.assertEqual(d["restart_count"], 7)
+        self.assertEqual(d["attempt"], 1)
+        self.assertEqual([r["reason"] for r in d["last_reasons"]], ["signal 9 (SIGKILL)"] * 4 + ["exit 0"])
+        self.assertFalse(d["gave_up"])
+
+    def test_budget(self):
+        """
+        Test
+        """
+
+        b = RestartBackoff(base_ms=1, budget=3, window_ms=60000)
+        for _ in range(0, 3):
+            self.assertIsNotNone(b.on_exit(256, 10))
+        self.assertIsNone(b.on_exit(256, 10))
+        self.assertTrue(b.get()["gave_up"])
+        self.assertEqual(b.get()["restart_count"], 3)
+
+        # Out of the window : budget back
+        b = RestartBackoff(base_ms=1, budget=1, window_ms=50)
+        self.assertIsNotNone(b.on_exit(256, 10))
+        SolBase.sleep(100)
+        self.assertIsNotNone(b.on_exit(256, 10))
@@ -0,0 +1,132 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+import time
+import unittest
+
+import gevent
+from gevent import Greenlet
+from pysolbase.FileUtility import FileUtility
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.StackProfiler import StackProfiler
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+def busy_loop(ms):
+    """
+    Burn cpu, yielding from time to time
+    :param ms: int
+    :type ms: int
+    """
+    ms_start = SolBase.mscurrent()
+    while SolBase.msdiff(ms_start) < ms:
+        t = time.monotonic()
+        while time.monotonic() - t < 0.005:
+            pass
+        gevent.sleep(0)
+
+
+class TestStackProfiler(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+        self.path = "/tmp/StackProfiler.collapsed"
+        if FileUtility.is_file_exist(self.path):
+            os.remove(self.path)
+
+    def _profile(self, mode):
+        """
+        Test
+        """
+
+        p = StackProfiler(self.path, interval_ms=1, mode=mode)
+        p.start()
+        self.assertTrue(p.is_running)
+        g = Greenlet(busy_loop, 300)
+        g.name = "busy_greenlet"
+        g.start()
+        g.join()
+        gevent.sleep(0.1)
+        d = p.stop()
+        self.assertFalse(p.is_running)
+        self.assertIsNone(p.stop())
+        logger.info("d=%s", d)
+
+        self.assertEqual(d["path"], self.path)
+        self.assertGreater(d["samples"], 10)
+
+        buf = FileUtility.file_to_textbuffer(self.path, "utf-8")
+        lines = buf.strip().split("\n")
+        for line in lines:
+            self.assertGreater(int(line.rsplit(" ", 1)[1]), 0)
+        self.assertTrue(buf.find("MainThread;busy_greenlet;") >= 0)
+        self.assertTrue(buf.find("busy_loop (test_TestStackProfiler.py:") >= 0)
+        return buf
+
+    def test_wall(self):
+        """
+        Test
+        """
+        buf = self._profile("wall")
+        self.assertTrue(buf.find("MainThread;hub;") >= 0)
+
+    def test_cpu(self):
+        """
+        Test
+        """
+        buf = self._profile("cpu")
+        self.assertTrue(buf.find("MainThread;hub;") < 0)
+
+    def test_max_duration(self):
+        """
+        Test
+        """
+
+        p = StackProfiler(self.path, interval_ms=1, max_duration_ms=100)
+        p.start()
+        busy_loop(50)
+
+        # Stopped on the hub thread once expired, file written
+        ms_start = SolBase.mscurrent()
+        while p.is_running and SolBase.msdiff(ms_start) < 5000:
+            gevent.sleep(0.01)
+        self.assertFalse(p.is_running)
+        self.assertIsNone(p.stop())
+        self.assertTrue(FileUtility.is_file_exist(self.path))
+
+    def test_invalid_mode(self):
+        """
+        Test
+        """
+        self.assertRaises(Exception, StackProfiler, self.path, mode="invalid")
@@ -0,0 +1,100 @@
+"""
+# -*- coding: utf-8 -*-
+# ===============================================================================
+#
+# Copyright (C) 2013/2025 Laurent Labatut / Laurent Champagnac
+#
+#
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+# ===============================================================================
+"""
+import logging
+import os
+import socket
+import unittest
+
+from pysolbase.SolBase import SolBase
+
+from pysoldaemon.daemon.SystemdNotify import SystemdNotify
+
+SolBase.voodoo_init()
+logger = logging.getLogger(__name__)
+
+
+class TestSystemdNotify(unittest.TestCase):
+    """
+    Test
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        SolBase.voodoo_init()
+
+    def test_disabled(self):
+        """
+        Test
+        """
+
+        n = SystemdNotify(path="", watchdog_usec=0, unset_environment=False)
+        self.assertFalse(n.enabled)
+        self.assertFalse(n.ready())
+        self.assertEqual(n.send_count, 0)
+
+    def test_environment(self):
+        """
+        Test
+        """
+
+        os.environ[SystemdNotify.ENV_NOTIFY_SOCKET] = "@x"
+        os.environ[SystemdNotify.ENV_WATCHDOG_USEC] = "3000000"
+        os.environ[SystemdNotify.ENV_WATCHDOG_PID] = str(os.getpid() + 1)
+        n = SystemdNotify()
+        self.assertEqual(n.path, "@x")
+        self.assertEqual(n.watchdog_usec, 0)
+        for k in (SystemdNotify.ENV_NOTIFY_SOCKET, SystemdNotify.ENV_WATCHDOG_USEC, SystemdNotify.ENV_WATCHDOG_PID):
+            self.assertNotIn(k, os.environ)
+
+        os.environ[SystemdNotify.ENV_WATCHDOG_USEC] = "3000000"
+        os.environ[SystemdNotify.ENV_WATCHDOG_PID] = str(os.getpid())
+        self.assertEqual(SystemdNotify(path="@x").watchdog_usec, 3000000)
+
+    def test_notify_abstract(self):
+        """
+        Test
+        """
+
+        name = "pysoldaemon_test_%s" % os.getpid()
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            s.bind("\0" + name)
+            s.settimeout(5.0)
+            n = SystemdNotify(path="@" + name, unset_environment=False)
+            self.assertTrue(n.ready("serving"))
+            self.assertEqual(s.recv(4096), ("READY=1\nMAINPID=%s\nSTATUS=serving" % os.getpid()).encode("utf-8"))
+            self.assertTrue(n.watchdog())
+            self.assertEqual(s.recv(4096), b"WATCHDOG=1")
+            self.assertTrue(n.stopping())
+            self.assertEqual(s.recv(4096), b"STOPPING=1")
+            self.assertEqual(n.send_count, 3)
+            n.close()
+        finally:
+            s.close()
+
+        # Gone : error counted, not raised
+        self.assertFalse(n.status("x"))
+        self.assertEqual(n.error_count, 1)